@@ -1,41 +1,180 @@
 """Model.py - Chat con Google Gemini (~50 líneas)"""
-import google.generativeai as genai
+import asyncio
 from pathlib import Path
+from typing import Any, AsyncIterator, Iterator, Optional, Tuple, Union
 import sys
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from config import GEMINI_API_KEY, CHAT_MODEL
+from config import CHAT_MODEL, CHAT_RETRIEVAL, RETRIEVAL_TOP_K
 from logger import get_logger
+from async_runtime import run_sync, iterate_sync
+from gemini_gateway import get_gemini_gateway
+from chat_context_cache import get_chat_context_cache
+from transcript_index import get_transcript_index_store
 
 logger = get_logger(__name__)
-genai.configure(api_key=GEMINI_API_KEY)
+
+# Instrucciones del chat cuando la transcripción va en el caché de contexto
+CACHED_CHAT_INSTRUCTION = (
+    "Eres un asistente que responde basado en el contexto (la transcripción adjunta). "
+    "Si no lo sabes, responde 'No lo sé'. Sé preciso y conciso."
+)
+
+# Prompt con recuperación: solo los fragmentos relevantes, tamaño constante sea cual sea la reunión
+RETRIEVAL_PROMPT = """Eres un asistente que responde basado en fragmentos de una transcripción.
+
+HABLANTES: {speakers}
+
+FRAGMENTOS RELEVANTES (en orden cronológico):
+{chunks}{keywords_section}
+
+Si los fragmentos no bastan para responder, responde 'No lo sé'. Sé preciso y conciso.
+
+Pregunta: {question}"""
 
 class Model:
     def __init__(self):
-        self.model = genai.GenerativeModel(CHAT_MODEL)
+        self.model = get_gemini_gateway().model(CHAT_MODEL)
         logger.info("✓ Chat model initialized")
     
-    def call_model(self, question: str, context: str, keywords=None) -> str:
-        """Genera respuesta basada en pregunta y contexto"""
+    def call_model(
+        self, question: str, context: str, keywords=None, cache_key: Optional[str] = None,
+        use_retrieval: bool = CHAT_RETRIEVAL, stream: bool = False
+    ) -> Union[str, Iterator[str]]:
+        """Versión síncrona de `call_model_async` (se ejecuta en el bucle compartido)
+        
+        Con `stream=True` devuelve un generador de fragmentos de texto (ver `stream_model`).
+        """
+        if stream:
+            return self.stream_model(question, context, keywords, cache_key, use_retrieval)
+        return run_sync(self.call_model_async(question, context, keywords, cache_key, use_retrieval))
+    
+    def stream_model(
+        self, question: str, context: str, keywords=None, cache_key: Optional[str] = None,
+        use_retrieval: bool = CHAT_RETRIEVAL
+    ) -> Iterator[str]:
+        """Generador síncrono de la respuesta a medida que llega
+        
+        Cerrar el generador (`close()` o dejar de iterarlo) cancela la llamada
+        a Gemini. Si el stream falla a mitad, la excepción llega después de los
+        fragmentos ya entregados.
+        """
+        return iterate_sync(self.stream_model_async(question, context, keywords, cache_key, use_retrieval))
+    
+    async def call_model_async(
+        self, question: str, context: str, keywords=None, cache_key: Optional[str] = None,
+        use_retrieval: bool = CHAT_RETRIEVAL
+    ) -> str:
+        """Genera respuesta basada en pregunta y contexto
+        
+        Con `use_retrieval` y una transcripción de más de RETRIEVAL_TOP_K
+        fragmentos solo se envían los más relevantes del índice BM25: el
+        prompt no crece con la reunión. Si no (preguntas que necesitan toda la
+        reunión, como los resúmenes, pasan False) y hay `cache_key` (p.ej. el
+        filename de la grabación), el contexto se cachea en Gemini la primera
+        vez y las preguntas siguientes solo envían la pregunta. Sin caché
+        (transcripción corta o error al crearlo) se envía el contexto completo.
+        """
         try:
-            keywords_section = ""
-            if keywords:
-                kw_list = list(keywords.keys()) if isinstance(keywords, dict) else keywords
-                if kw_list:
-                    keywords_section = f"\n\n📌 KEYWORDS:\n{', '.join(kw_list)}\nUsa estas keywords en tu respuesta si es relevante."
-            
-            prompt = f"""Eres un asistente que responde basado en el contexto:
+            gateway = get_gemini_gateway()
+            prompt, client, cached = await self._build_request(question, context, keywords, cache_key, use_retrieval)
+            try:
+                response = await gateway.generate(prompt, model=client)
+            except Exception as e:
+                if not cached:
+                    raise
+                prompt, client = await self._drop_cached_context(e, question, context, keywords, cache_key, use_retrieval)
+                response = await gateway.generate(prompt, model=client)
+            return response.text
+        
+        except Exception as e:
+            logger.error(f"call_model: {type(e).__name__} - {str(e)}")
+            raise
+    
+    async def stream_model_async(
+        self, question: str, context: str, keywords=None, cache_key: Optional[str] = None,
+        use_retrieval: bool = CHAT_RETRIEVAL
+    ) -> AsyncIterator[str]:
+        """Como `call_model_async`, pero entrega el texto a medida que Gemini lo genera"""
+        gateway = get_gemini_gateway()
+        prompt, client, cached = await self._build_request(question, context, keywords, cache_key, use_retrieval)
+        emitted = False
+        try:
+            async for text in gateway.stream(prompt, model=client):
+                emitted = True
+                yield text
+        except Exception as e:
+            # Tras el primer fragmento no se reintenta: el llamante ya mostró parte de la respuesta
+            if not cached or emitted:
+                logger.error(f"stream_model: {type(e).__name__} - {str(e)}")
+                raise
+            prompt, client = await self._drop_cached_context(e, question, context, keywords, cache_key, use_retrieval)
+            async for text in gateway.stream(prompt, model=client):
+                yield text
+    
+    @staticmethod
+    def _keywords_section(keywords) -> str:
+        if keywords:
+            kw_list = list(keywords.keys()) if isinstance(keywords, dict) else keywords
+            if kw_list:
+                return f"\n\n📌 KEYWORDS:\n{', '.join(kw_list)}\nUsa estas keywords en tu respuesta si es relevante."
+        return ""
+    
+    def _inline_request(self, question: str, context: str, keywords) -> Tuple[str, Any]:
+        """Prompt con la transcripción completa"""
+        prompt = f"""Eres un asistente que responde basado en el contexto:
 
-{context}{keywords_section}
+{context}{self._keywords_section(keywords)}
 
 Si no lo sabes, responde 'No lo sé'. Sé preciso y conciso.
 
 Pregunta: {question}"""
-            
-            logger.info(f"Generando respuesta para: {question[:50]}...")
-            response = self.model.generate_content(prompt)
-            return response.text
         
-        except Exception as e:
-            logger.error(f"call_model: {type(e).__name__} - {str(e)}")
-            raise
+        logger.info(f"Generando respuesta para: {question[:50]}...")
+        return prompt, self.model
+    
+    async def _build_request(
+        self, question: str, context: str, keywords, cache_key: Optional[str], use_retrieval: bool
+    ) -> Tuple[str, Any, bool]:
+        """Prompt y cliente para la pregunta: fragmentos recuperados, contexto cacheado o completo
+        
+        Returns:
+            (prompt, cliente de Gemini, si usa el contexto cacheado)
+        """
+        keywords_section = self._keywords_section(keywords)
+        # La recuperación va primero: mantiene el prompt acotado en las reuniones largas,
+        # justo las que superan el mínimo del caché de contexto
+        if use_retrieval:
+            index = await asyncio.to_thread(get_transcript_index_store().get, context)
+            # Transcripciones cortas caben enteras: no hay nada que recortar
+            if len(index.chunks) > RETRIEVAL_TOP_K:
+                chunks = index.select(question, RETRIEVAL_TOP_K)
+                prompt = RETRIEVAL_PROMPT.format(
+                    speakers=", ".join(index.speakers) or "No identificados",
+                    chunks="\n---\n".join(chunks),
+                    keywords_section=keywords_section,
+                    question=question
+                )
+                logger.info(f"Generando respuesta ({len(chunks)}/{len(index.chunks)} fragmentos) para: {question[:50]}...")
+                return prompt, self.model, False
+        
+        # Sin recuperación (resúmenes) o transcripción corta: contexto completo, cacheado si se puede
+        if cache_key:
+            cached_model = await asyncio.to_thread(
+                get_chat_context_cache().get_model, cache_key, context, CACHED_CHAT_INSTRUCTION
+            )
+            if cached_model is not None:
+                logger.info(f"Generando respuesta (contexto cacheado) para: {question[:50]}...")
+                return f"{keywords_section.strip()}\n\nPregunta: {question}".strip(), cached_model, True
+        
+        prompt, client = self._inline_request(question, context, keywords)
+        return prompt, client, False
+    
+    async def _drop_cached_context(
+        self, error: Exception, question: str, context: str, keywords, cache_key: str, use_retrieval: bool
+    ) -> Tuple[str, Any]:
+        """Caché caducado o borrado en Gemini: se descarta y se responde con el contexto completo"""
+        logger.warning(f"⚠️ Contexto cacheado no utilizable ({type(error).__name__}), respondiendo sin caché")
+        await asyncio.to_thread(get_chat_context_cache().invalidate, cache_key)
+        prompt, client, _ = await self._build_request(question, context, keywords, None, use_retrieval)
+        return prompt, client
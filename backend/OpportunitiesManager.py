@@ -1,25 +1,181 @@
 """OpportunitiesManager.py - Extrae oportunidades (300 → 140 líneas)"""
+import asyncio
 import json
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import streamlit as st
 import sys
-import google.generativeai as genai
 import re
+from bisect import bisect_right
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from logger import get_logger
-from database import init_supabase
+from database import init_supabase, insert_rows_async
+from async_runtime import run_sync
+from gemini_gateway import get_gemini_gateway
 from helpers import safe_json_dump
-from config import GEMINI_API_KEY
+from keyword_matcher import KeywordMatcher, compile_keywords
+from recording_resolver import get_recording_resolver, invalidate_recording_id
+from transcript_utils import split_turn_windows, text_similarity
+from config import AI_ANALYSIS_WINDOW_CHARS, AI_ANALYSIS_MAX_WORKERS
 
 logger = get_logger(__name__)
 BASE_DIR = Path(__file__).parent.parent / "data" / "opportunities"
 KEYWORDS_DICT_PATH = Path(__file__).parent.parent / "keywords_dict.json"
 
-# Configurar Gemini
-genai.configure(api_key=GEMINI_API_KEY)
+# PROMPT EXTREMADAMENTE DIRECTO
+ANALYSIS_PROMPT = """CRÍTICO: Analiza esta conversación/reunión palabra por palabra. Detecta TODAS las oportunidades que encuentres.
+
+MAPEO SIMPLE:
+• Presupuesto / dinero / gasto / inversión / coste → "Presupuesto" (HIGH)
+• Contactar / llamar / tarea / acción / hacer / pendiente / debe / responsabilidad → "Acción requerida" (HIGH)
+• Regulación / ley / cumplimiento / compliance / auditoría / riesgo legal → "Cumplimiento Legal" (HIGH)
+• Formación / capacitación / entrenamiento / curso / educación → "Formación" (MEDIUM)
+• Contratar / empleado / personal / equipo / rol / recurso humano → "Recursos Humanos" (MEDIUM)
+• Cliente / venta / deal / contrato / negocio / oportunidad / acuerdo → "Cierre de venta" (HIGH)
+• Decisión / cambio / estrategia / importante / aprobado → "Decisión importante" (HIGH)
+• Herramienta / infraestructura / sistema / plataforma / equipo tecnológico → "Infraestructura" (MEDIUM)
+{window_note}
+TRANSCRIPCIÓN:
+{transcription}
+
+SPEAKERS: {speakers}
+
+RESPONDE SOLO CON JSON (sin markdown, sin explicaciones):
+
+{{"analisis_completo": true, "oportunidades": [{{"tema": "TemaExacto", "prioridad": "high/medium/low", "mencionado_por": "Nombre", "contexto": "frase", "confianza": 0.85}}]}}
+
+Si no hay oportunidades: {{"analisis_completo": true, "oportunidades": []}}"""
+
+WINDOW_NOTE = """
+CONTEXTO: Esta es la PARTE {index} de {total} de la transcripción. Analiza solo esta parte.
+"""
+
+# Dos oportunidades de ventanas distintas son la misma si coinciden tema y
+# hablante y sus contextos se parecen al menos esto
+DUPLICATE_CONTEXT_SIMILARITY = 0.8
+
+# Valores que ofrece el editor de oportunidades de la UI
+VALID_PRIORITIES = ("Low", "Medium", "High")
+VALID_STATUSES = ("new", "in_progress", "closed", "won")
+# Columnas que la BD devuelve tal cual: identifican una fila creada entre las enviadas
+ROW_IDENTITY = ("recording_id", "title", "description")
+
+
+def build_analysis_prompt(transcription: str, speakers_list: str, index: int = 1, total: int = 1) -> str:
+    """Prompt de análisis para una transcripción o una de sus ventanas"""
+    window_note = WINDOW_NOTE.format(index=index, total=total) if total > 1 else ""
+    return ANALYSIS_PROMPT.format(window_note=window_note, transcription=transcription, speakers=speakers_list)
+
+
+def parse_ai_response(response_text: str) -> Optional[Dict]:
+    """Extrae el JSON de la respuesta de Gemini
+    
+    Args:
+        response_text: Texto devuelto por el modelo (puede venir en bloque markdown)
+    
+    Returns:
+        Diccionario parseado o None si no contiene JSON válido
+    """
+    # Remover markdown code blocks
+    if "```json" in response_text:
+        response_text = response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        response_text = response_text.split("```")[1].split("```")[0].strip()
+    
+    # Remover caracteres de control
+    response_text = response_text.strip()
+    
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError as e:
+        logger.error(f"ERROR al parsear JSON: {str(e)[:100]}")
+        logger.error(f"Response text: {response_text[:300]}")
+    
+    # Intentar limpiar y reparsear: buscar el primer { y último }
+    start = response_text.find("{")
+    end = response_text.rfind("}") + 1
+    if start < 0 or end <= start:
+        logger.error("No JSON encontrado en respuesta")
+        return None
+    try:
+        response_json = json.loads(response_text[start:end])
+        logger.info("JSON recuperado tras limpieza")
+        return response_json
+    except Exception as clean_err:
+        logger.error(f"Error en cleanup: {str(clean_err)[:100]}")
+        return None
+
+
+def _confidence(opp: Dict) -> float:
+    try:
+        return float(opp.get("confianza", 0.8))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def merge_opportunities(window_results: List[List[Dict]]) -> List[Dict]:
+    """Une las oportunidades de todas las ventanas eliminando duplicados
+    
+    Se consideran duplicadas las que comparten tema y hablante y tienen un
+    contexto similar; de cada grupo se conserva la de mayor confianza.
+    
+    Args:
+        window_results: Oportunidades detectadas en cada ventana, en orden
+    
+    Returns:
+        Lista de oportunidades únicas en orden de aparición
+    """
+    merged: List[Dict] = []
+    for opportunities in window_results:
+        for opp in opportunities:
+            if not isinstance(opp, dict):
+                continue
+            tema = str(opp.get("tema", "")).strip().lower()
+            speaker = str(opp.get("mencionado_por", "")).strip().lower()
+            contexto = str(opp.get("contexto", ""))
+            for i, existing in enumerate(merged):
+                if (str(existing.get("tema", "")).strip().lower() == tema
+                        and str(existing.get("mencionado_por", "")).strip().lower() == speaker
+                        and text_similarity(str(existing.get("contexto", "")), contexto) >= DUPLICATE_CONTEXT_SIMILARITY):
+                    if _confidence(opp) > _confidence(existing):
+                        merged[i] = opp
+                    break
+            else:
+                merged.append(opp)
+    return merged
+
+
+def validate_opportunity_row(row: Dict) -> Optional[str]:
+    """Comprueba una fila de la tabla opportunities antes de insertarla
+    
+    Returns:
+        Motivo por el que no es válida, o None si lo es
+    """
+    if not row.get("recording_id"):
+        return "sin recording_id"
+    if not str(row.get("title") or "").strip():
+        return "título vacío"
+    if row.get("priority") not in VALID_PRIORITIES:
+        return f"prioridad '{row.get('priority')}' no válida"
+    if row.get("status") not in VALID_STATUSES:
+        return f"estado '{row.get('status')}' no válido"
+    return None
+
+
+def _match_created(rows: List[Tuple[int, Dict]], created: List[Dict]) -> Dict[int, Dict]:
+    """Asigna cada fila devuelta por la BD a la posición de la fila enviada que le corresponde"""
+    pending: Dict[tuple, List[int]] = {}
+    for position, row in rows:
+        pending.setdefault(tuple(row.get(column) for column in ROW_IDENTITY), []).append(position)
+    matched = {}
+    for row in created:
+        positions = pending.get(tuple(row.get(column) for column in ROW_IDENTITY))
+        if positions:
+            matched[positions.pop(0)] = row
+    return matched
+
 
 class OpportunitiesManager:
     def __init__(self):
@@ -27,70 +183,70 @@ class OpportunitiesManager:
         self.db = init_supabase()
     
     def get_recording_id(self, filename: str) -> Optional[str]:
-        """Obtiene ID del recording - intenta múltiples variaciones del nombre"""
-        try:
-            if not self.db:
-                logger.warning(f"DB unavailable: {filename}")
-                return None
-            
-            # Intentar búsqueda directa
-            result = self.db.table("recordings").select("id").eq("filename", filename).execute()
-            if result.data:
-                recording_id = result.data[0]["id"]
-                logger.info(f"✅ Recording encontrado (búsqueda exacta): {recording_id}")
-                return recording_id
-            
-            # Si no encuentra, intentar variaciones
-            logger.warning(f"No encontrado exacto: {filename}, probando variaciones...")
-            
-            # Variación 1: Buscar por nombre sin extensión
-            filename_no_ext = filename.rsplit('.', 1)[0] if '.' in filename else filename
-            result = self.db.table("recordings").select("id").eq("filename", filename_no_ext).execute()
-            if result.data:
-                recording_id = result.data[0]["id"]
-                logger.info(f"✅ Recording encontrado (sin extensión): {recording_id}")
-                return recording_id
-            
-            # Variación 2: Obtener todos los recordings y buscar por coincidencia parcial
-            try:
-                all_recordings = self.db.table("recordings").select("id, filename").order("created_at", desc=True).limit(20).execute()
-                if all_recordings.data:
-                    main_part = filename.split(" - ")[0].strip() if " - " in filename else filename_no_ext[:20]
-                    for rec in all_recordings.data:
-                        if main_part.lower() in rec["filename"].lower():
-                            recording_id = rec["id"]
-                            logger.info(f"✅ Recording encontrado (coincidencia parcial): {recording_id} ({rec['filename']})")
-                            return recording_id
-            except Exception as search_error:
-                logger.debug(f"Búsqueda por coincidencia falló: {search_error}")
-            
-            logger.error(f"❌ Recording no encontrado con ninguna variación: {filename}")
-            return None
-        except Exception as e:
-            logger.error(f"get_recording_id: {type(e).__name__} - {str(e)}")
+        """Obtiene ID del recording - intenta múltiples variaciones del nombre
+        
+        Resuelto con el resolver compartido: las variaciones se buscan en el
+        catálogo en memoria y el resultado (también "no encontrado") se cachea.
+        """
+        if not self.db:
+            logger.warning(f"DB unavailable: {filename}")
             return None
+        return get_recording_resolver().resolve(filename)
     
-    def extract_opportunities(self, transcription: str, keywords_list: List[str]) -> List[Dict]:
-        """Extrae oportunidades de keywords en transcripción"""
+    def extract_opportunities(
+        self,
+        transcription: str,
+        keywords_list: List[str],
+        include_variants: bool = False
+    ) -> List[Dict]:
+        """Extrae oportunidades de keywords en transcripción
+        
+        Todas las keywords se buscan en una sola pasada con un autómata
+        Aho-Corasick; el contexto solo se construye para cada aparición.
+        
+        Args:
+            transcription: Texto de la transcripción
+            keywords_list: Palabras clave a buscar
+            include_variants: Si una keyword coincide con un tema de keywords_dict.json,
+                              buscar también sus `variantes` (se reportan bajo la keyword)
+        """
         if not keywords_list:
             return []
         
-        opportunities, words = [], transcription.lower().split()
-        for keyword in keywords_list:
-            occurrence_count = 0
-            for i, word in enumerate(words):
-                if keyword.lower() not in word:
-                    continue
-                occurrence_count += 1
-                context_window = 15
-                start, end = max(0, i - context_window), min(len(words), i + context_window + 1)
+        keywords = tuple(dict.fromkeys(kw.lower() for kw in keywords_list if kw.strip()))
+        matcher = self._matcher_with_variants(keywords) if include_variants else compile_keywords(keywords)
+        
+        text = transcription.lower()
+        spans = [(m.start(), m.group()) for m in re.finditer(r'\S+', text)]
+        starts = [start for start, _ in spans]
+        words = [word for _, word in spans]
+        
+        # Posiciones (índice de palabra) por keyword; una aparición por palabra como antes
+        hits: Dict[str, List[Tuple[int, int]]] = {kw: [] for kw in keywords}
+        seen = set()
+        for start, end, index in matcher.find_all(text):
+            keyword = matcher.labels[index]
+            first = bisect_right(starts, start) - 1
+            last = bisect_right(starts, end - 1) - 1
+            if first < 0 or (keyword, first) in seen:
+                continue
+            seen.add((keyword, first))
+            hits[keyword].append((first, last))
+        
+        opportunities = []
+        context_window = 15
+        for keyword in keywords:
+            for occurrence_count, (i, last) in enumerate(sorted(hits[keyword]), 1):
+                start, end = max(0, i - context_window), min(len(words), last + context_window + 1)
+                context_before = " ".join(words[start:i])
+                context_after = " ".join(words[last+1:end])
                 
                 opportunity = {
                     "id": f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{keyword}_{occurrence_count}",
                     "keyword": keyword,
-                    "context_before": " ".join(words[start:i]),
-                    "context_after": " ".join(words[i+1:end]),
-                    "full_context": f"{' '.join(words[start:i])} **{keyword}** {' '.join(words[i+1:end])}",
+                    "context_before": context_before,
+                    "context_after": context_after,
+                    "full_context": f"{context_before} **{keyword}** {context_after}",
                     "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                     "status": "new",
                     "notes": "",
@@ -101,6 +257,31 @@ class OpportunitiesManager:
                 opportunities.append(opportunity)
         return opportunities
     
+    def _matcher_with_variants(self, keywords: Tuple[str, ...]) -> KeywordMatcher:
+        """Autómata con las keywords y las variantes de los temas que coinciden con ellas"""
+        patterns = {kw: kw for kw in keywords}
+        temas = self.load_keywords_dict().get("temas_de_interes", {})
+        for topic, data in temas.items():
+            variants = [v.lower() for v in data.get("variantes", [])]
+            for kw in keywords:
+                if kw == topic.lower() or kw in variants:
+                    for variant in variants + [topic.lower()]:
+                        patterns.setdefault(variant, kw)
+        return KeywordMatcher(patterns)
+    
+    @staticmethod
+    def _to_db_row(opportunity: Dict, recording_id: str) -> Dict:
+        """Fila de la tabla opportunities para una oportunidad de keywords"""
+        return {
+            "recording_id": recording_id,
+            "title": opportunity.get("keyword", "Opportunity"),
+            "description": opportunity.get("full_context", ""),
+            "status": opportunity.get("status", "new"),
+            "priority": opportunity.get("priority", "Medium").capitalize(),
+            "notes": opportunity.get("notes", ""),
+            "created_at": datetime.now().isoformat()
+        }
+    
     def save_opportunity(self, opportunity: Dict, audio_filename: str) -> bool:
         """Guarda oportunidad en BD/local"""
         try:
@@ -113,16 +294,7 @@ class OpportunitiesManager:
                 logger.warning(f"Recording ID not found, fallback local")
                 return self._save_local(opportunity, audio_filename)
             
-            priority = opportunity.get("priority", "Medium").capitalize()
-            data = {
-                "recording_id": recording_id,
-                "title": opportunity.get("keyword", "Opportunity"),
-                "description": opportunity.get("full_context", ""),
-                "status": opportunity.get("status", "new"),
-                "priority": priority,
-                "notes": opportunity.get("notes", ""),
-                "created_at": datetime.now().isoformat()
-            }
+            data = self._to_db_row(opportunity, recording_id)
             
             result = self.db.table("opportunities").insert(data).execute()
             if result.data:
@@ -139,6 +311,132 @@ class OpportunitiesManager:
             logger.error(f"save_opportunity: {type(e).__name__} - {str(e)}")
             return self._save_local(opportunity, audio_filename)
     
+    def save_opportunities(self, opportunities: List[Dict], audio_filename: str) -> int:
+        """Guarda varias oportunidades de keywords con un único insert
+        
+        El recording_id se resuelve una sola vez para todo el lote. Las que no
+        se puedan guardar en BD se guardan localmente como en `save_opportunity`.
+        
+        Args:
+            opportunities: Oportunidades de `extract_opportunities`
+            audio_filename: Audio al que pertenecen
+        
+        Returns:
+            Número de oportunidades guardadas (BD o local)
+        """
+        if not opportunities:
+            return 0
+        
+        recording_id = self.get_recording_id(audio_filename) if self.db else None
+        if not recording_id:
+            logger.warning(f"BD/Recording ID no disponible, guardando {len(opportunities)} localmente: {audio_filename}")
+            return sum(1 for opp in opportunities if self._save_local(opp, audio_filename))
+        
+        rows = [self._to_db_row(opp, recording_id) for opp in opportunities]
+        # Las filas inválidas no llegan a la BD: se quedan en local como las que fallan
+        saved_rows = self.save_opportunities_bulk(rows)
+        
+        created_by_index = dict(saved_rows)
+        saved = 0
+        for position, opp in enumerate(opportunities):
+            created = created_by_index.get(position)
+            if created:
+                opp["supabase_id"] = opp["id"] = created.get("id")
+                saved += 1
+            elif self._save_local(opp, audio_filename):
+                saved += 1
+        return saved
+    
+    @staticmethod
+    def _valid_rows(rows: List[Dict]) -> List[Tuple[int, Dict]]:
+        """(posición, fila) de las filas que pasan `validate_opportunity_row`"""
+        valid = []
+        for position, row in enumerate(rows):
+            error = validate_opportunity_row(row)
+            if error:
+                logger.warning(f"❌ Opp {position + 1}: {error}, no se guarda")
+            else:
+                valid.append((position, row))
+        return valid
+    
+    @staticmethod
+    def _after_batch(valid: List[Tuple[int, Dict]], created: Optional[List[Dict]]) -> Tuple[Dict[int, Dict], List[Tuple[int, Dict]]]:
+        """Filas creadas por el insert en lote y filas que quedan por reintentar
+        
+        Solo se reintenta fila a fila si el lote falló o no devolvió nada; si
+        devolvió parte de las filas, se reintentan solo las que faltan.
+        """
+        if not created:
+            return {}, valid
+        if len(created) == len(valid):
+            logger.info(f"✓ {len(created)} oportunidades guardadas en un solo insert")
+            # PostgREST devuelve las filas en el orden de inserción
+            return {position: row for (position, _), row in zip(valid, created)}, []
+        matched = _match_created(valid, created)
+        missing = [(position, row) for position, row in valid if position not in matched]
+        logger.warning(f"⚠️ Insert en lote devolvió {len(created)}/{len(valid)} filas, reintentando {len(missing)}")
+        return matched, missing
+    
+    def save_opportunities_bulk(self, rows: List[Dict]) -> List[Tuple[int, Dict]]:
+        """Valida todas las filas y las inserta en la tabla opportunities en una sola petición
+        
+        Las filas inválidas se descartan antes del insert. Si el insert en lote
+        falla, se reintenta fila a fila para guardar las demás.
+        
+        Args:
+            rows: Filas de la tabla opportunities
+        
+        Returns:
+            Lista de (posición en `rows`, fila creada) de las que se guardaron
+        """
+        valid = self._valid_rows(rows)
+        if not valid:
+            return []
+        if not self.db:
+            logger.error(f"❌ DB no disponible, no se guardan {len(valid)} oportunidades")
+            return []
+        
+        created = None
+        try:
+            created = self.db.table("opportunities").insert([row for _, row in valid]).execute().data
+        except Exception as e:
+            logger.warning(f"⚠️ Insert en lote falló ({type(e).__name__} - {str(e)[:150]}), reintentando fila a fila")
+        saved, retry = self._after_batch(valid, created)
+        if not retry:
+            return sorted(saved.items())
+        
+        for position, row in retry:
+            try:
+                result = self.db.table("opportunities").insert(row).execute()
+                if result.data:
+                    saved[position] = result.data[0]
+                else:
+                    logger.error(f"❌ Opp {position + 1}: Respuesta vacía de Supabase")
+            except Exception as e:
+                logger.error(f"❌ Opp {position + 1}: Error {type(e).__name__} - {str(e)[:150]}")
+        logger.info(f"✓ {len(saved)}/{len(valid)} oportunidades guardadas")
+        return sorted(saved.items())
+    
+    async def save_opportunities_bulk_async(self, rows: List[Dict]) -> List[Tuple[int, Dict]]:
+        """Versión asíncrona de `save_opportunities_bulk` (el reintento fila a fila va en paralelo)"""
+        valid = self._valid_rows(rows)
+        if not valid:
+            return []
+        
+        created = await insert_rows_async("opportunities", [row for _, row in valid])
+        saved, retry = self._after_batch(valid, created or None)
+        if not retry:
+            return sorted(saved.items())
+        
+        results = await asyncio.gather(*(insert_rows_async("opportunities", [row]) for _, row in retry))
+        for (position, _), result in zip(retry, results):
+            if result:
+                saved[position] = result[0]
+            else:
+                logger.error(f"❌ Opp {position + 1}: No se pudo guardar en Supabase")
+        logger.info(f"✓ {len(saved)}/{len(valid)} oportunidades guardadas")
+        return sorted(saved.items())
+    
     def _save_local(self, opportunity: Dict, audio_filename: str) -> bool:
         """Fallback: guarda JSON localmente"""
         filename = f"opp_{audio_filename.replace('.', '_')}_{opportunity['id']}.json"
@@ -274,16 +572,62 @@ class OpportunitiesManager:
             logger.error(f"Error extracting speakers: {type(e).__name__} - {str(e)}")
             return {"Unknown": [transcription]}
     
+    async def _analyze_window(
+        self, model, window: str, index: int, total: int, speakers_list: str, limit: asyncio.Semaphore
+    ) -> List[Dict]:
+        """Analiza una ventana de la transcripción
+        
+        Args:
+            model: Nombre del modelo de Gemini
+            window: Fragmento de la transcripción con intervenciones completas
+            index: Número de ventana (desde 1)
+            total: Número total de ventanas
+            speakers_list: Hablantes de la transcripción completa
+            limit: Semáforo que acota las ventanas en curso
+        
+        Returns:
+            Oportunidades detectadas en la ventana (lista vacía si falla)
+        """
+        try:
+            prompt = build_analysis_prompt(window, speakers_list, index, total)
+            async with limit:
+                response = await get_gemini_gateway().generate(prompt, model=model)
+            response_text = response.text.strip()
+            logger.info(f"Ventana {index}/{total}: respuesta de {len(response_text)} caracteres")
+            logger.debug(f"RESPUESTA COMPLETA ventana {index}:\n{response_text}")
+            
+            response_json = parse_ai_response(response_text)
+            if response_json is None:
+                return []
+            oportunidades = response_json.get("oportunidades", [])
+            return oportunidades if isinstance(oportunidades, list) else []
+        except Exception as e:
+            logger.error(f"❌ Ventana {index}/{total}: {type(e).__name__} - {str(e)[:150]}")
+            return []
+    
     def analyze_opportunities_with_ai(
         self, 
         transcription: str, 
         audio_filename: str,
         recording_id: str = None
+    ) -> Tuple[int, List[Dict]]:
+        """Versión síncrona de `analyze_opportunities_with_ai_async` (se ejecuta en el bucle compartido)"""
+        return run_sync(self.analyze_opportunities_with_ai_async(transcription, audio_filename, recording_id))
+    
+    async def analyze_opportunities_with_ai_async(
+        self, 
+        transcription: str, 
+        audio_filename: str,
+        recording_id: str = None
     ) -> Tuple[int, List[Dict]]:
         """
         Análisis inteligente de oportunidades usando Gemini.
         Detección de intenciones y conceptos, no solo palabras clave exactas.
         
+        La transcripción completa se divide en ventanas de intervenciones
+        (AI_ANALYSIS_WINDOW_CHARS) que se analizan concurrentemente; después
+        se unen los resultados eliminando duplicados entre ventanas.
+        
         Args:
             transcription: Texto completo de la transcripción
             audio_filename: Nombre del archivo de audio para asociar la oportunidad
@@ -314,91 +658,30 @@ class OpportunitiesManager:
             
             speakers_list = ", ".join(speakers.keys())
             
-            # Limitar transcripción si es necesario
-            transcription_limited = transcription[:12000] if len(transcription) > 12000 else transcription
+            # Map: ventanas por intervenciones completas analizadas concurrentemente
+            windows = split_turn_windows(transcription, AI_ANALYSIS_WINDOW_CHARS) or [transcription]
+            model_name = config.get("modelo_gemini", "gemini-2.0-flash")
             
-            # PROMPT EXTREMADAMENTE DIRECTO
-            prompt = f"""CRÍTICO: Analiza esta conversación/reunión palabra por palabra. Detecta TODAS las oportunidades que encuentres.
-
-MAPEO SIMPLE:
-• Presupuesto / dinero / gasto / inversión / coste → "Presupuesto" (HIGH)
-• Contactar / llamar / tarea / acción / hacer / pendiente / debe / responsabilidad → "Acción requerida" (HIGH)
-• Regulación / ley / cumplimiento / compliance / auditoría / riesgo legal → "Cumplimiento Legal" (HIGH)
-• Formación / capacitación / entrenamiento / curso / educación → "Formación" (MEDIUM)
-• Contratar / empleado / personal / equipo / rol / recurso humano → "Recursos Humanos" (MEDIUM)
-• Cliente / venta / deal / contrato / negocio / oportunidad / acuerdo → "Cierre de venta" (HIGH)
-• Decisión / cambio / estrategia / importante / aprobado → "Decisión importante" (HIGH)
-• Herramienta / infraestructura / sistema / plataforma / equipo tecnológico → "Infraestructura" (MEDIUM)
-
-TRANSCRIPCIÓN:
-{transcription_limited}
-
-SPEAKERS: {speakers_list}
-
-RESPONDE SOLO CON JSON (sin markdown, sin explicaciones):
-
-{{"analisis_completo": true, "oportunidades": [{{"tema": "TemaExacto", "prioridad": "high/medium/low", "mencionado_por": "Nombre", "contexto": "frase", "confianza": 0.85}}]}}
-
-Si no hay oportunidades: {{"analisis_completo": true, "oportunidades": []}}"""
-            
-            # Llamar a Gemini
             logger.info(f"Iniciando analisis con Gemini para: {audio_filename}")
-            logger.info(f"Modelo: {config.get('modelo_gemini', 'gemini-2.0-flash')}")
-            logger.info(f"Transcripción: {len(transcription_limited)} caracteres, Speakers: {speakers_list}")
-            
-            model = genai.GenerativeModel(config.get("modelo_gemini", "gemini-2.0-flash"))
-            response = model.generate_content(prompt)
-            response_text = response.text.strip()
-            
-            logger.info(f"Respuesta Gemini recibida: {len(response_text)} caracteres")
-            logger.info(f"RESPUESTA COMPLETA:\n{response_text}")
-            
-            # Limpiar respuesta
-            # Remover markdown code blocks
-            if "```json" in response_text:
-                logger.info("Limpiando: encontrado ```json")
-                response_text = response_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in response_text:
-                logger.info("Limpiando: encontrado ```")
-                response_text = response_text.split("```")[1].split("```")[0].strip()
+            logger.info(f"Modelo: {model_name}")
+            logger.info(f"Transcripción: {len(transcription)} caracteres en {len(windows)} ventanas, Speakers: {speakers_list}")
             
-            # Remover caracteres de control
-            response_text = response_text.strip()
-            logger.info(f"Texto limpio: {response_text[:200]}")
+            limit = asyncio.Semaphore(max(1, min(AI_ANALYSIS_MAX_WORKERS, len(windows))))
+            results = await asyncio.gather(*(
+                self._analyze_window(model_name, window, index, len(windows), speakers_list, limit)
+                for index, window in enumerate(windows, 1)
+            ))
             
-            # Parsear JSON
-            try:
-                response_json = json.loads(response_text)
-                logger.info(f"JSON parseado exitosamente: {response_json}")
-            except json.JSONDecodeError as e:
-                logger.error(f"ERROR al parsear JSON: {str(e)[:100]}")
-                logger.error(f"Response text: {response_text[:300]}")
-                # Intentar limpiar y reparsear
-                try:
-                    # Buscar el primer { y último }
-                    start = response_text.find("{")
-                    end = response_text.rfind("}") + 1
-                    if start >= 0 and end > start:
-                        cleaned = response_text[start:end]
-                        logger.info(f"Intentando limpiar JSON desde {start} a {end}")
-                        response_json = json.loads(cleaned)
-                        logger.info("JSON recuperado tras limpieza")
-                    else:
-                        logger.error("No JSON encontrado en respuesta")
-                        return 0, []
-                except Exception as clean_err:
-                    logger.error(f"Error en cleanup: {str(clean_err)[:100]}")
-                    return 0, []
-            
-            oportunidades_data = response_json.get("oportunidades", [])
-            logger.info(f"IA detectó {len(oportunidades_data)} oportunidades: {oportunidades_data}")
+            # Reduce: unir y eliminar duplicados entre ventanas
+            oportunidades_data = merge_opportunities(results)
+            logger.info(f"IA detectó {len(oportunidades_data)} oportunidades ({sum(len(r) for r in results)} antes de unir ventanas): {oportunidades_data}")
             
             if not oportunidades_data:
                 logger.info(f"Análisis completado: 0 oportunidades detectadas")
                 return 0, []
             
             # Obtener recording_id: usar el pasado como parámetro o buscar por nombre
-            recording_id = recording_id or self.get_recording_id(audio_filename)
+            recording_id = recording_id or await asyncio.to_thread(self.get_recording_id, audio_filename)
             
             logger.info(f"Recording ID obtenido: {recording_id}")
             
@@ -419,10 +702,11 @@ Si no hay oportunidades: {{"analisis_completo": true, "oportunidades": []}}"""
                             "transcription": None
                         }
                         logger.info(f"Creando recording con filename: {audio_filename}")
-                        result = self.db.table("recordings").insert(new_recording).execute()
-                        if result.data and len(result.data) > 0:
-                            recording_id = result.data[0].get("id")
+                        created = await insert_rows_async("recordings", [new_recording])
+                        if created:
+                            recording_id = created[0].get("id")
                             logger.info(f"✅ Recording creado exitosamente: {recording_id}")
+                            invalidate_recording_id(audio_filename)
                         else:
                             logger.error(f"❌ Respuesta vacía al crear recording")
                 except Exception as create_error:
@@ -436,8 +720,10 @@ Si no hay oportunidades: {{"analisis_completo": true, "oportunidades": []}}"""
             logger.info(f"✅ Usando recording_id para guardar oportunidades: {recording_id}")
             logger.info(f"📊 Total de oportunidades a guardar: {len(oportunidades_data)}")
             
-            # Guardar cada oportunidad
-            saved_opportunities = []
+            # Filtrar por tema, confianza y contexto; el guardado valida las filas y las inserta en un solo insert
+            min_confianza = float(config.get("minimo_confianza", 0.5))
+            priority_map = {"high": "High", "medium": "Medium", "low": "Low"}
+            rows = []
             for idx, opp in enumerate(oportunidades_data, 1):
                 try:
                     tema = str(opp.get("tema", "")).strip()
@@ -454,7 +740,6 @@ Si no hay oportunidades: {{"analisis_completo": true, "oportunidades": []}}"""
                         continue
                     
                     # Validar confianza
-                    min_confianza = float(config.get("minimo_confianza", 0.5))
                     if confianza < min_confianza:
                         logger.debug(f"⏭️  Opp {idx}: Confianza {confianza:.2f} < {min_confianza:.2f}, saltando")
                         continue
@@ -464,7 +749,6 @@ Si no hay oportunidades: {{"analisis_completo": true, "oportunidades": []}}"""
                         continue
                     
                     # Mapear prioridades
-                    priority_map = {"high": "High", "medium": "Medium", "low": "Low"}
                     priority = priority_map.get(prioridad_str, "Medium")
                     
                     # Construir nota
@@ -476,7 +760,7 @@ Si no hay oportunidades: {{"analisis_completo": true, "oportunidades": []}}"""
                     nota += f"💬 Contexto: {contexto}\n"
                     nota += f"🎯 Confianza: {confianza:.0%}"
                     
-                    opportunity_data = {
+                    rows.append({
                         "recording_id": recording_id,
                         "title": f"[IA] {tema} - {mencionado_por}",
                         "description": contexto,
@@ -484,30 +768,13 @@ Si no hay oportunidades: {{"analisis_completo": true, "oportunidades": []}}"""
                         "priority": priority,
                         "notes": nota,
                         "created_at": datetime.now().isoformat()
-                    }
-                    
-                    logger.debug(f"Opp {idx}: Datos preparados para insertar")
-                    
-                    # Insertar en Supabase
-                    if not self.db:
-                        logger.error(f"❌ Opp {idx}: DB no disponible")
-                        continue
-                    
-                    logger.debug(f"Opp {idx}: Iniciando insert en tabla opportunities...")
-                    result = self.db.table("opportunities").insert(opportunity_data).execute()
-                    
-                    if result.data and len(result.data) > 0:
-                        opp_id = result.data[0].get("id")
-                        logger.info(f"✅ Opp {idx} guardada: {opp_id} | Tema: {tema} | Por: {mencionado_por}")
-                        saved_opportunities.append(result.data[0])
-                    else:
-                        logger.error(f"❌ Opp {idx}: Respuesta vacía de Supabase")
-                        logger.error(f"   Respuesta: {result}")
-                    
+                    })
+                
                 except Exception as inner_e:
                     logger.error(f"❌ Opp {idx}: Error {type(inner_e).__name__} - {str(inner_e)[:150]}")
-                    import traceback
-                    logger.debug(f"   Traceback: {traceback.format_exc()}")
+            
+            logger.info(f"📋 {len(rows)}/{len(oportunidades_data)} oportunidades válidas")
+            saved_opportunities = [created for _, created in await self.save_opportunities_bulk_async(rows)]
             
             total = len(saved_opportunities)
             total_detectadas = len(oportunidades_data)
@@ -1,35 +1,32 @@
-"""Transcriber.py - Transcribidor de audio con Gemini (~45 líneas)"""
-import google.generativeai as genai
+"""Transcriber.py - Transcribidor de audio con Gemini (directo o por fragmentos en paralelo)"""
+import asyncio
+import hashlib
 import os
+import shutil
 from pathlib import Path
+from typing import Callable, List, Optional
 import sys
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from config import GEMINI_API_KEY, TRANSCRIPTION_MODEL, MIME_TYPES
+from config import (
+    TRANSCRIPTION_MODEL, MIME_TYPES,
+    TRANSCRIPTION_CHUNK_SECONDS, TRANSCRIPTION_CHUNK_OVERLAP_SECONDS, TRANSCRIPTION_MAX_WORKERS,
+    TRANSCRIPTION_PREPROCESS, PREPROCESS_CODEC
+)
 from logger import get_logger
+from async_runtime import run_sync
+from gemini_gateway import get_gemini_gateway
+from audio_chunks import AudioChunk, get_audio_duration, split_audio
+from audio_preprocessing import PreprocessResult, preprocess_audio
+from vad import OffsetMap
+from transcript_utils import stitch_transcriptions
+from transcription_cache import TranscriptionCache, get_transcription_cache
+from helpers import hash_file
 
 logger = get_logger(__name__)
-genai.configure(api_key=GEMINI_API_KEY)
 
-class Transcriber:
-    def __init__(self):
-        self.model = genai.GenerativeModel(TRANSCRIPTION_MODEL)
-        logger.info("✓ Transcriber initialized")
-    
-    def transcript_audio(self, audio_path: str):
-        """Transcribe un archivo de audio con diarización e identificación de voces"""
-        try:
-            if not os.path.exists(audio_path):
-                raise FileNotFoundError(f"Archivo no encontrado: {audio_path}")
-            
-            ext = audio_path.lower().split('.')[-1]
-            mime_type = MIME_TYPES.get(ext, 'audio/mpeg')
-            
-            logger.info(f"Transcribiendo: {audio_path} ({mime_type})")
-            audio_file = genai.upload_file(audio_path, mime_type=mime_type)
-            
-            # Prompt ESTRICTO para diarización completa e identificación de nombres
-            prompt = """INSTRUCCIONES CRÍTICAS - DEBES SEGUIRLAS AL PIE DE LA LETRA:
+# Prompt ESTRICTO para diarización completa e identificación de nombres
+TRANSCRIPTION_PROMPT = """INSTRUCCIONES CRÍTICAS - DEBES SEGUIRLAS AL PIE DE LA LETRA:
 
 TAREA: Transcribe esta conversación/reunión identificando CADA HABLANTE por separado.
 
@@ -61,22 +58,183 @@ PASO 4 - REGLAS DE ORO:
 ✓ SIN EXPLICACIONES - solo el diálogo
 
 SALIDA FINAL: Solo el texto formateado, nada más."""
+
+CHUNK_PROMPT_SUFFIX = """
+
+CONTEXTO: Este audio es el FRAGMENTO {index} de {total} de una reunión más larga
+(minuto {start} a minuto {end}). Puede empezar o terminar a mitad de frase:
+transcribe también esas frases incompletas."""
+
+# Cambia cuando cambia cualquiera de los prompts: invalida la caché de transcripciones
+PROMPT_VERSION = hashlib.sha256((TRANSCRIPTION_PROMPT + CHUNK_PROMPT_SUFFIX).encode("utf-8")).hexdigest()[:12]
+
+
+class TranscriptionResult:
+    """Resultado de una transcripción (expone `.text` como la respuesta de Gemini)"""
+    def __init__(self, text: str):
+        self.text = text
+
+
+class Transcriber:
+    def __init__(
+        self,
+        model=None,
+        upload_fn: Optional[Callable] = None,
+        max_workers: int = TRANSCRIPTION_MAX_WORKERS,
+        cache: Optional[TranscriptionCache] = None,
+        preprocess: bool = TRANSCRIPTION_PREPROCESS
+    ):
+        """
+        Args:
+            model: Cliente con `generate_content_async` o `generate_content` (por defecto el
+                   modelo compartido del gateway de Gemini)
+            upload_fn: Función `(path, mime_type) -> archivo` (por defecto genai.upload_file)
+            max_workers: Fragmentos en curso a la vez en modo por fragmentos
+            cache: Caché de transcripciones (por defecto la compartida del proceso)
+            preprocess: Reducir el audio (mono 16 kHz, silencios recortados, códec compacto) antes de subirlo
+        """
+        self.model = model or TRANSCRIPTION_MODEL
+        self.upload_fn = upload_fn
+        self.max_workers = max(1, max_workers)
+        self.cache = cache or get_transcription_cache()
+        self.preprocess = preprocess
+        logger.info("✓ Transcriber initialized")
+
+    def transcript_audio(self, audio_path: str, chunked: Optional[bool] = None, audio_hash: Optional[str] = None):
+        """Versión síncrona de `transcript_audio_async` (se ejecuta en el bucle compartido)"""
+        return run_sync(self.transcript_audio_async(audio_path, chunked=chunked, audio_hash=audio_hash))
+
+    async def transcript_audio_async(
+        self,
+        audio_path: str,
+        chunked: Optional[bool] = None,
+        audio_hash: Optional[str] = None
+    ) -> TranscriptionResult:
+        """Transcribe un archivo de audio con diarización e identificación de voces
+
+        Las subidas y generaciones no bloquean el bucle, así que varias
+        transcripciones (y sus fragmentos) pueden estar en curso a la vez.
+
+        Args:
+            audio_path: Ruta del audio
+            chunked: True fuerza el modo por fragmentos, False lo desactiva.
+                     None lo activa si el audio dura más de un fragmento.
+            audio_hash: SHA-256 del audio si ya se calculó (evita releer el archivo)
+        """
+        try:
+            if not os.path.exists(audio_path):
+                raise FileNotFoundError(f"Archivo no encontrado: {audio_path}")
+
+            cache_key = TranscriptionCache.make_key(
+                audio_hash or await asyncio.to_thread(hash_file, audio_path), TRANSCRIPTION_MODEL, PROMPT_VERSION
+            )
+            cached_text = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached_text is not None:
+                return TranscriptionResult(cached_text)
+
+            use_chunks = False
+            if chunked is not False:
+                duration = await asyncio.to_thread(get_audio_duration, audio_path)
+                long_audio = duration is not None and duration > TRANSCRIPTION_CHUNK_SECONDS + TRANSCRIPTION_CHUNK_OVERLAP_SECONDS
+                use_chunks = bool(chunked or long_audio)
             
-            response = self.model.generate_content([prompt, audio_file])
-            
-            logger.info(f"✓ Transcripción: {len(response.text)} caracteres")
-            
-            class Result:
-                def __init__(self, text):
-                    self.text = text
+            # Los fragmentos se cortan con `wave`: en modo por fragmentos el preprocesado se queda en WAV
+            prepared = await asyncio.to_thread(self._preprocess, audio_path, "" if use_chunks else PREPROCESS_CODEC)
+            work_path = prepared.path if prepared else audio_path
+            try:
+                text = None
+                if use_chunks:
+                    text = await self._transcribe_chunked(work_path, prepared.offset_map if prepared else None)
+                    if text is None:
+                        logger.warning("Modo por fragmentos no disponible, transcribiendo en una sola llamada")
+                
+                if text is None:
+                    text = await self._transcribe_file(work_path)
+                    logger.info(f"✓ Transcripción: {len(text)} caracteres")
+            finally:
+                if prepared:
+                    shutil.rmtree(Path(prepared.path).parent, ignore_errors=True)
             
-            return Result(response.text)
-        
+            await asyncio.to_thread(
+                self.cache.put, cache_key, text, model=TRANSCRIPTION_MODEL, prompt_version=PROMPT_VERSION
+            )
+            return TranscriptionResult(text)
+
         except FileNotFoundError as e:
             logger.error(f"Archivo no encontrado: {audio_path}")
             raise
-        
+
         except Exception as e:
             logger.error(f"transcript_audio: {type(e).__name__} - {str(e)}")
             raise
 
+    def _preprocess(self, audio_path: str, codec: str) -> Optional[PreprocessResult]:
+        """Etapa opcional previa a la subida; None si está desactivada o no reduce el audio"""
+        if not self.preprocess:
+            return None
+        return preprocess_audio(audio_path, codec=codec)
+
+    async def _generate(self, contents) -> str:
+        """Llamada a Gemini a través del gateway (cuota, concurrencia y reintentos compartidos)"""
+        response = await get_gemini_gateway().generate(contents, model=self.model)
+        return response.text
+    
+    async def _transcribe_file(self, audio_path: str, prompt: str = TRANSCRIPTION_PROMPT) -> str:
+        """Sube un archivo y lo transcribe en una sola llamada"""
+        ext = audio_path.lower().split('.')[-1]
+        mime_type = MIME_TYPES.get(ext, 'audio/mpeg')
+
+        logger.info(f"Transcribiendo: {audio_path} ({mime_type})")
+        audio_file = await get_gemini_gateway().upload_file(audio_path, mime_type, upload_fn=self.upload_fn)
+        return await self._generate([prompt, audio_file])
+
+    async def _transcribe_chunk(
+        self,
+        chunk: AudioChunk,
+        total: int,
+        limit: asyncio.Semaphore,
+        offset_map: Optional[OffsetMap] = None
+    ) -> str:
+        # Los minutos del prompt son los de la grabación original, no los del audio sin silencios
+        start, end = chunk.start_seconds, chunk.end_seconds
+        if offset_map is not None:
+            start, end = offset_map.to_original(start), offset_map.to_original(end)
+        prompt = TRANSCRIPTION_PROMPT + CHUNK_PROMPT_SUFFIX.format(
+            index=chunk.index + 1,
+            total=total,
+            start=int(start // 60),
+            end=int(end // 60) + 1
+        )
+        async with limit:
+            text = await self._transcribe_file(chunk.path, prompt)
+        logger.info(f"✓ Fragmento {chunk.index + 1}/{total}: {len(text)} caracteres")
+        return text
+
+    async def _transcribe_chunked(self, audio_path: str, offset_map: Optional[OffsetMap] = None) -> Optional[str]:
+        """Divide el audio en fragmentos solapados, los transcribe concurrentemente y los une
+
+        Args:
+            audio_path: Audio a dividir
+            offset_map: Tiempos de `audio_path` → grabación original si se recortaron silencios
+
+        Returns:
+            Transcripción completa o None si el audio no se pudo dividir
+        """
+        chunks: List[AudioChunk] = await asyncio.to_thread(
+            split_audio, audio_path, TRANSCRIPTION_CHUNK_SECONDS, TRANSCRIPTION_CHUNK_OVERLAP_SECONDS
+        )
+        if not chunks:
+            return None
+
+        chunk_dir = Path(chunks[0].path).parent
+        try:
+            workers = min(self.max_workers, len(chunks))
+            logger.info(f"Transcribiendo {len(chunks)} fragmentos ({workers} a la vez)")
+            limit = asyncio.Semaphore(workers)
+            # gather conserva el orden de los fragmentos
+            parts = await asyncio.gather(*(self._transcribe_chunk(c, len(chunks), limit, offset_map) for c in chunks))
+            text = stitch_transcriptions(list(parts))
+            logger.info(f"✓ Transcripción por fragmentos: {len(text)} caracteres")
+            return text
+        finally:
+            shutil.rmtree(chunk_dir, ignore_errors=True)
@@ -0,0 +1,126 @@
+"""async_runtime.py - Bucle de eventos persistente para las variantes async del backend"""
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Iterator, Optional, TypeVar
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import ASYNC_BLOCKING_WORKERS
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_loop_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Bucle compartido del proceso, en un hilo daemon (se crea en el primer uso)
+
+    Es siempre el mismo bucle: los clientes async (Gemini, Supabase) quedan
+    ligados al bucle en el que se crean, así que un `asyncio.run` por llamada
+    obligaría a recrearlos cada vez.
+    """
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            # to_thread usa el ejecutor por defecto: subidas y disco en paralelo acotado
+            loop.set_default_executor(
+                ThreadPoolExecutor(max_workers=max(1, ASYNC_BLOCKING_WORKERS), thread_name_prefix="async-io")
+            )
+            _loop_thread = threading.Thread(target=loop.run_forever, name="async-runtime", daemon=True)
+            _loop_thread.start()
+            _loop = loop
+            logger.info("✓ Bucle asyncio compartido iniciado")
+        return _loop
+
+
+def in_shared_loop() -> bool:
+    """True si se está ejecutando dentro del bucle compartido"""
+    try:
+        return asyncio.get_running_loop() is _loop
+    except RuntimeError:
+        return False
+
+
+async def run_in_shared_loop(coro: Awaitable[T]) -> T:
+    """Espera una corrutina ejecutándola en el bucle compartido
+
+    Desde el propio bucle es un `await` normal; desde otro bucle (p.ej. un
+    `asyncio.run` de un script) se envía al compartido, donde viven los
+    clientes async cacheados.
+    """
+    if in_shared_loop():
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, get_loop()))
+
+
+def run_sync(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Ejecuta una corrutina en el bucle compartido y espera su resultado
+
+    Es la base de la API síncrona (Streamlit, workers de la cola, CLI). No
+    puede llamarse desde el propio bucle: ahí hay que usar `await`.
+
+    Raises:
+        RuntimeError: Si se llama desde el hilo del bucle compartido
+    """
+    loop = get_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_sync llamado desde el bucle compartido: usa await")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+def iterate_sync(agen: AsyncIterator[T], timeout: Optional[float] = None) -> Iterator[T]:
+    """Recorre un generador async del bucle compartido desde código síncrono
+
+    Los elementos se entregan según los produce el bucle. Cerrar el
+    generador devuelto (o abandonarlo) cancela el generador async; una
+    excepción a mitad se lanza después de los elementos ya entregados.
+
+    Args:
+        agen: Generador async a recorrer
+        timeout: Espera máxima entre elementos (segundos)
+
+    Raises:
+        RuntimeError: Si se llama desde el hilo del bucle compartido
+    """
+    loop = get_loop()
+    if threading.current_thread() is _loop_thread:
+        raise RuntimeError("iterate_sync llamado desde el bucle compartido: usa async for")
+    items: "queue.Queue" = queue.Queue()
+    finished = object()
+
+    async def pump() -> None:
+        try:
+            async for item in agen:
+                items.put((item, None))
+        except BaseException as e:
+            items.put((finished, e))
+            raise
+        else:
+            items.put((finished, None))
+        finally:
+            await agen.aclose()
+
+    def generator() -> Iterator[T]:
+        future = asyncio.run_coroutine_threadsafe(pump(), loop)
+        try:
+            while True:
+                item, error = items.get(timeout=timeout)
+                if item is finished:
+                    if error is not None and not isinstance(error, asyncio.CancelledError):
+                        raise error
+                    return
+                yield item
+        finally:
+            future.cancel()
+
+    return generator()
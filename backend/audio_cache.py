@@ -0,0 +1,193 @@
+"""audio_cache.py - Caché local de audios descargados de Storage con presupuesto de disco"""
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import RECORDINGS_DIR, AUDIO_CACHE_MAX_MB
+from logger import get_logger
+from database import download_audio_from_storage
+
+logger = get_logger(__name__)
+
+TMP_SUFFIX = ".part"
+
+
+class AudioCache:
+    """Copias locales de los audios de Storage con expulsión LRU
+
+    Cada acceso actualiza el atime del archivo con `os.utime` (no se depende
+    de que el sistema de archivos lo haga) y, al superar `max_bytes`, se
+    borran los menos usados. Las descargas se escriben en un temporal y se
+    renombran al terminar, y si varias sesiones piden el mismo audio a la
+    vez solo una lo descarga. Los audios en uso (`use`) quedan fijados y la
+    expulsión no los borra.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = RECORDINGS_DIR,
+        max_bytes: int = AUDIO_CACHE_MAX_MB * 1024 * 1024,
+        downloader: Callable[[str, str], bool] = download_audio_from_storage
+    ):
+        """
+        Args:
+            cache_dir: Carpeta de los audios locales
+            max_bytes: Presupuesto de disco
+            downloader: Función `(filename, destino) -> bool` que descarga de Storage
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._downloader = downloader
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._pins: Dict[str, int] = {}  # filename → usos en curso
+        self._stats = {"hits": 0, "misses": 0, "downloads": 0, "failed": 0, "coalesced": 0, "evictions": 0}
+
+    def path_for(self, filename: str) -> Path:
+        return self.cache_dir / filename
+
+    def get(self, filename: str) -> Optional[str]:
+        """Ruta local del audio, descargándolo si hace falta
+
+        Returns:
+            Ruta del archivo o None si no se pudo descargar
+        """
+        path = self.path_for(filename)
+        if path.exists():
+            self._touch(path)
+            self._count("hits")
+            return str(path)
+
+        with self._lock:
+            event = self._inflight.get(filename)
+            leader = event is None
+            if leader:
+                event = self._inflight[filename] = threading.Event()
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            # Otra sesión ya lo está descargando: esperar su resultado
+            event.wait()
+            return str(path) if path.exists() else None
+
+        try:
+            return str(path) if self._download(filename, path) else None
+        finally:
+            with self._lock:
+                del self._inflight[filename]
+            event.set()
+
+    @contextmanager
+    def use(self, filename: str) -> Iterator[Optional[str]]:
+        """Como `get`, pero el archivo no se expulsa mientras dure el bloque
+
+        Para leerlo (transcribir, reproducir) sin que un `add` concurrente de
+        otra sesión o worker lo borre a mitad.
+
+        Yields:
+            Ruta del archivo o None si no se pudo descargar
+        """
+        with self._lock:
+            self._pins[filename] = self._pins.get(filename, 0) + 1
+        try:
+            yield self.get(filename)
+        finally:
+            with self._lock:
+                self._pins[filename] -= 1
+                if not self._pins[filename]:
+                    del self._pins[filename]
+
+    def _download(self, filename: str, path: Path) -> bool:
+        tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}{TMP_SUFFIX}")
+        try:
+            logger.info(f"Archivo local no encontrado: {filename}. Descargando de Storage...")
+            if not self._downloader(filename, str(tmp_path)) or not tmp_path.exists():
+                self._count("failed")
+                logger.error(f"No se pudo descargar {filename} de Storage")
+                return False
+            os.replace(tmp_path, path)
+            self._count("downloads")
+            logger.info(f"✓ Archivo descargado: {filename} ({path.stat().st_size / (1024 * 1024):.1f}MB)")
+            self.add(filename)
+            return True
+        except Exception as e:
+            self._count("failed")
+            logger.warning(f"Error descargando {filename}: {type(e).__name__} - {e}")
+            return False
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def add(self, filename: str) -> None:
+        """Registra un archivo recién escrito en la caché y aplica el presupuesto"""
+        path = self.path_for(filename)
+        if path.exists():
+            self._touch(path)
+            self._evict(keep=path)
+
+    def discard(self, filename: str) -> None:
+        """Borra la copia local (p.ej. al eliminar la grabación)"""
+        self.path_for(filename).unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores del proceso y ocupación actual"""
+        with self._lock:
+            stats = dict(self._stats)
+        files = self._entries()
+        stats["files"] = len(files)
+        stats["bytes"] = sum(size for _, size, _ in files)
+        return stats
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    def _entries(self):
+        entries = []
+        for entry in self.cache_dir.iterdir():
+            if not entry.is_file() or entry.name.endswith(TMP_SUFFIX):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_atime, stat.st_size, entry))
+        return entries
+
+    def _evict(self, keep: Optional[Path] = None) -> None:
+        """Borra los audios menos usados hasta quedar dentro del presupuesto"""
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if entry == keep or entry.name in self._pins:
+                    continue
+                entry.unlink(missing_ok=True)
+                total -= size
+                self._stats["evictions"] += 1
+                logger.info(f"Caché de audio: expulsado {entry.name} ({size / (1024 * 1024):.1f}MB)")
+
+
+_cache: Optional[AudioCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_audio_cache() -> AudioCache:
+    """Caché compartida por todas las sesiones del proceso"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AudioCache()
+        return _cache
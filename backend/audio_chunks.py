@@ -0,0 +1,140 @@
+"""audio_chunks.py - División de audios largos en fragmentos solapados"""
+import shutil
+import tempfile
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    from pydub import AudioSegment
+except ImportError:
+    AudioSegment = None
+
+# Lectura/escritura de WAV por bloques para no cargar el audio entero en memoria
+WAV_COPY_FRAMES = 64 * 1024
+
+
+@dataclass
+class AudioChunk:
+    """Fragmento de audio listo para transcribir"""
+    index: int
+    path: str
+    start_seconds: float
+    end_seconds: float
+
+
+def get_audio_duration(audio_path: str) -> Optional[float]:
+    """Duración del audio en segundos, o None si no se puede determinar
+
+    WAV se lee con la librería estándar; el resto de formatos requiere pydub.
+    """
+    try:
+        if audio_path.lower().endswith(".wav"):
+            with wave.open(audio_path, "rb") as wav:
+                return wav.getnframes() / float(wav.getframerate())
+        if AudioSegment is not None:
+            return len(AudioSegment.from_file(audio_path)) / 1000.0
+    except Exception as e:
+        logger.warning(f"No se pudo obtener duración de {audio_path}: {type(e).__name__} - {e}")
+    return None
+
+
+def _chunk_bounds(duration: float, chunk_seconds: float, overlap_seconds: float) -> List[tuple]:
+    """Calcula los intervalos (inicio, fin) de cada fragmento con solape"""
+    step = max(chunk_seconds - overlap_seconds, 1.0)
+    bounds, start = [], 0.0
+    while start < duration:
+        end = min(start + chunk_seconds, duration)
+        bounds.append((start, end))
+        if end >= duration:
+            break
+        start += step
+    return bounds
+
+
+def _split_wav(audio_path: str, bounds: List[tuple], out_dir: Path) -> List[AudioChunk]:
+    chunks = []
+    with wave.open(audio_path, "rb") as src:
+        params = src.getparams()
+        rate = src.getframerate()
+        frame_size = params.sampwidth * params.nchannels
+        for idx, (start, end) in enumerate(bounds):
+            chunk_path = out_dir / f"chunk_{idx:04d}.wav"
+            src.setpos(int(start * rate))
+            remaining = int((end - start) * rate)
+            with wave.open(str(chunk_path), "wb") as dst:
+                dst.setparams(params)
+                while remaining > 0:
+                    frames = src.readframes(min(WAV_COPY_FRAMES, remaining))
+                    if not frames:
+                        break
+                    dst.writeframes(frames)
+                    remaining -= len(frames) // frame_size
+            chunks.append(AudioChunk(idx, str(chunk_path), start, end))
+    return chunks
+
+
+def _split_with_pydub(audio_path: str, bounds: List[tuple], out_dir: Path) -> List[AudioChunk]:
+    ext = audio_path.lower().split('.')[-1]
+    export_format = "mp3" if ext == "m4a" else ext
+    audio = AudioSegment.from_file(audio_path)
+    chunks = []
+    for idx, (start, end) in enumerate(bounds):
+        chunk_path = out_dir / f"chunk_{idx:04d}.{export_format}"
+        audio[int(start * 1000):int(end * 1000)].export(str(chunk_path), format=export_format)
+        chunks.append(AudioChunk(idx, str(chunk_path), start, end))
+    return chunks
+
+
+def split_audio(
+    audio_path: str,
+    chunk_seconds: float,
+    overlap_seconds: float,
+    out_dir: Optional[str] = None
+) -> List[AudioChunk]:
+    """Divide un audio en fragmentos de `chunk_seconds` que se solapan `overlap_seconds`
+
+    Args:
+        audio_path: Ruta del audio original
+        chunk_seconds: Duración de cada fragmento
+        overlap_seconds: Segundos compartidos entre fragmentos consecutivos
+        out_dir: Directorio destino (por defecto uno temporal nuevo)
+
+    Returns:
+        Lista de fragmentos; vacía si el formato no se puede dividir
+    """
+    is_wav = audio_path.lower().endswith(".wav")
+    if not is_wav and AudioSegment is None:
+        logger.warning(f"pydub no instalado: no se puede dividir {audio_path}")
+        return []
+
+    duration = get_audio_duration(audio_path)
+    if not duration:
+        return []
+
+    bounds = _chunk_bounds(duration, chunk_seconds, overlap_seconds)
+    target_dir = Path(out_dir or tempfile.mkdtemp(prefix="transcriber_chunks_"))
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        if is_wav:
+            chunks = _split_wav(audio_path, bounds, target_dir)
+        else:
+            chunks = _split_with_pydub(audio_path, bounds, target_dir)
+    except Exception:
+        # Sin fragmentos el llamante no recibe el directorio: limpiarlo aquí si es nuestro
+        if out_dir is None:
+            shutil.rmtree(target_dir, ignore_errors=True)
+        raise
+    if not chunks and out_dir is None:
+        shutil.rmtree(target_dir, ignore_errors=True)
+
+    logger.info(f"✓ Audio dividido en {len(chunks)} fragmentos ({duration:.0f}s, solape {overlap_seconds:.0f}s)")
+    return chunks
@@ -0,0 +1,297 @@
+"""audio_preprocessing.py - Reducción del audio antes de transcribir (mono, 16 kHz, códec compacto)"""
+import shutil
+import subprocess
+import tempfile
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import PREPROCESS_SAMPLE_RATE, PREPROCESS_CODEC, PREPROCESS_SILENCE_DB, TRANSCRIPTION_VAD
+from logger import get_logger
+from vad import OffsetMap, compress_silence
+
+logger = get_logger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FFMPEG = shutil.which("ffmpeg")
+
+# Bloques de lectura (frames) para no cargar el audio entero en memoria
+READ_FRAMES = 64 * 1024
+# Ventana de energía para detectar silencio y margen que se conserva alrededor de la voz
+SILENCE_FRAME_SECONDS = 0.03
+SILENCE_PADDING_SECONDS = 0.3
+
+
+@dataclass
+class PreprocessResult:
+    """Audio preprocesado listo para subir"""
+    path: str
+    original_bytes: int
+    processed_bytes: int
+    method: str
+    trimmed_start_seconds: float = 0.0  # Silencio inicial eliminado (para reubicar tiempos)
+    offset_map: Optional[OffsetMap] = None  # Tiempos del audio procesado → original
+
+    @property
+    def saved_ratio(self) -> float:
+        if not self.original_bytes:
+            return 0.0
+        return 1 - self.processed_bytes / self.original_bytes
+
+
+# ============================================================================
+# LECTURA Y ESCRITURA DE WAV (NumPy, por bloques)
+# ============================================================================
+
+def _to_float(raw: bytes, sampwidth: int, nchannels: int) -> "np.ndarray":
+    """PCM entrelazado → mono float32 en [-1, 1]"""
+    if sampwidth == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sampwidth == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif sampwidth == 3:
+        bytes3 = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = bytes3[:, 0] | (bytes3[:, 1] << 8) | (bytes3[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608.0
+    elif sampwidth == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Ancho de muestra no soportado: {sampwidth}")
+    if nchannels > 1:
+        samples = samples.reshape(-1, nchannels).mean(axis=1)
+    return samples
+
+
+def _to_pcm16(samples: "np.ndarray") -> bytes:
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+
+def iter_wav_blocks(path: str, frames: int = READ_FRAMES) -> Iterator[Tuple["np.ndarray", int]]:
+    """Recorre un WAV por bloques devolviendo (muestras mono float32, frecuencia)"""
+    with wave.open(path, "rb") as src:
+        sampwidth, nchannels, rate = src.getsampwidth(), src.getnchannels(), src.getframerate()
+        while True:
+            raw = src.readframes(frames)
+            if not raw:
+                break
+            yield _to_float(raw, sampwidth, nchannels), rate
+
+
+class StreamResampler:
+    """Remuestreo lineal por bloques con un filtro paso bajo de media móvil
+
+    Conserva entre bloques las muestras necesarias para que el resultado sea
+    el mismo que procesando la señal entera de una vez.
+    """
+
+    def __init__(self, src_rate: int, dst_rate: int):
+        self.step = src_rate / dst_rate
+        taps = max(1, int(round(self.step)))
+        self._kernel = np.full(taps, 1.0 / taps, dtype=np.float32) if taps > 1 else None
+        self._filter_tail = np.zeros(taps - 1, dtype=np.float32)
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._pos = 0.0
+
+    def process(self, block: "np.ndarray") -> "np.ndarray":
+        if self._kernel is not None:
+            padded = np.concatenate([self._filter_tail, block])
+            self._filter_tail = padded[len(padded) - len(self._filter_tail):]
+            block = np.convolve(padded, self._kernel, mode="valid").astype(np.float32)
+        if self.step == 1.0:
+            return block
+        buf = np.concatenate([self._carry, block])
+        last = len(buf) - 1
+        if last < self._pos:
+            self._carry = buf
+            return np.zeros(0, dtype=np.float32)
+        count = int((last - self._pos) // self.step) + 1
+        positions = self._pos + self.step * np.arange(count)
+        out = np.interp(positions, np.arange(len(buf)), buf).astype(np.float32)
+        # La siguiente llamada empieza en la última muestra de este bloque
+        self._pos = self._pos + self.step * count - last
+        self._carry = buf[last:]
+        return out
+
+
+def _convert_wav_numpy(src_path: str, dst_path: str, sample_rate: int) -> None:
+    """WAV cualquiera → WAV mono PCM16 a `sample_rate`, por bloques"""
+    resampler = None
+    with wave.open(dst_path, "wb") as dst:
+        dst.setnchannels(1)
+        dst.setsampwidth(2)
+        dst.setframerate(sample_rate)
+        for samples, rate in iter_wav_blocks(src_path):
+            resampler = resampler or StreamResampler(rate, sample_rate)
+            dst.writeframes(_to_pcm16(resampler.process(samples)))
+
+
+def find_speech_bounds(path: str, threshold_db: float = PREPROCESS_SILENCE_DB) -> Optional[Tuple[int, int]]:
+    """Primer y último frame con voz de un WAV mono (primera pasada del recorte)
+
+    Returns:
+        (inicio, fin) en frames, o None si todo el audio es silencio
+    """
+    with wave.open(path, "rb") as src:
+        rate = src.getframerate()
+    window = max(1, int(rate * SILENCE_FRAME_SECONDS))
+    threshold = 10 ** (threshold_db / 20.0)
+    first = last = None
+    offset = 0
+    for samples, _ in iter_wav_blocks(path, frames=window * 1024):
+        usable = len(samples) - len(samples) % window
+        if usable:
+            rms = np.sqrt(np.mean(samples[:usable].reshape(-1, window) ** 2, axis=1))
+            voiced = np.flatnonzero(rms >= threshold)
+            if voiced.size:
+                if first is None:
+                    first = offset + int(voiced[0]) * window
+                last = offset + (int(voiced[-1]) + 1) * window
+        offset += len(samples)
+    if first is None:
+        return None
+    padding = int(rate * SILENCE_PADDING_SECONDS)
+    return max(0, first - padding), min(offset, last + padding)
+
+
+def _copy_wav_range(src_path: str, dst_path: str, start: int, end: int) -> None:
+    """Segunda pasada del recorte: copia los frames [start, end)"""
+    with wave.open(src_path, "rb") as src, wave.open(dst_path, "wb") as dst:
+        dst.setparams(src.getparams())
+        src.setpos(start)
+        remaining = end - start
+        while remaining > 0:
+            raw = src.readframes(min(READ_FRAMES, remaining))
+            if not raw:
+                break
+            dst.writeframes(raw)
+            remaining -= len(raw) // (src.getsampwidth() * src.getnchannels())
+
+
+# ============================================================================
+# FFMPEG
+# ============================================================================
+
+def _run_ffmpeg(*args: str) -> bool:
+    try:
+        subprocess.run(
+            [FFMPEG, "-nostdin", "-hide_banner", "-loglevel", "error", "-y", *args],
+            check=True, capture_output=True, timeout=600
+        )
+        return True
+    except Exception as e:
+        stderr = getattr(e, "stderr", b"") or b""
+        logger.warning(f"ffmpeg falló: {type(e).__name__} - {stderr.decode(errors='ignore')[:200]}")
+        return False
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+def preprocess_audio(
+    audio_path: str,
+    out_dir: Optional[str] = None,
+    sample_rate: int = PREPROCESS_SAMPLE_RATE,
+    codec: str = PREPROCESS_CODEC,
+    trim_silence: bool = True,
+    compress_pauses: bool = TRANSCRIPTION_VAD
+) -> Optional[PreprocessResult]:
+    """Convierte un audio a mono `sample_rate`, recorta el silencio inicial/final y lo comprime
+
+    Usa ffmpeg si está instalado (cualquier formato y códec `opus`); si no,
+    procesa WAV con NumPy por bloques y deja el resultado en WAV PCM16.
+
+    Args:
+        audio_path: Audio original
+        out_dir: Directorio de salida (por defecto uno temporal nuevo; lo borra quien llama)
+        sample_rate: Frecuencia de salida
+        codec: "opus" para comprimir (requiere ffmpeg) o "" para WAV
+        trim_silence: Recortar silencio al principio y al final (requiere NumPy)
+        compress_pauses: Acortar los silencios internos con VAD (requiere NumPy)
+
+    Returns:
+        PreprocessResult, o None si no hay herramientas para este formato
+        o el resultado no es más pequeño que el original
+    """
+    is_wav = audio_path.lower().endswith(".wav")
+    if FFMPEG is None and (np is None or not is_wav):
+        logger.debug(f"Preprocesado no disponible para {audio_path} (sin ffmpeg/NumPy)")
+        return None
+
+    target_dir = Path(out_dir or tempfile.mkdtemp(prefix="preprocess_"))
+    target_dir.mkdir(parents=True, exist_ok=True)
+    original_bytes = Path(audio_path).stat().st_size
+    steps = []
+    result = None
+
+    try:
+        # 1. Mono + remuestreo a WAV PCM16
+        wav_path = str(target_dir / "mono.wav")
+        if FFMPEG:
+            if not _run_ffmpeg("-i", audio_path, "-ac", "1", "-ar", str(sample_rate), "-c:a", "pcm_s16le", wav_path):
+                return None
+            steps.append("ffmpeg")
+        else:
+            _convert_wav_numpy(audio_path, wav_path, sample_rate)
+            steps.append("numpy")
+
+        # 2. Recorte de silencio inicial/final (dos pasadas por bloques)
+        trimmed_start = 0.0
+        if trim_silence and np is not None:
+            bounds = find_speech_bounds(wav_path)
+            with wave.open(wav_path, "rb") as wav:
+                total_frames = wav.getnframes()
+            if bounds and (bounds[0] > 0 or bounds[1] < total_frames):
+                trimmed_path = str(target_dir / "trimmed.wav")
+                _copy_wav_range(wav_path, trimmed_path, *bounds)
+                Path(wav_path).unlink()
+                wav_path = trimmed_path
+                trimmed_start = bounds[0] / sample_rate
+                steps.append("trim")
+
+        # 3. Silencios internos (VAD); el mapa de tiempos incluye el recorte inicial
+        offset_map = None
+        if compress_pauses and np is not None:
+            vad_path = str(target_dir / "vad.wav")
+            vad_result = compress_silence(wav_path, vad_path)
+            if vad_result:
+                Path(wav_path).unlink()
+                wav_path = vad_path
+                offset_map = vad_result.offset_map.shifted(trimmed_start)
+                steps.append("vad")
+        if offset_map is None and trimmed_start:
+            with wave.open(wav_path, "rb") as wav:
+                offset_map = OffsetMap([(0.0, trimmed_start, wav.getnframes() / sample_rate)])
+
+        # 4. Códec compacto
+        final_path = wav_path
+        if codec == "opus" and FFMPEG:
+            opus_path = str(target_dir / "audio.ogg")
+            if _run_ffmpeg("-i", wav_path, "-c:a", "libopus", "-b:a", "24k", "-application", "voip", opus_path):
+                final_path = opus_path
+                steps.append("opus")
+
+        processed_bytes = Path(final_path).stat().st_size
+        if processed_bytes >= original_bytes:
+            logger.info(f"Preprocesado sin ahorro para {Path(audio_path).name}, se usa el original")
+            return None
+        result = PreprocessResult(final_path, original_bytes, processed_bytes, "+".join(steps), trimmed_start, offset_map)
+        logger.info(
+            f"✓ Preprocesado {Path(audio_path).name}: {original_bytes / (1024 * 1024):.1f}MB → "
+            f"{processed_bytes / (1024 * 1024):.1f}MB (-{result.saved_ratio:.0%}) [{result.method}]"
+        )
+        return result
+    except Exception as e:
+        logger.warning(f"Preprocesado falló para {audio_path}: {type(e).__name__} - {e}")
+        return None
+    finally:
+        if result is None and out_dir is None:
+            shutil.rmtree(target_dir, ignore_errors=True)
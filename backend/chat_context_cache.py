@@ -0,0 +1,192 @@
+"""chat_context_cache.py - Contexto del chat cacheado en Gemini por grabación y versión de transcripción"""
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+import sys
+
+import google.generativeai as genai
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import (
+    CHAT_CONTEXT_CACHE, CHAT_CACHE_MODEL, CHAT_CONTEXT_CACHE_IDLE_SECONDS, CHAT_CONTEXT_CACHE_MIN_CHARS
+)
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    from google.generativeai import caching
+except ImportError:
+    caching = None
+
+# Tras un fallo al crear el caché se pregunta sin él durante este tiempo antes de reintentar
+NEGATIVE_TTL_SECONDS = 60
+
+
+@dataclass
+class _Entry:
+    version: str  # Hash de la transcripción: si cambia, el caché ya no sirve
+    cached: Any  # CachedContent de Gemini (None si no se pudo crear)
+    model: Any  # GenerativeModel ligado al caché
+    last_used: float
+    ttl_refreshed: float
+    expires: float
+
+
+class ChatContextCache:
+    """Un CachedContent de Gemini por grabación con la transcripción y las instrucciones
+
+    Las preguntas siguientes solo envían la pregunta: el contexto ya está en
+    Gemini, así que no se vuelve a pagar (ni a esperar) su procesado. El TTL
+    en Gemini se renueva con el uso y caduca tras `idle_seconds` sin
+    preguntas. Si el caché no está disponible (SDK sin `caching`,
+    transcripción corta o error al crearlo) se devuelve None y el chat
+    envía el contexto en el prompt como siempre.
+    """
+
+    def __init__(
+        self,
+        model_name: str = CHAT_CACHE_MODEL,
+        idle_seconds: int = CHAT_CONTEXT_CACHE_IDLE_SECONDS,
+        min_chars: int = CHAT_CONTEXT_CACHE_MIN_CHARS,
+        enabled: bool = CHAT_CONTEXT_CACHE
+    ):
+        self.model_name = model_name
+        self.idle_seconds = max(60, idle_seconds)
+        self.min_chars = min_chars
+        self.enabled = enabled and caching is not None
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._stats = {"hits": 0, "created": 0, "failed": 0, "expired": 0}
+
+    @staticmethod
+    def version_of(context: str) -> str:
+        return hashlib.sha256(context.encode("utf-8")).hexdigest()[:16]
+
+    def get_model(self, cache_key: str, context: str, system_instruction: str) -> Optional[Any]:
+        """Modelo ligado al contexto cacheado de `cache_key`, creándolo si hace falta
+
+        Args:
+            cache_key: Identificador estable de la conversación (p.ej. el filename de la grabación)
+            context: Transcripción actual (su hash es la versión del caché)
+            system_instruction: Instrucciones del asistente (se cachean con el contexto)
+
+        Returns:
+            GenerativeModel que solo necesita la pregunta, o None para enviar el contexto inline
+        """
+        if not self.enabled or not cache_key or len(context) < self.min_chars:
+            return None
+        self._purge_idle()
+        version = self.version_of(context)
+        with self._key_lock(cache_key):
+            now = time.monotonic()
+            with self._lock:
+                entry = self._entries.get(cache_key)
+            if entry and entry.version == version and entry.expires > now:
+                entry.last_used = now
+                if entry.model is not None:
+                    self._refresh_ttl(entry)
+                    self._count("hits")
+                return entry.model
+            if entry:
+                self._drop(cache_key, entry)
+            entry = self._create(cache_key, version, context, system_instruction)
+            with self._lock:
+                self._entries[cache_key] = entry
+            return entry.model
+
+    def invalidate(self, cache_key: str) -> None:
+        """Borra el caché de una conversación (p.ej. al eliminar la grabación)"""
+        with self._lock:
+            entry = self._entries.get(cache_key)
+        if entry:
+            self._drop(cache_key, entry)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["active"] = sum(1 for entry in self._entries.values() if entry.model is not None)
+        return stats
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _key_lock(self, cache_key: str) -> threading.Lock:
+        """Un lock por conversación: dos preguntas a la vez no crean dos cachés"""
+        with self._lock:
+            return self._key_locks.setdefault(cache_key, threading.Lock())
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _create(self, cache_key: str, version: str, context: str, system_instruction: str) -> _Entry:
+        now = time.monotonic()
+        try:
+            cached = caching.CachedContent.create(
+                model=self.model_name,
+                display_name=f"chat-{version}",
+                system_instruction=system_instruction,
+                contents=[context],
+                ttl=timedelta(seconds=self.idle_seconds)
+            )
+            model = genai.GenerativeModel.from_cached_content(cached_content=cached)
+            self._count("created")
+            logger.info(f"✓ Contexto del chat cacheado para '{cache_key}' ({len(context)} caracteres)")
+            return _Entry(version, cached, model, now, now, now + self.idle_seconds)
+        except Exception as e:
+            self._count("failed")
+            logger.warning(f"⚠️ Caché de contexto no disponible para '{cache_key}': {type(e).__name__} - {str(e)[:150]}")
+            return _Entry(version, None, None, now, now, now + NEGATIVE_TTL_SECONDS)
+
+    def _refresh_ttl(self, entry: _Entry) -> None:
+        """Renueva el TTL en Gemini, como mucho una vez cada medio periodo de inactividad"""
+        now = time.monotonic()
+        entry.expires = now + self.idle_seconds
+        if now - entry.ttl_refreshed < self.idle_seconds / 2:
+            return
+        try:
+            entry.cached.update(ttl=timedelta(seconds=self.idle_seconds))
+            entry.ttl_refreshed = now
+        except Exception as e:
+            # Si ya caducó en Gemini, la próxima pregunta lo recreará
+            entry.expires = now
+            logger.debug(f"No se pudo renovar el caché de contexto: {type(e).__name__}")
+
+    def _drop(self, cache_key: str, entry: _Entry) -> None:
+        with self._lock:
+            if self._entries.get(cache_key) is entry:
+                del self._entries[cache_key]
+        if entry.cached is not None:
+            try:
+                entry.cached.delete()
+            except Exception as e:
+                logger.debug(f"No se pudo borrar el caché de contexto: {type(e).__name__}")
+
+    def _purge_idle(self) -> None:
+        """Olvida las conversaciones inactivas (en Gemini ya caducaron por TTL)"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [key for key, entry in self._entries.items() if entry.expires <= now]
+            for key in idle:
+                del self._entries[key]
+                self._stats["expired"] += 1
+
+
+_cache: Optional[ChatContextCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_chat_context_cache() -> ChatContextCache:
+    """Caché compartida por todas las sesiones del proceso"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ChatContextCache()
+        return _cache
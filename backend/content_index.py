@@ -0,0 +1,90 @@
+"""content_index.py - Índice local persistente hash de contenido → grabación"""
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import CONTENT_INDEX_FILE
+from logger import get_logger
+from helpers import atomic_write_json
+
+logger = get_logger(__name__)
+
+
+class ContentHashIndex:
+    """Espejo local de la columna `recordings.content_hash`
+
+    Guarda {sha256: {"recording_id", "filename"}} en un JSON para detectar
+    duplicados entre sesiones sin depender de `st.session_state`.
+    """
+
+    def __init__(self, index_file: Path = CONTENT_INDEX_FILE):
+        self.index_file = Path(index_file)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, str]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, str]]:
+        try:
+            return json.loads(self.index_file.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Índice de contenido ilegible, se reconstruirá: {type(e).__name__}")
+            return {}
+
+    def _save(self) -> None:
+        """Escritura atómica (llamar con el lock adquirido)"""
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_json(self.index_file, self._entries)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar índice de contenido: {type(e).__name__} - {e}")
+
+    def get(self, content_hash: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            return dict(entry) if entry else None
+
+    def add(self, content_hash: str, recording_id: str, filename: str) -> None:
+        with self._lock:
+            self._entries[content_hash] = {"recording_id": recording_id, "filename": filename}
+            self._save()
+
+    def remove(self, content_hash: str) -> None:
+        with self._lock:
+            if self._entries.pop(content_hash, None) is not None:
+                self._save()
+
+    def remove_recording(self, recording_id: str) -> None:
+        """Elimina las entradas que apuntan a una grabación borrada"""
+        with self._lock:
+            stale = [h for h, e in self._entries.items() if e.get("recording_id") == recording_id]
+            for content_hash in stale:
+                del self._entries[content_hash]
+            if stale:
+                self._save()
+
+    def rename(self, old_filename: str, new_filename: str) -> None:
+        with self._lock:
+            changed = False
+            for entry in self._entries.values():
+                if entry.get("filename") == old_filename:
+                    entry["filename"] = new_filename
+                    changed = True
+            if changed:
+                self._save()
+
+
+_index: Optional[ContentHashIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_content_index() -> ContentHashIndex:
+    """Índice compartido por todo el proceso"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ContentHashIndex()
+        return _index
@@ -1,14 +1,25 @@
 """database.py - Acceso a BD con retry y manejo de errores mejorado"""
-import streamlit as st
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, List, Dict, Any, Callable
+import asyncio
+import base64
+import os
 import sys
+import uuid
+import threading
 import time
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import (
+    SUPABASE_POOL_SIZE, SUPABASE_KEEPALIVE_SECONDS, SUPABASE_HTTP_TIMEOUT, CACHE_TTL_MINUTES,
+    STORAGE_RESUMABLE_THRESHOLD_MB, STORAGE_UPLOAD_CHUNK_BYTES, MIME_TYPES, SIGNED_URL_TTL_SECONDS
+)
 from logger import get_logger
-from helpers import db_operation, validate_file
+from helpers import db_operation, async_db_operation, validate_file, hash_file
+from async_runtime import in_shared_loop
+from content_index import get_content_index
+from recording_resolver import invalidate_recording_id
 
 logger = get_logger(__name__)
 
@@ -16,8 +27,20 @@ try:
     from supabase import create_client, Client
 except ImportError:
     create_client = None
+    Client = None
     logger.warning("⚠️  Supabase no instalado")
 
+try:
+    from supabase import acreate_client, AsyncClient
+except ImportError:
+    acreate_client = None
+    AsyncClient = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
 # ============================================================================
 # CONFIGURACIÓN
 # ============================================================================
@@ -66,27 +89,80 @@ def retry_operation(
 # CONEXIÓN A SUPABASE
 # ============================================================================
 
-# ============================================================================
-# CONEXIÓN A SUPABASE
-# ============================================================================
+# Un único cliente por proceso (sesiones de Streamlit, workers y CLI lo comparten)
+_supabase_client = None
+_http_client = None  # Pool httpx del cliente (también lo usa la subida reanudable)
+_supabase_lock = threading.Lock()
+_connection_stats = {"clients_created": 0, "connections_opened": 0}
+_stats_lock = threading.Lock()
 
-@st.cache_resource
-def init_supabase() -> Optional[Client]:
-    """Inicializa cliente de Supabase con manejo de errores"""
+def _count_connection(event_name: str, info: Dict) -> None:
+    """Trace de httpcore: cuenta cada conexión TCP nueva (las reutilizadas no pasan por aquí)"""
+    if event_name == "connection.connect_tcp.complete":
+        with _stats_lock:
+            _connection_stats["connections_opened"] += 1
+
+def _attach_trace(request) -> None:
+    request.extensions["trace"] = _count_connection
+
+def _build_http_client():
+    """Cliente httpx con pool de conexiones keep-alive"""
+    if httpx is None:
+        return None
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=SUPABASE_POOL_SIZE,
+            max_keepalive_connections=SUPABASE_POOL_SIZE,
+            keepalive_expiry=SUPABASE_KEEPALIVE_SECONDS
+        ),
+        timeout=SUPABASE_HTTP_TIMEOUT,
+        event_hooks={"request": [_attach_trace]}
+    )
+
+def _build_client_options(http_client):
+    """Opciones de supabase-py con el cliente httpx compartido (si la versión lo admite)"""
+    if http_client is None:
+        return None
     try:
-        import os
-        url = os.getenv("SUPABASE_URL", "").strip()
-        key = os.getenv("SUPABASE_KEY", "").strip()
-        if not url or not key:
-            logger.error("❌ Credentials no configuradas")
-            return None
-        client = create_client(url, key)
-        logger.info("✓ Conexión Supabase OK")
-        return client
-    except Exception as e:
-        logger.error(f"❌ Init Supabase: {e}")
+        from supabase import ClientOptions
+        return ClientOptions(httpx_client=http_client)
+    except (ImportError, TypeError):
+        logger.debug("supabase-py sin soporte para httpx_client; se usa su pool interno")
         return None
 
+def init_supabase() -> Optional[Client]:
+    """Devuelve el cliente de Supabase compartido (se crea una sola vez por proceso)"""
+    global _supabase_client, _http_client
+    if _supabase_client is not None:
+        return _supabase_client
+    with _supabase_lock:
+        if _supabase_client is not None:
+            return _supabase_client
+        try:
+            import os
+            url = os.getenv("SUPABASE_URL", "").strip()
+            key = os.getenv("SUPABASE_KEY", "").strip()
+            if not url or not key:
+                logger.error("❌ Credentials no configuradas")
+                return None
+            http_client = _build_http_client()
+            options = _build_client_options(http_client)
+            client = create_client(url, key, options=options) if options else create_client(url, key)
+            _http_client = http_client
+            with _stats_lock:
+                _connection_stats["clients_created"] += 1
+            _supabase_client = client
+            logger.info(f"✓ Conexión Supabase OK (pool: {SUPABASE_POOL_SIZE})")
+            return client
+        except Exception as e:
+            logger.error(f"❌ Init Supabase: {e}")
+            return None
+
+def get_connection_stats() -> Dict[str, int]:
+    """Contadores acumulados del proceso: clientes creados y conexiones TCP abiertas"""
+    with _stats_lock:
+        return dict(_connection_stats)
+
 # ============================================================================
 # OPERACIONES DE TABLA GENÉRICAS
 # ============================================================================
@@ -138,29 +214,272 @@ def _execute_table_operation(
         logger.error(f"DB {method} {table}: {type(e).__name__}")
         return [] if method == "select" else None
 
+# ============================================================================
+# CLIENTE ASÍNCRONO
+# ============================================================================
+
+# Un único cliente async, en el bucle compartido (async_runtime): el pool
+# httpx async queda ligado al bucle en el que se crea
+_async_client = None
+_async_client_lock = asyncio.Lock()
+
+async def _count_connection_async(event_name: str, info: Dict) -> None:
+    _count_connection(event_name, info)
+
+async def _attach_trace_async(request) -> None:
+    request.extensions["trace"] = _count_connection_async
+
+def _build_async_http_client():
+    """Cliente httpx async con el mismo pool keep-alive que el síncrono"""
+    if httpx is None:
+        return None
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=SUPABASE_POOL_SIZE,
+            max_keepalive_connections=SUPABASE_POOL_SIZE,
+            keepalive_expiry=SUPABASE_KEEPALIVE_SECONDS
+        ),
+        timeout=SUPABASE_HTTP_TIMEOUT,
+        event_hooks={"request": [_attach_trace_async]}
+    )
+
+def _build_async_client_options(http_client):
+    if http_client is None:
+        return None
+    try:
+        from supabase import AsyncClientOptions
+        return AsyncClientOptions(httpx_client=http_client)
+    except (ImportError, TypeError):
+        logger.debug("supabase-py sin soporte para httpx_client async; se usa su pool interno")
+        return None
+
+async def init_supabase_async() -> Optional["AsyncClient"]:
+    """Devuelve el cliente asíncrono de Supabase (uno por proceso en el bucle compartido)
+    
+    Solo funciona dentro del bucle compartido: fuera de él habría que crear
+    un cliente y un pool por llamada. `async_db_operation` ya ejecuta las
+    operaciones en ese bucle.
+    """
+    global _async_client
+    if not in_shared_loop():
+        logger.error("❌ init_supabase_async fuera del bucle compartido: usa async_db_operation")
+        return None
+    if _async_client is not None:
+        return _async_client
+    if acreate_client is None:
+        logger.error("❌ Cliente async de Supabase no disponible")
+        return None
+    async with _async_client_lock:
+        if _async_client is not None:
+            return _async_client
+        try:
+            url = os.getenv("SUPABASE_URL", "").strip()
+            key = os.getenv("SUPABASE_KEY", "").strip()
+            if not url or not key:
+                logger.error("❌ Credentials no configuradas")
+                return None
+            options = _build_async_client_options(_build_async_http_client())
+            _async_client = await (acreate_client(url, key, options=options) if options else acreate_client(url, key))
+            with _stats_lock:
+                _connection_stats["clients_created"] += 1
+            logger.info(f"✓ Conexión Supabase async OK (pool: {SUPABASE_POOL_SIZE})")
+            return _async_client
+        except Exception as e:
+            logger.error(f"❌ Init Supabase async: {e}")
+            return None
+
+async def _execute_table_operation_async(
+    db,
+    table: str,
+    method: str,
+    filters: Optional[Dict[str, Any]] = None,
+    data: Optional[Any] = None,
+    order_by: Optional[str] = None,
+    desc: bool = False
+) -> Optional[List[Dict]]:
+    """Versión asíncrona de `_execute_table_operation` (mismos argumentos; `data` admite una lista en insert)"""
+    try:
+        query = db.table(table)
+        
+        if method == "select":
+            query = query.select("*")
+        elif method == "insert":
+            query = query.insert(data or {})
+        elif method == "update":
+            query = query.update(data or {})
+        elif method == "delete":
+            query = query.delete()
+        
+        if filters:
+            for col, val in filters.items():
+                query = query.eq(col, val)
+        
+        if order_by:
+            query = query.order(order_by, desc=desc)
+        
+        result = await query.execute()
+        return result.data if result and result.data else []
+    except Exception as e:
+        logger.error(f"DB async {method} {table}: {type(e).__name__}")
+        return [] if method == "select" else None
+
 
 
 @db_operation
 def upload_audio_to_storage(db, filename: str, filepath: str) -> bool:
-    """Sube audio a Supabase Storage"""
+    """Sube audio a Supabase Storage sin cargar el archivo entero en memoria
+    
+    Los archivos grandes usan la subida reanudable (TUS) por bloques de
+    STORAGE_UPLOAD_CHUNK_BYTES; el resto se envía como archivo abierto y
+    httpx lo lee por partes.
+    """
     valid, err = validate_file(filepath)
     if not valid:
         logger.error(f"❌ {err}")
         return False
     try:
+        size = Path(filepath).stat().st_size
+        if size > STORAGE_RESUMABLE_THRESHOLD_MB * 1024 * 1024 and _http_client is not None:
+            if _resumable_upload(filename, filepath, size):
+                logger.info(f"✓ {filename} subido a Storage (reanudable, {size / (1024 * 1024):.1f}MB)")
+                return True
+            logger.warning("⚠️  Subida reanudable falló, se intenta subida simple")
         with open(filepath, "rb") as f:
-            db.storage.from_("recordings").upload(filename, f.read(), {"upsert": "true"})
+            db.storage.from_("recordings").upload(filename, f, {"upsert": "true", "content-type": _mime_type(filename)})
         logger.info(f"✓ {filename} subido a Storage")
         return True
     except Exception as e:
         logger.error(f"❌ Storage upload: {type(e).__name__}")
         return False
 
+def _mime_type(filename: str) -> str:
+    return MIME_TYPES.get(filename.lower().rsplit('.', 1)[-1], "audio/mpeg")
+
+def _tus_metadata(**values: str) -> str:
+    return ",".join(f"{k} {base64.b64encode(v.encode('utf-8')).decode('ascii')}" for k, v in values.items())
+
+def _resumable_upload(filename: str, filepath: str, size: int, bucket: str = "recordings") -> bool:
+    """Subida TUS al endpoint reanudable de Storage
+    
+    Lee el archivo en un único buffer reutilizado de STORAGE_UPLOAD_CHUNK_BYTES
+    (memoria acotada sea cual sea el tamaño). Si un bloque falla, pregunta al servidor el
+    offset confirmado y continúa desde ahí.
+    """
+    url = os.getenv("SUPABASE_URL", "").strip().rstrip("/")
+    key = os.getenv("SUPABASE_KEY", "").strip()
+    headers = {"Authorization": f"Bearer {key}", "apikey": key, "Tus-Resumable": "1.0.0"}
+    try:
+        response = _http_client.post(
+            f"{url}/storage/v1/upload/resumable",
+            headers={
+                **headers,
+                "Upload-Length": str(size),
+                "Upload-Metadata": _tus_metadata(
+                    bucketName=bucket, objectName=filename,
+                    contentType=_mime_type(filename), cacheControl="3600"
+                ),
+                "x-upsert": "true",
+            },
+        )
+        response.raise_for_status()
+        upload_url = response.headers["Location"]
+    except Exception as e:
+        logger.error(f"❌ TUS crear subida: {type(e).__name__} - {str(e)[:100]}")
+        return False
+    
+    buffer = bytearray(STORAGE_UPLOAD_CHUNK_BYTES)
+    view = memoryview(buffer)
+    offset = 0
+    failures = 0
+    with open(filepath, "rb") as f:
+        while offset < size:
+            f.seek(offset)
+            length = f.readinto(buffer)
+            if not length:
+                logger.error(f"❌ TUS: {filename} cambió de tamaño durante la subida")
+                return False
+            try:
+                response = _http_client.patch(
+                    upload_url,
+                    content=bytes(view[:length]),  # httpx necesita bytes; copia acotada a un bloque
+                    headers={
+                        **headers,
+                        "Upload-Offset": str(offset),
+                        "Content-Type": "application/offset+octet-stream",
+                    },
+                )
+                response.raise_for_status()
+                offset = int(response.headers.get("Upload-Offset", offset + length))
+                failures = 0
+            except Exception as e:
+                failures += 1
+                if failures >= MAX_RETRIES:
+                    logger.error(f"❌ TUS bloque en {offset}: {type(e).__name__} - {str(e)[:100]}")
+                    return False
+                time.sleep(RETRY_DELAY * (2 ** (failures - 1)))
+                try:
+                    head = _http_client.head(upload_url, headers=headers)
+                    offset = int(head.headers.get("Upload-Offset", offset))
+                    logger.warning(f"Reanudando subida de {filename} desde {offset / (1024 * 1024):.1f}MB")
+                except Exception:
+                    pass
+    return True
+
+# ============================================================================
+# CLAVES DE STORAGE
+# ============================================================================
+# `recordings.filename` es el nombre visible; el objeto en Storage se llama
+# igual salvo que `recordings.storage_key` diga otra cosa (renombrado sin mover)
+
+_storage_keys: Dict[str, str] = {}  # filename → clave en Storage
+_storage_keys_lock = threading.Lock()
+_storage_key_column: Optional[bool] = None  # None = aún no comprobado
+_signed_urls: Dict[str, tuple] = {}  # filename → (url, caduca); protegido por _storage_keys_lock
+
+def _lookup_storage_key(db, filename: str) -> str:
+    """Clave en Storage de una grabación (filename si no tiene storage_key)"""
+    global _storage_key_column
+    with _storage_keys_lock:
+        if filename in _storage_keys:
+            return _storage_keys[filename]
+    if _storage_key_column is False:
+        return filename
+    try:
+        result = db.table("recordings").select("storage_key").eq("filename", filename).limit(1).execute()
+        _storage_key_column = True
+    except Exception as e:
+        logger.debug(f"Columna storage_key no disponible: {type(e).__name__}")
+        _storage_key_column = False
+        return filename
+    key = (result.data[0].get("storage_key") if result.data else None) or filename
+    with _storage_keys_lock:
+        _storage_keys[filename] = key
+    return key
+
+def _forget_storage_key(*filenames: str) -> None:
+    with _storage_keys_lock:
+        for filename in filenames:
+            _storage_keys.pop(filename, None)
+            _signed_urls.pop(filename, None)
+
+def _free_storage_key(db, filename: str) -> str:
+    """Clave para subir un audio nuevo sin pisar el objeto de una grabación renombrada"""
+    if _storage_key_column is False:
+        return filename
+    try:
+        result = db.table("recordings").select("id").eq("storage_key", filename).limit(1).execute()
+    except Exception:
+        return filename
+    if not result.data:
+        return filename
+    path = Path(filename)
+    return f"{path.stem}_{uuid.uuid4().hex[:8]}{path.suffix}"
+
 @db_operation
 def download_audio_from_storage(db, filename: str, save_to: str) -> bool:
     """Descarga audio de Storage"""
     try:
-        response = db.storage.from_("recordings").download(filename)
+        response = db.storage.from_("recordings").download(_lookup_storage_key(db, filename))
         Path(save_to).write_bytes(response)
         return True
     except Exception as e:
@@ -168,33 +487,132 @@ def download_audio_from_storage(db, filename: str, save_to: str) -> bool:
         return False
 
 @db_operation
-def delete_audio_from_storage(db, filename: str) -> bool:
-    """Elimina audio de Storage"""
+def get_signed_audio_url(db, filename: str, ttl: int = SIGNED_URL_TTL_SECONDS) -> Optional[str]:
+    """URL firmada del audio en Storage para que el navegador lo reproduzca directamente
+    
+    Storage admite peticiones Range, así que el reproductor descarga por partes
+    y puede saltar sin que el servidor de la app lea el archivo. La URL se
+    reutiliza mientras le quede más de una décima parte de su vida.
+    
+    Args:
+        filename: Nombre de la grabación
+        ttl: Segundos de validez de la URL
+        
+    Returns:
+        URL firmada o None si Storage no la genera
+    """
+    now = time.time()
+    with _storage_keys_lock:
+        cached = _signed_urls.get(filename)
+    if cached and cached[1] - now > ttl * 0.1:
+        return cached[0]
+    
+    response = db.storage.from_("recordings").create_signed_url(_lookup_storage_key(db, filename), ttl)
+    url = (response or {}).get("signedURL") or (response or {}).get("signedUrl")
+    if not url:
+        logger.warning(f"Storage no devolvió URL firmada para {filename}")
+        return None
+    with _storage_keys_lock:
+        _signed_urls[filename] = (url, now + ttl)
+    return url
+
+@db_operation
+def delete_audio_from_storage(db, filename: str, storage_key: Optional[str] = None) -> bool:
+    """Elimina audio de Storage
+    
+    Args:
+        storage_key: Clave del objeto si ya se conoce (p.ej. la fila ya se borró)
+    """
     try:
-        db.storage.from_("recordings").remove([filename])
+        db.storage.from_("recordings").remove([storage_key or _lookup_storage_key(db, filename)])
+        _forget_storage_key(filename)
         return True
     except:
         return False
 
 @db_operation
-def save_recording_to_db(db, filename: str, filepath: str, transcription: Optional[str] = None) -> Optional[str]:
-    """Sube a Storage + guarda en BD"""
-    logger.info(f"[1/2] Storage: {filename}")
-    if not upload_audio_to_storage(filename, filepath):
+def get_recording_by_hash(db, content_hash: str) -> Optional[Dict]:
+    """Busca una grabación existente con el mismo contenido (SHA-256)
+    
+    Consulta primero el índice local y lo verifica contra la BD por id;
+    si no está, busca por la columna content_hash y actualiza el índice.
+    
+    Returns:
+        Dict {"id", "filename"} o None si el audio es nuevo
+    """
+    index = get_content_index()
+    entry = index.get(content_hash)
+    if entry:
+        result = db.table("recordings").select("id, filename").eq("id", entry["recording_id"]).limit(1).execute()
+        if result.data:
+            return result.data[0]
+        index.remove(content_hash)  # La grabación se borró desde otra instancia
+    
+    try:
+        result = db.table("recordings").select("id, filename").eq("content_hash", content_hash).limit(1).execute()
+    except Exception as e:
+        logger.debug(f"Búsqueda por content_hash no disponible: {type(e).__name__}")
+        return None
+    if not result.data:
+        return None
+    
+    recording = result.data[0]
+    index.add(content_hash, recording["id"], recording["filename"])
+    return recording
+
+@db_operation
+def save_recording_to_db(
+    db,
+    filename: str,
+    filepath: str,
+    transcription: Optional[str] = None,
+    content_hash: Optional[str] = None
+) -> Optional[str]:
+    """Sube a Storage + guarda en BD
+    
+    Args:
+        content_hash: SHA-256 del audio si ya se calculó (se calcula si no)
+    """
+    storage_key = _free_storage_key(db, filename)
+    logger.info(f"[1/2] Storage: {storage_key}")
+    if not upload_audio_to_storage(storage_key, filepath):
         logger.error(f"[FAIL] Storage")
         return None
     
     logger.info(f"[2/2] BD metadata")
+    record = {
+        "filename": filename,
+        "filepath": filepath,
+        "transcription": transcription,
+        "created_at": datetime.now().isoformat()
+    }
+    if storage_key != filename:
+        record["storage_key"] = storage_key
     try:
-        result = db.table("recordings").insert({
-            "filename": filename,
-            "filepath": filepath,
-            "transcription": transcription,
-            "created_at": datetime.now().isoformat()
-        }).execute()
+        content_hash = content_hash or hash_file(filepath)
+    except OSError:
+        content_hash = None
+    try:
+        try:
+            result = db.table("recordings").insert({**record, "content_hash": content_hash}).execute()
+        except Exception as e:
+            if content_hash and "duplicate" in str(e).lower():
+                # Otra sesión guardó el mismo audio entre la comprobación y el insert
+                existing = get_recording_by_hash(content_hash)
+                if existing:
+                    if existing["filename"] != filename:
+                        delete_audio_from_storage(filename, storage_key=storage_key)
+                    logger.info(f"✓ Audio duplicado, se reutiliza: {existing['id']}")
+                    return existing["id"]
+            # Esquema sin la columna content_hash: guardar igualmente (solo índice local)
+            logger.warning(f"Insert con content_hash falló ({type(e).__name__}), reintentando sin él")
+            result = db.table("recordings").insert(record).execute()
         recording_id = result.data[0]["id"] if result.data else None
         if recording_id:
             logger.info(f"✓ Recording ID: {recording_id}")
+            invalidate_recording_id(filename)  # Puede haber un "no encontrado" cacheado
+            if content_hash:
+                get_content_index().add(content_hash, recording_id, filename)
         return recording_id
     except:
         return None
@@ -216,71 +634,62 @@ def update_transcription(db, recording_id: str, transcription: str) -> bool:
 @db_operation
 def update_recording_filename(db, old_filename: str, new_filename: str) -> bool:
     """
-    Actualiza el nombre del archivo de grabación en Supabase Storage y BD.
+    Renombra una grabación sin descargar ni volver a subir el audio.
     
-    Realiza:
-    1. Descargar archivo de Storage con nombre antiguo
-    2. Subir a Storage con nombre nuevo
-    3. Eliminar archivo antiguo de Storage
-    4. Actualizar BD con nuevo nombre
+    1. Mover el objeto en Storage (operación del servidor)
+    2. Actualizar BD con el nuevo nombre; si falla, deshacer el movimiento
+    
+    Si Storage no permite mover, el objeto se queda donde está y se guarda
+    su clave en `recordings.storage_key` (solo cambian metadatos).
     """
     try:
-        # 1. Descargar archivo con nombre antiguo
-        logger.info(f"[1/4] Descargando {old_filename} de Storage...")
-        try:
-            audio_data = db.storage.from_("recordings").download(old_filename)
-            if not audio_data:
-                logger.error(f"❌ No se pudo descargar {old_filename}")
-                return False
-        except Exception as e:
-            logger.error(f"❌ Error descargando: {e}")
+        existing = db.table("recordings").select("id").eq("filename", new_filename).limit(1).execute()
+        if existing.data:
+            logger.error(f"❌ Ya existe una grabación llamada {new_filename}")
             return False
         
-        # 2. Subir a Storage con nombre nuevo
-        logger.info(f"[2/4] Subiendo como {new_filename}...")
-        try:
-            db.storage.from_("recordings").upload(
-                new_filename, 
-                audio_data, 
-                {"upsert": "false"}  # No sobrescribir si ya existe
-            )
-        except Exception as e:
-            logger.error(f"❌ Error subiendo: {e}")
-            return False
+        old_key = _lookup_storage_key(db, old_filename)
+        bucket = db.storage.from_("recordings")
         
-        # 3. Eliminar archivo antiguo de Storage
-        logger.info(f"[3/4] Eliminando {old_filename} de Storage...")
+        # 1. Mover en Storage
+        moved = False
+        logger.info(f"[1/2] Moviendo {old_key} → {new_filename} en Storage...")
         try:
-            db.storage.from_("recordings").remove([old_filename])
+            bucket.move(old_key, new_filename)
+            moved = True
         except Exception as e:
-            logger.warning(f"⚠️  Error eliminando archivo antiguo: {e}")
-            # No es crítico, continuamos
+            logger.warning(f"⚠️  Storage no pudo mover ({type(e).__name__}), se renombra solo en BD")
         
-        # 4. Actualizar BD
-        logger.info(f"[4/4] Actualizando BD...")
+        # 2. Actualizar BD
+        logger.info(f"[2/2] Actualizando BD...")
+        data = {"filename": new_filename, "updated_at": datetime.now().isoformat()}
+        if not moved:
+            data["storage_key"] = old_key
+        elif old_key != old_filename:
+            data["storage_key"] = None  # Vuelve a coincidir con filename
         result = _execute_table_operation(
             db, "recordings", "update",
             filters={"filename": old_filename},
-            data={"filename": new_filename, "updated_at": datetime.now().isoformat()}
+            data=data
         )
         
-        if result:
-            logger.info(f"✓ Nombre actualizado completamente: {old_filename} → {new_filename}")
-            return True
-        else:
-            # Si la BD falla, intentar revertir en Storage
-            logger.error("❌ Error actualizando BD. Revertiendo cambios en Storage...")
-            try:
-                db.storage.from_("recordings").remove([new_filename])
-                # Re-subir con nombre antiguo
-                db.storage.from_("recordings").upload(
-                    old_filename, 
-                    audio_data, 
-                    {"upsert": "true"}
-                )
-            except:
-                logger.error("❌ Error al revertir. Storage podría estar en estado inconsistente")
+        if not result:
+            logger.error("❌ Error actualizando BD" + (". Revertiendo movimiento en Storage..." if moved else ""))
+            if moved:
+                try:
+                    bucket.move(new_filename, old_key)
+                except Exception:
+                    logger.error("❌ Error al revertir. Storage podría estar en estado inconsistente")
             return False
+        
+        _forget_storage_key(old_filename, new_filename)
+        get_content_index().rename(old_filename, new_filename)
+        invalidate_recording_id(old_filename)
+        invalidate_recording_id(new_filename)
+        invalidate_transcription_status(old_filename)
+        invalidate_transcription_status(new_filename)
+        logger.info(f"✓ Nombre actualizado {'(movido)' if moved else '(solo metadatos)'}: {old_filename} → {new_filename}")
+        return True
             
     except Exception as e:
         logger.error(f"❌ Error al actualizar nombre: {e}")
@@ -305,12 +714,22 @@ def delete_recording_from_db(db, recording_id: int) -> bool:
     try:
         result = db.table("recordings").select("filename").eq("id", recording_id).execute()
         filename = result.data[0]["filename"] if result.data else None
+        storage_key = _lookup_storage_key(db, filename) if filename else None
         
         db.table("opportunities").delete().eq("recording_id", recording_id).execute()
+        # Los resúmenes cuelgan de las transcripciones: borrarlos antes por si la FK no tiene CASCADE
+        transcriptions = db.table("transcriptions").select("id").eq("recording_id", recording_id).execute()
+        transcription_ids = [row["id"] for row in (transcriptions.data or [])]
+        if transcription_ids:
+            db.table("summaries").delete().in_("transcription_id", transcription_ids).execute()
         db.table("recordings").delete().eq("id", recording_id).execute()
+        get_content_index().remove_recording(recording_id)
+        if filename:
+            invalidate_recording_id(filename)
+            invalidate_transcription_status(filename)
         
         if filename:
-            delete_audio_from_storage(filename)
+            delete_audio_from_storage(filename, storage_key=storage_key)
         return True
     except:
         return False
@@ -320,6 +739,7 @@ def delete_recording_by_filename(db, filename: str) -> bool:
     """Busca y elimina por filename"""
     try:
         result = db.table("recordings").select("id").eq("filename", filename).execute()
+        invalidate_recording_id(filename)
         if result.data:
             return delete_recording_from_db(result.data[0]["id"])
         return True
@@ -342,6 +762,9 @@ def save_transcription(db, recording_filename: str, content: str, language: str
             "created_at": datetime.now().isoformat(),
             "updated_at": datetime.now().isoformat()
         }).execute()
+        # Avanzar updated_at para que los catálogos de otras sesiones vean el cambio
+        db.table("recordings").update({"updated_at": datetime.now().isoformat()}).eq("id", recording_id).execute()
+        prime_transcription_status({recording_filename: bool(content and content.strip())})
         return trans_result.data[0]["id"] if trans_result.data else None
     except:
         return None
@@ -361,9 +784,183 @@ def get_transcription_by_filename(db, recording_filename: str) -> Optional[Dict]
 
 @db_operation
 def delete_transcription_by_id(db, transcription_id: str) -> bool:
-    """Elimina una transcripción"""
+    """Elimina una transcripción (y sus resúmenes)"""
     try:
+        db.table("summaries").delete().eq("transcription_id", transcription_id).execute()
         db.table("transcriptions").delete().eq("id", transcription_id).execute()
+        invalidate_transcription_status()  # No sabemos a qué filename pertenecía
         return True
     except:
         return False
+
+@db_operation
+def get_summary(db, transcription_id: str, prompt_hash: str, model: str) -> Optional[Dict]:
+    """Resumen guardado para una versión de transcripción, prompt y modelo"""
+    try:
+        result = (
+            db.table("summaries").select("*")
+            .eq("transcription_id", transcription_id).eq("prompt_hash", prompt_hash).eq("model", model)
+            .limit(1).execute()
+        )
+        return result.data[0] if result.data else None
+    except:
+        return None
+
+@db_operation
+def save_summary(db, transcription_id: str, prompt_hash: str, model: str, content_hash: str, summary: str) -> bool:
+    """Guarda (o reemplaza) el resumen de una versión de transcripción"""
+    try:
+        db.table("summaries").upsert({
+            "transcription_id": transcription_id,
+            "prompt_hash": prompt_hash,
+            "model": model,
+            "content_hash": content_hash,
+            "summary": summary,
+            "created_at": datetime.now().isoformat()
+        }, on_conflict="transcription_id,prompt_hash,model").execute()
+        return True
+    except:
+        return False
+
+# ============================================================================
+# OPERACIONES ASÍNCRONAS (workers que multiplexan muchas escrituras en un bucle)
+# ============================================================================
+
+@async_db_operation
+async def get_all_recordings_async(db) -> List[Dict]:
+    """Obtiene todas las grabaciones"""
+    return await _execute_table_operation_async(db, "recordings", "select")
+
+@async_db_operation
+async def update_transcription_async(db, recording_id: str, transcription: str) -> bool:
+    """Actualiza transcripción"""
+    return bool(await _execute_table_operation_async(
+        db, "recordings", "update",
+        filters={"id": recording_id},
+        data={"transcription": transcription, "updated_at": datetime.now().isoformat()}
+    ))
+
+@async_db_operation
+async def insert_rows_async(db, table: str, rows: List[Dict]) -> Optional[List[Dict]]:
+    """Inserta varias filas en una sola petición
+    
+    Returns:
+        Filas creadas, o None si el insert falló
+    """
+    return await _execute_table_operation_async(db, table, "insert", data=rows)
+
+@async_db_operation
+async def save_transcription_async(db, recording_filename: str, content: str, language: str = "es") -> Optional[str]:
+    """Guarda transcripción"""
+    try:
+        result = await db.table("recordings").select("id").eq("filename", recording_filename).execute()
+        if not result.data:
+            return None
+        
+        recording_id = result.data[0]["id"]
+        trans_result = await db.table("transcriptions").insert({
+            "recording_id": recording_id,
+            "content": content,
+            "language": language,
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat()
+        }).execute()
+        # Avanzar updated_at para que los catálogos de otras sesiones vean el cambio
+        await db.table("recordings").update({"updated_at": datetime.now().isoformat()}).eq("id", recording_id).execute()
+        prime_transcription_status({recording_filename: bool(content and content.strip())})
+        return trans_result.data[0]["id"] if trans_result.data else None
+    except:
+        return None
+
+@async_db_operation
+async def get_transcription_by_filename_async(db, recording_filename: str) -> Optional[Dict]:
+    """Obtiene transcripción por filename"""
+    try:
+        result = await db.table("recordings").select("id").eq("filename", recording_filename).execute()
+        if not result.data:
+            return None
+        
+        trans = await db.table("transcriptions").select("*").eq("recording_id", result.data[0]["id"]).order("created_at", desc=True).limit(1).execute()
+        return trans.data[0] if trans.data else None
+    except:
+        return None
+
+# ============================================================================
+# ESTADO "TRANSCRITO" EN LOTE
+# ============================================================================
+
+STATUS_BATCH_SIZE = 200  # Filenames por consulta (limita la longitud de la URL)
+# Última transcripción de cada grabación y última con algún carácter no blanco
+# (`content ~ '\S'`, igual que `content.strip()`): está transcrita si coinciden
+TRANSCRIBED_COLUMNS = "latest:transcriptions(id), filled:transcriptions(id)"
+_transcription_status: Dict[str, tuple] = {}  # filename → (transcrito, instante)
+_transcription_status_lock = threading.Lock()
+
+def with_transcribed_filters(query):
+    """Añade a una consulta de `recordings` con TRANSCRIBED_COLUMNS los filtros de los embebidos"""
+    return (
+        query.order("created_at", desc=True, foreign_table="latest").limit(1, foreign_table="latest")
+        .filter("filled.content", "match", r"\S")
+        .order("created_at", desc=True, foreign_table="filled").limit(1, foreign_table="filled")
+    )
+
+def is_transcribed_row(row: Dict) -> bool:
+    """Misma regla que al guardar: la última transcripción tiene contenido no vacío tras `strip()`"""
+    latest, filled = row.get("latest") or [], row.get("filled") or []
+    return bool(latest and filled and latest[0]["id"] == filled[0]["id"])
+
+def prime_transcription_status(flags: Dict[str, bool]) -> None:
+    """Registra estados ya conocidos (p.ej. tras guardar o desde el catálogo)"""
+    now = time.monotonic()
+    with _transcription_status_lock:
+        for filename, transcribed in flags.items():
+            _transcription_status[filename] = (bool(transcribed), now)
+
+def invalidate_transcription_status(filename: Optional[str] = None) -> None:
+    """Olvida el estado de un filename (o de todos si no se indica)"""
+    with _transcription_status_lock:
+        if filename is None:
+            _transcription_status.clear()
+        else:
+            _transcription_status.pop(filename, None)
+
+@db_operation
+def get_transcription_status(db, filenames: List[str]) -> Dict[str, bool]:
+    """Indica qué grabaciones tienen contenido en su última transcripción
+    
+    La regla es la de `content.strip()` que se usa al guardar, así que el
+    estado no cambia cuando caduca la caché. Resuelve todos los filenames no cacheados con una consulta recordings ⋈
+    transcriptions por lote, en lugar de dos consultas por archivo.
+    
+    Args:
+        filenames: Lista de nombres de archivo
+        
+    Returns:
+        Dict {filename: transcrito}
+    """
+    ttl = CACHE_TTL_MINUTES * 60
+    now = time.monotonic()
+    status: Dict[str, bool] = {}
+    missing: List[str] = []
+    with _transcription_status_lock:
+        for filename in dict.fromkeys(filenames):
+            cached = _transcription_status.get(filename)
+            if cached and now - cached[1] < ttl:
+                status[filename] = cached[0]
+            else:
+                missing.append(filename)
+    
+    for start in range(0, len(missing), STATUS_BATCH_SIZE):
+        batch = missing[start:start + STATUS_BATCH_SIZE]
+        result = with_transcribed_filters(
+            db.table("recordings").select(f"filename, {TRANSCRIBED_COLUMNS}")
+        ).in_("filename", batch).execute()
+        found = {filename: False for filename in batch}
+        for row in result.data or []:
+            found[row["filename"]] = found.get(row["filename"]) or is_transcribed_row(row)
+        prime_transcription_status(found)
+        status.update(found)
+    
+    if missing:
+        logger.debug(f"Estado de transcripción: {len(missing)} consultados, {len(status) - len(missing)} desde caché")
+    return status
@@ -0,0 +1,284 @@
+"""gemini_gateway.py - Punto único de llamadas a Gemini: límites de cuota, concurrencia y reintentos"""
+import asyncio
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Union
+import sys
+
+import google.generativeai as genai
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import (
+    GEMINI_API_KEY, GEMINI_RPM, GEMINI_TPM, GEMINI_MAX_IN_FLIGHT, GEMINI_MAX_RETRIES,
+    GEMINI_BACKOFF_BASE_SECONDS, GEMINI_BACKOFF_MAX_SECONDS, GEMINI_FILE_TOKEN_ESTIMATE
+)
+from logger import get_logger
+
+logger = get_logger(__name__)
+genai.configure(api_key=GEMINI_API_KEY)
+
+# Errores transitorios de cuota/disponibilidad que merecen reintento
+RETRYABLE_STATUS = (429, 503)
+RETRYABLE_MARKERS = ("429", "503", "RESOURCE_EXHAUSTED", "UNAVAILABLE", "Resource has been exhausted")
+CHARS_PER_TOKEN = 4
+
+
+def is_retryable(error: Exception) -> bool:
+    """429/503 de Gemini (excepciones de google.api_core o mensajes equivalentes)"""
+    code = getattr(error, "code", None)
+    try:
+        if code is not None and int(code) in RETRYABLE_STATUS:
+            return True
+    except (TypeError, ValueError):
+        pass
+    message = str(error)
+    return any(marker in message for marker in RETRYABLE_MARKERS)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Backoff exponencial con jitter completo: uniforme en [0, min(cap, base·2^intento)]"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def estimate_tokens(contents: Any) -> int:
+    """Estimación previa de tokens de entrada: texto por caracteres, archivos por una cifra fija"""
+    parts = contents if isinstance(contents, (list, tuple)) else [contents]
+    tokens = 0
+    for part in parts:
+        if isinstance(part, str):
+            tokens += len(part) // CHARS_PER_TOKEN + 1
+        else:
+            tokens += GEMINI_FILE_TOKEN_ESTIMATE
+    return tokens
+
+
+def _chunk_text(chunk) -> str:
+    """Texto de un fragmento del stream (los fragmentos finales pueden no traer texto)"""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+class TokenBucket:
+    """Cubo de tokens con recarga continua (`rate_per_minute`, capacidad de un minuto)
+
+    Debe usarse desde un único bucle de eventos (el compartido de async_runtime).
+    """
+
+    def __init__(self, rate_per_minute: int):
+        self.capacity = max(1, rate_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1) -> float:
+        """Espera hasta poder consumir `amount` (en orden de llegada)
+
+        Returns:
+            Segundos esperados
+        """
+        amount = min(amount, self.capacity)  # Una petición mayor que el cubo nunca cabría
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+    def adjust(self, amount: float) -> None:
+        """Corrige el consumo con el uso real (puede dejar el cubo en negativo)"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class GeminiGateway:
+    """Todas las llamadas a Gemini del proceso pasan por aquí
+
+    - Cubos de peticiones (RPM) y tokens (TPM) compartidos: se espera antes de
+      llamar en lugar de provocar 429.
+    - Semáforo de llamadas simultáneas.
+    - Reintentos con backoff exponencial y jitter ante 429/503.
+    - Una instancia de GenerativeModel por nombre de modelo.
+
+    Los métodos son corrutinas del bucle compartido (async_runtime); la API
+    síncrona de Transcriber/Model/OpportunitiesManager llega aquí con run_sync.
+    """
+
+    def __init__(
+        self,
+        rpm: int = GEMINI_RPM,
+        tpm: int = GEMINI_TPM,
+        max_in_flight: int = GEMINI_MAX_IN_FLIGHT,
+        max_retries: int = GEMINI_MAX_RETRIES,
+        backoff_base: float = GEMINI_BACKOFF_BASE_SECONDS,
+        backoff_max: float = GEMINI_BACKOFF_MAX_SECONDS
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_in_flight = max(1, max_in_flight)
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._models: Dict[str, Any] = {}
+        self._models_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"calls": 0, "retries": 0, "failures": 0, "tokens": 0, "throttled_seconds": 0.0}
+
+    def model(self, name: str):
+        """GenerativeModel compartido para `name`"""
+        with self._models_lock:
+            if name not in self._models:
+                self._models[name] = genai.GenerativeModel(name)
+            return self._models[name]
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _count(self, key: str, amount: float = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    async def generate(self, contents: Any, model: Union[str, Any], estimated_tokens: Optional[int] = None):
+        """`generate_content` con límites de cuota y reintentos
+
+        Args:
+            contents: Prompt o lista de partes (texto, archivos subidos)
+            model: Nombre del modelo (se usa la instancia compartida) o un cliente
+                   con `generate_content_async`/`generate_content`
+            estimated_tokens: Tokens previstos (por defecto se estiman del contenido)
+
+        Returns:
+            Respuesta de Gemini
+        """
+        client = self.model(model) if isinstance(model, str) else model
+        estimate = estimated_tokens or estimate_tokens(contents)
+        for attempt in range(self.max_retries + 1):
+            throttled = await self.requests.acquire(1)
+            throttled += await self.tokens.acquire(estimate)
+            if throttled:
+                self._count("throttled_seconds", throttled)
+            try:
+                async with self._in_flight:
+                    if hasattr(client, "generate_content_async"):
+                        response = await client.generate_content_async(contents)
+                    else:
+                        response = await asyncio.to_thread(client.generate_content, contents)
+                self._count("calls")
+                self._settle(response, estimate)
+                return response
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries:
+                    self._count("failures")
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                self._count("retries")
+                logger.warning(
+                    f"⚠️ Gemini {type(e).__name__} (intento {attempt + 1}/{self.max_retries + 1}), "
+                    f"reintentando en {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+    async def stream(self, contents: Any, model: Union[str, Any], estimated_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        """`generate_content(stream=True)` con los mismos límites que `generate`
+
+        Solo se reintenta antes del primer fragmento: después, el llamante ya
+        mostró parte de la respuesta y el error se propaga. La llamada ocupa
+        un hueco del semáforo mientras dura el stream; cerrar el generador la
+        cancela y lo libera.
+
+        Yields:
+            Texto de cada fragmento según llega
+        """
+        client = self.model(model) if isinstance(model, str) else model
+        estimate = estimated_tokens or estimate_tokens(contents)
+        for attempt in range(self.max_retries + 1):
+            throttled = await self.requests.acquire(1)
+            throttled += await self.tokens.acquire(estimate)
+            if throttled:
+                self._count("throttled_seconds", throttled)
+            emitted = False
+            try:
+                async with self._in_flight:
+                    if hasattr(client, "generate_content_async"):
+                        response = await client.generate_content_async(contents, stream=True)
+                        async for chunk in response:
+                            text = _chunk_text(chunk)
+                            if text:
+                                emitted = True
+                                yield text
+                    else:
+                        # Cliente sin API async: la respuesta completa como un único fragmento
+                        response = await asyncio.to_thread(client.generate_content, contents)
+                        emitted = True
+                        yield response.text
+                self._count("calls")
+                self._settle(response, estimate)
+                return
+            except Exception as e:
+                if emitted or not is_retryable(e) or attempt == self.max_retries:
+                    self._count("failures")
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                self._count("retries")
+                logger.warning(
+                    f"⚠️ Gemini stream {type(e).__name__} (intento {attempt + 1}/{self.max_retries + 1}), "
+                    f"reintentando en {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+    def _settle(self, response, estimate: int) -> None:
+        """Ajusta el cubo de tokens con el uso real que informa la respuesta"""
+        usage = getattr(response, "usage_metadata", None)
+        actual = getattr(usage, "total_token_count", None) if usage is not None else None
+        if not actual:
+            self._count("tokens", estimate)
+            return
+        self.tokens.adjust(actual - estimate)
+        self._count("tokens", actual)
+
+    async def upload_file(self, path: str, mime_type: str, upload_fn: Optional[Callable] = None):
+        """Sube un archivo a la API de archivos con reintentos ante 429/503
+
+        La subida no consume de los cubos de generación (la API de archivos
+        tiene su propia cuota); el SDK solo la ofrece síncrona, así que va al
+        ejecutor del bucle.
+        """
+        upload_fn = upload_fn or (lambda file_path, file_mime: genai.upload_file(file_path, mime_type=file_mime))
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await asyncio.to_thread(upload_fn, path, mime_type)
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                self._count("retries")
+                logger.warning(f"⚠️ Subida a Gemini {type(e).__name__}, reintentando en {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+
+_gateway: Optional[GeminiGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_gemini_gateway() -> GeminiGateway:
+    """Gateway compartido por todo el proceso (sesiones, workers de la cola y CLI)"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = GeminiGateway()
+        return _gateway
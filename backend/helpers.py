@@ -1,4 +1,8 @@
 """helpers.py - Funciones auxiliares comunes para reducir duplicación"""
+import hashlib
+import json
+import os
+import threading
 import streamlit as st
 from functools import wraps
 from pathlib import Path
@@ -28,6 +32,30 @@ def db_operation(func: Callable) -> Callable:
             return None if 'get' in func.__name__ else False
     return wrapper
 
+def async_db_operation(func: Callable) -> Callable:
+    """Como `db_operation` para corrutinas: usa el cliente asíncrono de Supabase
+    
+    La operación se ejecuta siempre en el bucle compartido (async_runtime),
+    donde vive el único cliente async del proceso, aunque se espere desde otro bucle.
+    """
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        async def operation():
+            from database import init_supabase_async
+            db = await init_supabase_async()
+            if not db:
+                logger.warning(f"{func.__name__}: BD no disponible")
+                return None if func.__name__.endswith('_by_') or 'get' in func.__name__ else False
+            return await func(db, *args, **kwargs)
+        
+        try:
+            from async_runtime import run_in_shared_loop
+            return await run_in_shared_loop(operation())
+        except Exception as e:
+            logger.error(f"{func.__name__}: {type(e).__name__} - {str(e)}")
+            return None if 'get' in func.__name__ else False
+    return wrapper
+
 def validate_file(filepath: str, expected_ext: Optional[str] = None) -> Tuple[bool, Optional[str]]:
     """Valida que un archivo existe, es valid y tiene tamaño > 0
     
@@ -49,6 +77,23 @@ def validate_file(filepath: str, expected_ext: Optional[str] = None) -> Tuple[bo
         return False, f"Formato inválido. Esperado: {expected_ext}"
     return True, None
 
+def hash_file(filepath: str, algorithm: str = "sha256", block_size: int = 1024 * 1024) -> str:
+    """Calcula el hash de un archivo leyéndolo por bloques
+    
+    Args:
+        filepath: Ruta del archivo
+        algorithm: Algoritmo de hashlib (por defecto sha256)
+        block_size: Bytes leídos por iteración
+        
+    Returns:
+        Hash en hexadecimal
+    """
+    digest = hashlib.new(algorithm)
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 def table_query(db, table: str, method: str = "select", *args, **kwargs) -> Optional[List[Dict]]:
     """Helper para queries SQL simples en Supabase
     
@@ -113,6 +158,59 @@ def safe_json_dump(data: Dict, filename: str, dir_path: Path) -> bool:
         logger.error(f"Error guardando JSON: {str(e)}")
         return False
 
+def atomic_write_json(path: Path, data: Dict) -> None:
+    """Escribe un JSON de forma atómica (archivo temporal + os.replace)
+    
+    El temporal lleva el id del hilo para que dos escrituras simultáneas no se
+    pisen. Si algo falla se borra el temporal y la excepción se propaga.
+    
+    Args:
+        path: Archivo destino
+        data: Contenido serializable a JSON
+    """
+    tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+    try:
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+def evict_lru(directory: Path, max_bytes: int, pattern: str = "*.json") -> int:
+    """Borra los archivos menos usados (por mtime) hasta quedar dentro de `max_bytes`
+    
+    Las cachés en disco marcan cada lectura con `os.utime`, así que el mtime
+    es la fecha del último uso.
+    
+    Args:
+        directory: Directorio de la caché
+        max_bytes: Presupuesto total
+        pattern: Archivos que cuentan para el presupuesto
+        
+    Returns:
+        Número de archivos eliminados
+    """
+    entries = []
+    total = 0
+    for entry in directory.glob(pattern):
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue  # Borrado por otro proceso mientras se recorría
+        entries.append((stat.st_mtime, stat.st_size, entry))
+        total += stat.st_size
+    evicted = 0
+    if total <= max_bytes:
+        return evicted
+    for _, size, entry in sorted(entries):
+        entry.unlink(missing_ok=True)
+        total -= size
+        evicted += 1
+        logger.debug(f"Caché {directory.name}: expulsado {entry.name}")
+        if total <= max_bytes:
+            break
+    return evicted
+
 def format_recording_name(filename: str) -> str:
     """Limpia extensión de archivo y formatea el nombre para mostrar
     
@@ -0,0 +1,241 @@
+"""hierarchical_summary.py - Resumen jerárquico de transcripciones largas con nodos cacheados"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import (
+    CHAT_MODEL, HIERARCHICAL_SUMMARY_MIN_CHARS, SUMMARY_WINDOW_CHARS, SUMMARY_FAN_IN,
+    SUMMARY_NODES_DIR, SUMMARY_NODES_MAX_MB
+)
+from logger import get_logger
+from async_runtime import run_sync
+from transcript_utils import parse_turns, format_turns, split_turn_windows
+from helpers import atomic_write_json, evict_lru
+
+logger = get_logger(__name__)
+
+# Cambiarla invalida los nodos cacheados (prompts o troceado distintos)
+NODE_VERSION = "1"
+# Un corte de ventana cada ~BOUNDARY_DIVISOR intervenciones una vez alcanzado el mínimo
+BOUNDARY_DIVISOR = 32
+
+LEAF_INSTRUCTION = (
+    "Resume este tramo de una reunión en orden cronológico. Conserva los temas tratados, "
+    "los datos concretos (cifras, fechas, nombres), las decisiones y las acciones con su responsable. "
+    "Máximo 300 palabras, sin introducción."
+)
+MERGE_INSTRUCTION = (
+    "El contexto son resúmenes parciales consecutivos de una misma reunión. Combínalos en un único "
+    "resumen cronológico sin repetir información, conservando temas, datos concretos, decisiones y "
+    "acciones con su responsable. Máximo 400 palabras, sin introducción."
+)
+PARTIAL_HEADER = "RESÚMENES PARCIALES DE LA REUNIÓN (en orden):"
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def content_defined_groups(items: List[str], keys: List[str], min_size: int, max_size: int, divisor: int, size=len) -> List[List[int]]:
+    """Agrupa elementos consecutivos cortando donde lo decide su propio contenido
+
+    Un grupo se cierra tras un elemento cuyo hash es múltiplo de `divisor`
+    (una vez alcanzado `min_size`) o al llegar a `max_size`. Como los cortes
+    dependen del contenido y no de la posición, editar un elemento solo cambia
+    su grupo (y como mucho el siguiente): el resto de grupos, y sus resúmenes
+    cacheados, se mantienen.
+
+    Args:
+        items: Elementos en orden
+        keys: Hash hexadecimal de cada elemento
+        min_size: Tamaño mínimo de un grupo antes de poder cortar
+        max_size: Tamaño a partir del cual se corta siempre
+        divisor: Inverso de la probabilidad de corte por elemento
+        size: Medida de cada elemento (caracteres por defecto)
+
+    Returns:
+        Índices de los elementos de cada grupo
+    """
+    groups, current, current_size = [], [], 0
+    for index, (item, key) in enumerate(zip(items, keys)):
+        current.append(index)
+        current_size += size(item)
+        if (current_size >= min_size and int(key[:8], 16) % divisor == 0) or current_size >= max_size:
+            groups.append(current)
+            current, current_size = [], 0
+    if current:
+        groups.append(current)
+    return groups
+
+
+def split_leaf_windows(transcription: str, window_chars: int = SUMMARY_WINDOW_CHARS) -> List[str]:
+    """Ventanas de intervenciones completas con cortes definidos por contenido
+
+    El tamaño medio ronda `window_chars` (entre la mitad y el doble); las
+    intervenciones más largas que media ventana se trocean por frases.
+    """
+    lines = []
+    for turn in parse_turns(transcription):
+        line = format_turns([turn])
+        lines.extend(split_turn_windows(line, window_chars // 2) if len(line) > window_chars // 2 else [line])
+    keys = [_digest(line) for line in lines]
+    groups = content_defined_groups(
+        lines, keys, window_chars // 2, window_chars * 2, BOUNDARY_DIVISOR, size=lambda line: len(line) + 1
+    )
+    return ["\n".join(lines[index] for index in group) for group in groups]
+
+
+class _NodeCache:
+    """Textos de los nodos por clave, un JSON por nodo con LRU por mtime (como la caché de transcripciones)"""
+
+    def __init__(self, cache_dir: Path = SUMMARY_NODES_DIR, max_bytes: int = SUMMARY_NODES_MAX_MB * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with self._lock:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                os.utime(path, None)  # Marcar como usado recientemente
+            return data.get("text")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Nodo de resumen inválido {key[:12]}: {type(e).__name__}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def put(self, key: str, text: str, level: int) -> None:
+        payload = {"text": text, "level": level, "created_at": datetime.now().isoformat()}
+        try:
+            with self._lock:
+                atomic_write_json(self._path(key), payload)
+                evict_lru(self.cache_dir, self.max_bytes)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el nodo de resumen: {type(e).__name__} - {e}")
+
+
+class HierarchicalSummarizer:
+    """Resumen en árbol sobre `Model`: hojas en paralelo y combinación por niveles
+
+    1. La transcripción se divide en ventanas de intervenciones con cortes
+       definidos por contenido y cada una se resume (en paralelo; el gateway
+       de Gemini acota la concurrencia).
+    2. Los resúmenes parciales se agrupan de `fan_in` en `fan_in` (también por
+       contenido) y se combinan, nivel a nivel, hasta que caben en un prompt.
+    3. La raíz aplica la instrucción pedida (p.ej. el prompt de resumen) a
+       los resúmenes del último nivel.
+
+    Cada nodo se cachea por el hash de su entrada (texto de la ventana o
+    claves de sus hijos): al editar una parte de la transcripción solo se
+    recalculan su hoja y los nodos por encima de ella.
+    Las transcripciones por debajo de `min_chars` se resumen de una vez.
+    """
+
+    def __init__(
+        self,
+        model,
+        window_chars: int = SUMMARY_WINDOW_CHARS,
+        fan_in: int = SUMMARY_FAN_IN,
+        min_chars: int = HIERARCHICAL_SUMMARY_MIN_CHARS,
+        model_name: str = CHAT_MODEL,
+        cache: Optional[_NodeCache] = None
+    ):
+        self.model = model
+        self.window_chars = max(1000, window_chars)
+        self.fan_in = max(2, fan_in)
+        self.min_chars = min_chars
+        self.model_name = model_name
+        self.cache = cache or _get_node_cache()
+
+    def summarize(self, text: str, instruction: str, cache_key: Optional[str] = None) -> str:
+        """Versión síncrona de `summarize_async` (se ejecuta en el bucle compartido)"""
+        return run_sync(self.summarize_async(text, instruction, cache_key))
+
+    async def summarize_async(self, text: str, instruction: str, cache_key: Optional[str] = None) -> str:
+        """Aplica `instruction` a toda la transcripción
+
+        Args:
+            text: Transcripción completa
+            instruction: Qué generar con la reunión (p.ej. SUMMARY_PROMPT)
+            cache_key: Grabación, para reutilizar el contexto cacheado en el caso directo
+
+        Returns:
+            Texto generado
+        """
+        if len(text) < self.min_chars:
+            return await self.model.call_model_async(instruction, text, cache_key=cache_key, use_retrieval=False)
+
+        windows = split_leaf_windows(text, self.window_chars)
+        level = [(_digest("leaf", NODE_VERSION, self.model_name, window), window) for window in windows]
+        stats = {"computed": 0, "cached": 0}
+        nodes = await asyncio.gather(*(
+            self._node(key, window, LEAF_INSTRUCTION, 0, stats) for key, window in level
+        ))
+        depth = 0
+        while len(nodes) > 1 and sum(len(summary) for _, summary in nodes) > self.window_chars:
+            depth += 1
+            nodes = await self._merge_level(nodes, depth, stats)
+
+        root_key = _digest("root", NODE_VERSION, self.model_name, _digest(instruction), *(key for key, _ in nodes))
+        root = await self._node(root_key, self._partials(nodes), instruction, depth + 1, stats)
+        logger.info(
+            f"✓ Resumen jerárquico: {len(windows)} ventanas, {depth + 1} niveles de combinación, "
+            f"{stats['computed']} nodos generados, {stats['cached']} desde caché"
+        )
+        return root[1]
+
+    async def _merge_level(self, nodes: List[Tuple[str, str]], depth: int, stats: Dict[str, int]) -> List[Tuple[str, str]]:
+        """Combina los nodos de un nivel en grupos de ~fan_in (un grupo de uno pasa tal cual)"""
+        keys = [key for key, _ in nodes]
+        groups = content_defined_groups(keys, keys, 2, 2 * self.fan_in, self.fan_in, size=lambda key: 1)
+        merged = []
+        for group in groups:
+            children = [nodes[index] for index in group]
+            if len(children) == 1:
+                merged.append(asyncio.sleep(0, result=children[0]))
+                continue
+            key = _digest("node", NODE_VERSION, self.model_name, *(child_key for child_key, _ in children))
+            merged.append(self._node(key, self._partials(children), MERGE_INSTRUCTION, depth, stats))
+        return list(await asyncio.gather(*merged))
+
+    @staticmethod
+    def _partials(nodes: List[Tuple[str, str]]) -> str:
+        parts = "\n\n".join(f"[Parte {index}]\n{summary}" for index, (_, summary) in enumerate(nodes, 1))
+        return f"{PARTIAL_HEADER}\n\n{parts}"
+
+    async def _node(self, key: str, context: str, instruction: str, level: int, stats: Dict[str, int]) -> Tuple[str, str]:
+        """Texto del nodo `key`: de la caché o generado con el modelo y guardado"""
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            stats["cached"] += 1
+            return key, cached
+        summary = await self.model.call_model_async(instruction, context, use_retrieval=False)
+        stats["computed"] += 1
+        await asyncio.to_thread(self.cache.put, key, summary, level)
+        return key, summary
+
+
+_node_cache: Optional[_NodeCache] = None
+_node_cache_lock = threading.Lock()
+
+
+def _get_node_cache() -> _NodeCache:
+    global _node_cache
+    with _node_cache_lock:
+        if _node_cache is None:
+            _node_cache = _NodeCache()
+        return _node_cache
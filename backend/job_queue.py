@@ -0,0 +1,314 @@
+"""job_queue.py - Cola persistente de trabajos en segundo plano (SQLite)"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import JOBS_DB_FILE, JOB_WORKERS, JOB_MAX_ATTEMPTS, JOB_LEASE_SECONDS
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# Estados de un trabajo
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# Un handler recibe el trabajo y una función para publicar la etapa actual
+Handler = Callable[[Dict, Callable[[str], None]], Dict]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL,
+    stage TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    lease_until REAL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_filename ON jobs(filename, created_at);
+"""
+
+# Columnas añadidas después de la primera versión del esquema
+MIGRATIONS = {
+    "worker_id": "ALTER TABLE jobs ADD COLUMN worker_id TEXT",
+    "lease_until": "ALTER TABLE jobs ADD COLUMN lease_until REAL",
+}
+
+
+class JobQueue:
+    """Cola de trabajos persistida en SQLite con un pool de workers
+
+    Varios procesos (sesiones de Streamlit, CLI) pueden compartir la misma
+    base. Cada trabajo en `running` lleva el id del worker que lo ejecuta y
+    un arrendamiento que ese worker renueva mientras trabaja; solo cuando
+    caduca (el proceso murió o se colgó) vuelve a `queued`, hasta
+    JOB_MAX_ATTEMPTS intentos. La UI solo encola y consulta el estado; los
+    workers ejecutan el handler registrado para cada tipo de trabajo.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = JOBS_DB_FILE,
+        workers: int = JOB_WORKERS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        handlers: Optional[Dict[str, Handler]] = None,
+        lease_seconds: float = JOB_LEASE_SECONDS
+    ):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.lease_seconds = max(1.0, lease_seconds)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, Handler] = dict(handlers or {})
+        self._wakeup = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+        self._recover()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Conexión corta en modo autocommit (las transacciones se abren explícitamente)"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()  # Si quedó una transacción abierta por un error, se deshace
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().isoformat()
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"] or "{}")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def _recover(self) -> None:
+        """Trabajos cuyo worker dejó de renovar el arrendamiento vuelven a la cola"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._expire_leases(conn)
+            conn.execute("COMMIT")
+
+    def _expire_leases(self, conn: sqlite3.Connection) -> None:
+        """Dentro de una transacción: `running` con arrendamiento caducado → `queued` (o `failed`)
+
+        Los trabajos vivos de otros procesos renuevan su arrendamiento y no se tocan.
+        Los que no tienen arrendamiento vienen de la versión anterior del esquema.
+        """
+        now = time.time()
+        expired = "status = ? AND (lease_until IS NULL OR lease_until < ?)"
+        failed = conn.execute(
+            f"UPDATE jobs SET status = ?, error = ?, worker_id = NULL, lease_until = NULL, updated_at = ? "
+            f"WHERE {expired} AND attempts >= ?",
+            (FAILED, "Interrumpido demasiadas veces", self._now(), RUNNING, now, self.max_attempts)
+        ).rowcount
+        requeued = conn.execute(
+            f"UPDATE jobs SET status = ?, worker_id = NULL, lease_until = NULL, updated_at = ? WHERE {expired}",
+            (QUEUED, self._now(), RUNNING, now)
+        ).rowcount
+        if requeued or failed:
+            logger.info(f"✓ Cola de trabajos: {requeued} reanudados, {failed} fallidos (arrendamiento caducado)")
+
+    # ------------------------------------------------------------------
+    # API para la UI
+    # ------------------------------------------------------------------
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    def enqueue(self, kind: str, filename: str, payload: Optional[Dict] = None) -> str:
+        """Encola un trabajo; si ya hay uno activo del mismo tipo para ese archivo, devuelve ese
+
+        Returns:
+            ID del trabajo
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE kind = ? AND filename = ? AND status IN (?, ?)",
+                (kind, filename, *ACTIVE_STATUSES)
+            ).fetchone()
+            if row:
+                conn.execute("COMMIT")
+                return row["id"]
+            job_id = uuid.uuid4().hex
+            now = self._now()
+            conn.execute(
+                "INSERT INTO jobs (id, kind, filename, payload, status, stage, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, filename, json.dumps(payload or {}), QUEUED, "En cola", now, now)
+            )
+            conn.execute("COMMIT")
+        logger.info(f"✓ Trabajo encolado: {kind} '{filename}' ({job_id[:8]})")
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            return self._to_dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def latest_for(self, filename: str, kind: Optional[str] = None) -> Optional[Dict]:
+        """Último trabajo de un archivo (activo o terminado)"""
+        query = "SELECT * FROM jobs WHERE filename = ?"
+        params: list = [filename]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        with self._connect() as conn:
+            row = conn.execute(query + " ORDER BY created_at DESC LIMIT 1", params).fetchone()
+        return self._to_dict(row)
+
+    def active(self) -> List[Dict]:
+        """Trabajos en cola o en ejecución, del más antiguo al más reciente"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at", ACTIVE_STATUSES
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Arranca los workers (idempotente)"""
+        with self._wakeup:
+            if self._threads:
+                return
+            self._stopping = False
+            for idx in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{idx}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"✓ Cola de trabajos iniciada con {self.workers} workers")
+
+    def stop(self) -> None:
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def _claim(self) -> Optional[Dict]:
+        """Pasa atómicamente el trabajo más antiguo de `queued` a `running` a nombre de este worker"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._expire_leases(conn)
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, worker_id = ?, lease_until = ?, updated_at = ? "
+                "WHERE id = ?",
+                (RUNNING, self.worker_id, time.time() + self.lease_seconds, self._now(), row["id"])
+            )
+            conn.execute("COMMIT")
+        return self._to_dict(row)
+
+    def _update(self, job_id: str, **fields) -> bool:
+        """Actualiza un trabajo de este worker (si otro lo retomó tras caducar, no se toca)
+
+        Returns:
+            False si el trabajo ya no pertenece a este worker
+        """
+        fields["updated_at"] = self._now()
+        if "status" not in fields:
+            fields["lease_until"] = time.time() + self.lease_seconds  # Latido o cambio de etapa: renueva
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            updated = conn.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ? AND worker_id = ?", (*fields.values(), job_id, self.worker_id)
+            ).rowcount
+        return bool(updated)
+
+    def _heartbeat(self, job_id: str, done: threading.Event) -> None:
+        """Renueva el arrendamiento mientras el handler trabaja"""
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                if not self._update(job_id):
+                    logger.warning(f"⚠️ Trabajo {job_id[:8]} retomado por otro worker")
+                    return
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ No se pudo renovar el trabajo {job_id[:8]}: {e}")
+
+    def _work(self) -> None:
+        while not self._stopping:
+            job = self._claim()
+            if job is None:
+                with self._wakeup:
+                    if not self._stopping:
+                        # Despertar al encolar, o cada poco por si otro proceso encoló
+                        self._wakeup.wait(timeout=5)
+                continue
+            self._run(job)
+
+    def _run(self, job: Dict) -> None:
+        handler = self._handlers.get(job["kind"])
+        if handler is None:
+            self._update(job["id"], status=FAILED, error=f"Tipo de trabajo desconocido: {job['kind']}", lease_until=None)
+            return
+        logger.info(f"Trabajo {job['id'][:8]} iniciado: {job['kind']} '{job['filename']}'")
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job["id"], done), daemon=True)
+        heartbeat.start()
+        try:
+            result = handler(job, lambda stage: self._update(job["id"], stage=stage))
+            self._update(job["id"], status=DONE, stage="Completado", result=json.dumps(result or {}), lease_until=None)
+            logger.info(f"✓ Trabajo {job['id'][:8]} completado")
+        except Exception as e:
+            logger.error(f"❌ Trabajo {job['id'][:8]} falló: {type(e).__name__} - {str(e)[:200]}")
+            self._update(job["id"], status=FAILED, error=f"{type(e).__name__}: {str(e)[:500]}", lease_until=None)
+        finally:
+            done.set()
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Cola compartida del proceso, con los handlers del pipeline registrados y los workers en marcha"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            # Import diferido: el pipeline carga Transcriber/Gemini
+            from pipeline import PIPELINE_HANDLERS
+            _queue = JobQueue(handlers=PIPELINE_HANDLERS)
+            _queue.start()
+        return _queue
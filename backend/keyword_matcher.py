@@ -0,0 +1,147 @@
+"""keyword_matcher.py - Búsqueda multi-palabra clave en una pasada (Aho-Corasick)"""
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class KeywordMatcher:
+    """Autómata Aho-Corasick sobre un conjunto de patrones
+
+    Se construye una vez por conjunto de palabras clave y encuentra todas
+    las apariciones de todos los patrones recorriendo el texto una sola vez:
+    O(N + coincidencias) en lugar de O(K·N) comprobaciones `in`.
+
+    Cada patrón tiene una etiqueta (la palabra clave o el tema al que
+    pertenece), de modo que varias variantes pueden reportarse bajo el
+    mismo nombre.
+    """
+
+    def __init__(self, patterns: Dict[str, str]):
+        """
+        Args:
+            patterns: {patrón: etiqueta}. Los patrones se comparan en minúsculas.
+        """
+        self.patterns: List[str] = []
+        self.labels: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        # Normalizados y sin duplicados (gana la primera etiqueta), en O(K)
+        normalized: Dict[str, str] = {}
+        for pattern, label in patterns.items():
+            normalized.setdefault(pattern.lower().strip(), label)
+        normalized.pop("", None)
+        for pattern, label in normalized.items():
+            self._add(pattern, len(self.patterns))
+            self.patterns.append(pattern)
+            self.labels.append(label)
+        self._build_failure_links()
+
+    @classmethod
+    def from_keywords(cls, keywords: Iterable[str]) -> "KeywordMatcher":
+        """Cada palabra clave es su propia etiqueta"""
+        return cls({kw: kw for kw in keywords})
+
+    @classmethod
+    def from_keywords_dict(cls, keywords_dict: Dict, topics: Optional[Iterable[str]] = None) -> "KeywordMatcher":
+        """Patrones desde `keywords_dict.json`: nombre del tema + sus `variantes`
+
+        Args:
+            keywords_dict: Contenido de keywords_dict.json
+            topics: Limitar a estos temas (por defecto todos)
+        """
+        patterns: Dict[str, str] = {}
+        temas = keywords_dict.get("temas_de_interes", {})
+        for topic, data in temas.items():
+            if topics is not None and topic not in topics:
+                continue
+            patterns.setdefault(topic, topic)
+            for variant in data.get("variantes", []):
+                patterns.setdefault(variant, topic)
+        return cls(patterns)
+
+    def _add(self, pattern: str, index: int) -> None:
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = nxt
+        self._output[state].append(index)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    def find_all(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """Recorre el texto una vez y devuelve (inicio, fin, índice_patrón) de cada aparición
+
+        El texto debe estar ya en minúsculas.
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for pos, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                yield pos - len(self.patterns[index]) + 1, pos + 1, index
+
+
+@lru_cache(maxsize=32)
+def compile_keywords(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    """Autómata cacheado por conjunto de palabras clave"""
+    return KeywordMatcher.from_keywords(keywords)
+
+
+if __name__ == "__main__":
+    # Benchmark: autómata vs. bucle palabra clave × palabra (implementación anterior)
+    import random
+    import string
+    import time
+
+    random.seed(7)
+    vocabulary = ["".join(random.choices(string.ascii_lowercase, k=random.randint(3, 10))) for _ in range(20000)]
+    # ~150 palabras/minuto → una hora de reunión ≈ 9.000 palabras
+    words = random.choices(vocabulary, k=9000)
+    text = " ".join(words)
+
+    def naive(keywords):
+        hits = 0
+        for keyword in keywords:
+            for word in words:
+                if keyword in word:
+                    hits += 1
+        return hits
+
+    def automaton(keywords):
+        matcher = KeywordMatcher.from_keywords(keywords)
+        return sum(1 for _ in matcher.find_all(text))
+
+    print(f"{'keywords':>9} | {'naive (s)':>10} | {'aho-corasick (s)':>17}")
+    for count in (10, 100, 1000, 5000):
+        keywords = random.sample(vocabulary, count)
+        start = time.perf_counter()
+        naive_time = None
+        if count <= 1000:
+            naive(keywords)
+            naive_time = time.perf_counter() - start
+        start = time.perf_counter()
+        automaton(keywords)
+        ac_time = time.perf_counter() - start
+        naive_str = f"{naive_time:.3f}" if naive_time is not None else "-"
+        print(f"{count:>9} | {naive_str:>10} | {ac_time:>17.3f}")
@@ -0,0 +1,171 @@
+"""pipeline.py - Trabajos en segundo plano: transcribir → guardar → analizar oportunidades"""
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from logger import get_logger
+from Transcriber import Transcriber
+from Model import Model
+from OpportunitiesManager import OpportunitiesManager
+from audio_cache import get_audio_cache
+from recordings_catalog import get_recordings_catalog
+from transcript_index import get_transcript_index_store
+from summary_store import get_summary_store
+from hierarchical_summary import HierarchicalSummarizer
+import database as db_utils
+
+logger = get_logger(__name__)
+
+# Un Transcriber y un Model compartidos por los workers (seguros entre hilos: no guardan estado por llamada)
+_transcriber: Optional[Transcriber] = None
+_transcriber_lock = threading.Lock()
+_chat_model: Optional[Model] = None
+_chat_model_lock = threading.Lock()
+
+
+def _get_transcriber() -> Transcriber:
+    global _transcriber
+    with _transcriber_lock:
+        if _transcriber is None:
+            _transcriber = Transcriber()
+        return _transcriber
+
+
+def _get_chat_model() -> Model:
+    global _chat_model
+    with _chat_model_lock:
+        if _chat_model is None:
+            _chat_model = Model()
+        return _chat_model
+
+
+def transcribe_and_analyze(
+    filename: str,
+    audio_path: str,
+    audio_hash: Optional[str] = None,
+    set_stage: Callable[[str], None] = lambda stage: None,
+    enqueue_summary: bool = False
+) -> Dict:
+    """Transcribe un audio local de una grabación ya guardada y genera sus tickets
+
+    Args:
+        filename: Nombre de la grabación en BD
+        audio_path: Ruta local del audio
+        audio_hash: SHA-256 del audio (clave de la caché de transcripciones)
+        set_stage: Publica la etapa actual
+        enqueue_summary: Encolar el resumen en cuanto se guarda la transcripción
+                         (se genera en otro worker, en paralelo a los tickets)
+
+    Returns:
+        Resumen del resultado
+    """
+    set_stage("Transcribiendo")
+    transcription = _get_transcriber().transcript_audio(audio_path, audio_hash=audio_hash)
+
+    set_stage("Guardando transcripción")
+    transcription_id = db_utils.save_transcription(
+        recording_filename=filename,
+        content=transcription.text,
+        language="es"
+    )
+    if not transcription_id:
+        raise RuntimeError(f"No se pudo guardar la transcripción de '{filename}'")
+    catalog = get_recordings_catalog()
+    catalog.mark_transcribed(filename)
+
+    # El índice del chat se construye una vez aquí y no en la primera pregunta
+    try:
+        get_transcript_index_store().get(transcription.text)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo indexar la transcripción de '{filename}': {type(e).__name__} - {str(e)}")
+
+    if enqueue_summary:
+        # Import diferido: job_queue carga este módulo al crear la cola
+        from job_queue import get_job_queue
+        get_job_queue().enqueue("summarize", filename, {"transcription_id": transcription_id})
+
+    # Un fallo del análisis no invalida la transcripción ya guardada
+    set_stage("Generando tickets")
+    try:
+        num_opportunities, saved_opps = OpportunitiesManager().analyze_opportunities_with_ai(
+            transcription=transcription.text,
+            audio_filename=filename,
+            recording_id=catalog.id_for(filename)
+        )
+    except Exception as e:
+        logger.error(f"❌ Análisis de IA falló para '{filename}': {type(e).__name__} - {str(e)}")
+        num_opportunities, saved_opps = 0, []
+
+    return {
+        "transcription_id": transcription_id,
+        "chars": len(transcription.text),
+        "opportunities_detected": num_opportunities,
+        "opportunities_saved": len(saved_opps) if saved_opps else 0,
+    }
+
+
+def run_transcription_pipeline(job: Dict, set_stage: Callable[[str], None]) -> Dict:
+    """Handler de la cola: descarga el audio de una grabación y lo transcribe y analiza
+
+    Args:
+        job: Trabajo de la cola (`filename` y `payload` con `audio_hash` opcional)
+        set_stage: Publica la etapa actual para la UI
+
+    Returns:
+        Resumen del resultado (se guarda en la cola y lo muestra la UI)
+    """
+    filename = job["filename"]
+    payload = job.get("payload") or {}
+
+    set_stage("Descargando audio")
+    # Fijado mientras se usa: otra sesión o worker no puede expulsarlo a mitad de la transcripción
+    with get_audio_cache().use(filename) as audio_path:
+        if not audio_path:
+            raise FileNotFoundError(f"No se pudo descargar el audio '{filename}' de Storage")
+        return transcribe_and_analyze(filename, audio_path, payload.get("audio_hash"), set_stage, enqueue_summary=True)
+
+
+def generate_summary(filename: str, transcription_id: str, text: str) -> str:
+    """Resumen memoizado de una transcripción (se genera solo si no existe para esta versión)
+
+    Args:
+        filename: Grabación (reutiliza el contexto del chat cacheado en Gemini)
+        transcription_id: ID de la fila en `transcriptions`
+        text: Contenido de la transcripción
+
+    Returns:
+        Texto del resumen
+    """
+    return get_summary_store().get_or_generate(
+        transcription_id,
+        text,
+        # Reuniones largas: resumen por ventanas y combinación (nodos cacheados)
+        lambda prompt, context: HierarchicalSummarizer(_get_chat_model()).summarize(context, prompt, cache_key=filename)
+    )
+
+
+def run_summary_job(job: Dict, set_stage: Callable[[str], None]) -> Dict:
+    """Handler de la cola: resumen de la transcripción más reciente de una grabación
+
+    Args:
+        job: Trabajo de la cola (`filename`)
+        set_stage: Publica la etapa actual para la UI
+
+    Returns:
+        Resumen del resultado
+    """
+    filename = job["filename"]
+    set_stage("Generando resumen")
+    transcription = db_utils.get_transcription_by_filename(filename)
+    if not transcription:
+        raise RuntimeError(f"No hay transcripción de '{filename}' que resumir")
+    summary = generate_summary(filename, transcription["id"], transcription["content"])
+    return {"transcription_id": transcription["id"], "chars": len(summary)}
+
+
+PIPELINE_HANDLERS = {
+    "transcribe": run_transcription_pipeline,
+    "summarize": run_summary_job,
+}
@@ -0,0 +1,175 @@
+"""recording_resolver.py - Resolución memorizada filename → recording_id"""
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import RECORDING_ID_CACHE_SIZE, RECORDING_ID_TTL_SECONDS, RECORDING_ID_NEGATIVE_TTL_SECONDS
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# Igual que la búsqueda anterior por coincidencia parcial: solo las más recientes
+FUZZY_SCAN_LIMIT = 20
+
+
+def _default_catalog():
+    # Import diferido: recordings_catalog importa database, que importa este módulo
+    from recordings_catalog import get_recordings_catalog
+    return get_recordings_catalog()
+
+
+def _default_db():
+    from database import init_supabase
+    return init_supabase()
+
+
+class RecordingIdResolver:
+    """Caché LRU con TTL de filename → recording_id
+
+    Los aciertos se guardan `ttl` segundos y los fallos `negative_ttl`, para
+    que una grabación recién subida aparezca enseguida. Primero se busca el
+    nombre exacto (catálogo en memoria y, si no está, BD); solo si no existe
+    se prueban variaciones (sin extensión, coincidencia parcial) en el
+    catálogo. Esas coincidencias aproximadas se guardan solo `negative_ttl`
+    segundos: el catálogo puede ir por detrás y la grabación exacta aparecer
+    enseguida.
+    """
+
+    def __init__(
+        self,
+        catalog_getter: Callable = _default_catalog,
+        db_getter: Callable = _default_db,
+        max_entries: int = RECORDING_ID_CACHE_SIZE,
+        ttl: float = RECORDING_ID_TTL_SECONDS,
+        negative_ttl: float = RECORDING_ID_NEGATIVE_TTL_SECONDS
+    ):
+        self._catalog_getter = catalog_getter
+        self._db_getter = db_getter
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()  # filename → (id, expira)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, filename: str) -> Optional[str]:
+        """Devuelve el recording_id de un filename (o None si no existe)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(filename)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        recording_id, exact = self._lookup(filename)
+        self._store(filename, recording_id, exact)
+        return recording_id
+
+    def _store(self, filename: str, recording_id: Optional[str], exact: bool = True) -> None:
+        expires = time.monotonic() + (self.ttl if recording_id and exact else self.negative_ttl)
+        with self._lock:
+            self._entries[filename] = (recording_id, expires)
+            self._entries.move_to_end(filename)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, filename: Optional[str] = None) -> None:
+        """Olvida un filename (o todos si no se indica)"""
+        with self._lock:
+            if filename is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(filename, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    # ------------------------------------------------------------------
+    # Búsqueda
+    # ------------------------------------------------------------------
+
+    def _lookup(self, filename: str) -> Tuple[Optional[str], bool]:
+        """Busca el recording_id
+
+        Returns:
+            (recording_id o None, si la coincidencia es por nombre exacto)
+        """
+        rows: List[Dict] = []
+        try:
+            catalog = self._catalog_getter()
+            catalog.refresh()
+            rows = catalog.rows()
+        except Exception as e:
+            logger.debug(f"Catálogo no disponible para resolver {filename}: {type(e).__name__}")
+
+        by_name: Dict[str, str] = {}
+        for row in rows:
+            by_name.setdefault(row["filename"], row["id"])
+        if filename in by_name:
+            return by_name[filename], True
+
+        # El catálogo puede ir unos segundos por detrás: confirmar el nombre exacto en BD
+        # antes de aceptar una variación (que podría ser otra grabación parecida)
+        recording_id = self._query_exact(filename)
+        if recording_id:
+            logger.info(f"✅ Recording encontrado en BD: {recording_id}")
+            return recording_id, True
+
+        recording_id = self._match_fuzzy(filename, rows, by_name)
+        if not recording_id:
+            logger.warning(f"❌ Recording no encontrado con ninguna variación: {filename}")
+        return recording_id, False
+
+    @staticmethod
+    def _match_fuzzy(filename: str, rows: List[Dict], by_name: Dict[str, str]) -> Optional[str]:
+        """Sin extensión o coincidencia parcial entre las más recientes"""
+
+        filename_no_ext = filename.rsplit('.', 1)[0] if '.' in filename else filename
+        if filename_no_ext in by_name:
+            logger.info(f"✅ Recording encontrado (sin extensión): {by_name[filename_no_ext]}")
+            return by_name[filename_no_ext]
+
+        main_part = filename.split(" - ")[0].strip() if " - " in filename else filename_no_ext[:20]
+        for row in rows[:FUZZY_SCAN_LIMIT]:
+            if main_part.lower() in row["filename"].lower():
+                logger.info(f"✅ Recording encontrado (coincidencia parcial): {row['id']} ({row['filename']})")
+                return row["id"]
+        return None
+
+    def _query_exact(self, filename: str) -> Optional[str]:
+        try:
+            db = self._db_getter()
+            if not db:
+                return None
+            result = db.table("recordings").select("id").eq("filename", filename).execute()
+            return result.data[0]["id"] if result.data else None
+        except Exception as e:
+            logger.error(f"get_recording_id: {type(e).__name__} - {str(e)}")
+            return None
+
+
+_resolver: Optional[RecordingIdResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_recording_resolver() -> RecordingIdResolver:
+    """Resolver compartido por todas las sesiones del proceso"""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = RecordingIdResolver()
+        return _resolver
+
+
+def invalidate_recording_id(filename: Optional[str] = None) -> None:
+    """Invalida el resolver compartido (no lo crea si aún no existe)"""
+    if _resolver is not None:
+        _resolver.invalidate(filename)
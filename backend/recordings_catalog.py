@@ -0,0 +1,178 @@
+"""recordings_catalog.py - Instantánea en memoria de la tabla recordings"""
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import REFRESH_INTERVAL_SECONDS, CATALOG_FULL_REFRESH_SECONDS
+from logger import get_logger
+from database import (
+    init_supabase, prime_transcription_status, with_transcribed_filters, is_transcribed_row, TRANSCRIBED_COLUMNS
+)
+
+logger = get_logger(__name__)
+
+CATALOG_COLUMNS = f"id, filename, created_at, updated_at, {TRANSCRIBED_COLUMNS}"
+
+
+class RecordingsCatalog:
+    """Lista de grabaciones (id, filename, created_at, transcrita) servida desde memoria
+
+    La primera carga trae la tabla completa; después solo se piden las filas
+    con `created_at`/`updated_at` posteriores a la marca de agua. Los borrados
+    no se ven con marcas de agua, así que se aplican localmente con `remove()`
+    y cada `full_refresh_interval` segundos se recarga todo.
+    """
+
+    def __init__(
+        self,
+        db_getter: Callable = init_supabase,
+        refresh_interval: float = REFRESH_INTERVAL_SECONDS,
+        full_refresh_interval: float = CATALOG_FULL_REFRESH_SECONDS
+    ):
+        self._db_getter = db_getter
+        self.refresh_interval = refresh_interval
+        self.full_refresh_interval = full_refresh_interval
+        self._rows: Dict[str, Dict] = {}  # id → fila
+        self._watermark: Optional[str] = None
+        self._last_full = 0.0
+        self._last_check = 0.0
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _to_row(record: Dict) -> Dict:
+        return {
+            "id": record["id"],
+            "filename": record["filename"],
+            "created_at": record.get("created_at") or "",
+            "updated_at": record.get("updated_at") or "",
+            "transcribed": is_transcribed_row(record),
+        }
+
+    def _advance_watermark(self, rows: List[Dict]) -> None:
+        for row in rows:
+            latest = max(row["created_at"], row["updated_at"])
+            if latest and (self._watermark is None or latest > self._watermark):
+                self._watermark = latest
+
+    def _full_load(self, db) -> None:
+        response = with_transcribed_filters(
+            db.table("recordings").select(CATALOG_COLUMNS)
+        ).order("created_at", desc=True).execute()
+        rows = [self._to_row(r) for r in (response.data or [])]
+        self._rows = {row["id"]: row for row in rows}
+        self._watermark = None
+        self._advance_watermark(rows)
+        prime_transcription_status({row["filename"]: row["transcribed"] for row in rows})
+        self._last_full = time.monotonic()
+        logger.info(f"✓ Catálogo cargado: {len(rows)} grabaciones")
+
+    def _incremental_load(self, db) -> None:
+        if self._watermark is None:
+            return self._full_load(db)
+        wm = self._watermark
+        response = with_transcribed_filters(
+            db.table("recordings").select(CATALOG_COLUMNS)
+        ).or_(f"created_at.gt.{wm},updated_at.gt.{wm}").execute()
+        rows = [self._to_row(r) for r in (response.data or [])]
+        for row in rows:
+            self._rows[row["id"]] = row
+        self._advance_watermark(rows)
+        prime_transcription_status({row["filename"]: row["transcribed"] for row in rows})
+        if rows:
+            logger.info(f"✓ Catálogo: {len(rows)} grabaciones nuevas/modificadas")
+
+    def refresh(self, force: bool = False, full: bool = False) -> None:
+        """Sincroniza con la BD si ha pasado el intervalo de refresco
+
+        Args:
+            force: Ignora el intervalo de refresco
+            full: Recarga completa en vez de incremental
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_check < self.refresh_interval:
+                return
+            db = self._db_getter()
+            if not db:
+                logger.warning("Catálogo: BD no disponible")
+                return
+            try:
+                if full or not self._last_full or now - self._last_full >= self.full_refresh_interval:
+                    self._full_load(db)
+                else:
+                    self._incremental_load(db)
+                self._last_check = now
+            except Exception as e:
+                logger.error(f"Catálogo: error refrescando - {type(e).__name__} - {str(e)[:100]}")
+
+    # ------------------------------------------------------------------
+    # Consultas (memoria)
+    # ------------------------------------------------------------------
+
+    def rows(self) -> List[Dict]:
+        """Filas ordenadas de más reciente a más antigua"""
+        with self._lock:
+            return sorted(self._rows.values(), key=lambda r: r["created_at"], reverse=True)
+
+    def filenames(self) -> List[str]:
+        return [row["filename"] for row in self.rows()]
+
+    def filename_map(self) -> Dict[str, str]:
+        """Mapeo filename → recording_id"""
+        with self._lock:
+            return {row["filename"]: row["id"] for row in self._rows.values()}
+
+    def id_for(self, filename: str) -> Optional[str]:
+        return self.filename_map().get(filename)
+
+    def is_transcribed(self, filename: str) -> bool:
+        with self._lock:
+            return any(row["transcribed"] for row in self._rows.values() if row["filename"] == filename)
+
+    # ------------------------------------------------------------------
+    # Cambios locales (evitan esperar a la siguiente recarga)
+    # ------------------------------------------------------------------
+
+    def _find(self, filename: str) -> Optional[Dict]:
+        for row in self._rows.values():
+            if row["filename"] == filename:
+                return row
+        return None
+
+    def remove(self, filename: str) -> None:
+        with self._lock:
+            row = self._find(filename)
+            if row:
+                del self._rows[row["id"]]
+
+    def rename(self, old_filename: str, new_filename: str) -> None:
+        with self._lock:
+            row = self._find(old_filename)
+            if row:
+                row["filename"] = new_filename
+
+    def mark_transcribed(self, filename: str, transcribed: bool = True) -> None:
+        with self._lock:
+            row = self._find(filename)
+            if row:
+                row["transcribed"] = transcribed
+
+
+_catalog: Optional[RecordingsCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_recordings_catalog() -> RecordingsCatalog:
+    """Catálogo compartido por todas las sesiones del proceso"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = RecordingsCatalog()
+        return _catalog
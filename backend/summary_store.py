@@ -0,0 +1,153 @@
+"""summary_store.py - Resúmenes de reuniones memoizados por versión de transcripción"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import CHAT_MODEL, SUMMARIES_DIR, SUMMARIES_MAX_MB
+from logger import get_logger
+import database as db_utils
+from helpers import atomic_write_json, evict_lru
+
+logger = get_logger(__name__)
+
+SUMMARY_PROMPT = (
+    "Por favor genera un resumen profesional y conciso. Incluye: 1) Tema principal, "
+    "2) Puntos clave discutidos, 3) Decisiones o acciones importantes."
+)
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SummaryStore:
+    """Resúmenes por (transcripción, hash del prompt, modelo)
+
+    La fuente de verdad es la tabla `summaries` de Supabase (compartida por
+    todas las sesiones e instancias); `mirror_dir` guarda una copia local
+    para no consultar la BD en cada vista. Cada resumen lleva el hash del
+    texto resumido: si la transcripción se edita en su sitio, el resumen
+    deja de valer y se regenera.
+    """
+
+    def __init__(
+        self,
+        mirror_dir: Path = SUMMARIES_DIR,
+        max_bytes: int = SUMMARIES_MAX_MB * 1024 * 1024,
+        prompt: str = SUMMARY_PROMPT,
+        model: str = CHAT_MODEL
+    ):
+        self.mirror_dir = Path(mirror_dir)
+        self.mirror_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.prompt = prompt
+        self.prompt_hash = prompt_hash(prompt)
+        self.model = model
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def _key(self, transcription_id: str) -> str:
+        return hashlib.sha256(f"{transcription_id}:{self.prompt_hash}:{self.model}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.mirror_dir / f"{key}.json"
+
+    def get(self, transcription_id: str, text: str) -> Optional[str]:
+        """Resumen guardado de esta versión de la transcripción, o None
+
+        Args:
+            transcription_id: ID de la fila en `transcriptions`
+            text: Contenido actual de la transcripción
+        """
+        key = self._key(transcription_id)
+        expected = content_hash(text)
+        summary = self._get_local(key, expected)
+        if summary is not None:
+            return summary
+        row = db_utils.get_summary(transcription_id, self.prompt_hash, self.model)
+        if row and row.get("content_hash") == expected:
+            self._put_local(key, expected, row["summary"])
+            return row["summary"]
+        return None
+
+    def get_or_generate(self, transcription_id: str, text: str, generate: Callable[[str, str], str]) -> str:
+        """Resumen de la transcripción: guardado si existe, si no se genera y se guarda
+
+        Dos peticiones simultáneas del mismo resumen (p.ej. el worker y una
+        sesión) comparten una sola generación.
+
+        Args:
+            transcription_id: ID de la fila en `transcriptions`
+            text: Contenido actual de la transcripción
+            generate: Función (prompt, texto) → resumen
+
+        Returns:
+            Texto del resumen
+        """
+        with self._key_lock(transcription_id):
+            summary = self.get(transcription_id, text)
+            if summary is not None:
+                logger.info(f"✓ Resumen desde caché: {transcription_id}")
+                return summary
+            summary = generate(self.prompt, text)
+            expected = content_hash(text)
+            self._put_local(self._key(transcription_id), expected, summary)
+            if not db_utils.save_summary(transcription_id, self.prompt_hash, self.model, expected, summary):
+                logger.warning(f"⚠️ Resumen de {transcription_id} guardado solo en local")
+            return summary
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _key_lock(self, transcription_id: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(transcription_id, threading.Lock())
+
+    def _get_local(self, key: str, expected: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("content_hash") != expected:
+                return None
+            os.utime(path, None)  # Marcar como usado recientemente
+            return data.get("summary")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Resumen local inválido {key[:12]}: {type(e).__name__}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def _put_local(self, key: str, expected: str, summary: str) -> None:
+        """Escritura atómica en el espejo local, con el mismo LRU por mtime que las demás cachés"""
+        payload = {"summary": summary, "content_hash": expected, "created_at": datetime.now().isoformat()}
+        try:
+            with self._lock:
+                atomic_write_json(self._path(key), payload)
+                evict_lru(self.mirror_dir, self.max_bytes)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el resumen en local: {type(e).__name__} - {e}")
+
+
+_store: Optional[SummaryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_summary_store() -> SummaryStore:
+    """Almacén compartido por las sesiones y los workers de la cola"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SummaryStore()
+        return _store
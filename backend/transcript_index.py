@@ -0,0 +1,193 @@
+"""transcript_index.py - Índice BM25 por transcripción para el chat con recuperación"""
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import TRANSCRIPT_INDEX_DIR, TRANSCRIPT_INDEX_MAX_MB, RETRIEVAL_CHUNK_CHARS
+from logger import get_logger
+from transcript_utils import parse_turns, format_turns, split_turn_windows
+from helpers import atomic_write_json, evict_lru
+
+logger = get_logger(__name__)
+
+# Cambiarla invalida los índices guardados (troceado o tokenizado distintos)
+INDEX_VERSION = "1"
+BM25_K1 = 1.5
+BM25_B = 0.75
+MAX_LOADED_INDEXES = 16  # Índices que se mantienen en memoria (LRU)
+
+# Palabras vacías en español (sin tildes: se comparan tras normalizar)
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes como con contra cual cuales cuando de del desde
+donde durante e el ella ellas ellos en entre era eran es esa esas ese eso esos esta estaba estan estar
+este esto estos fue fueron ha habia han hay la las le les lo los mas me mi mis mucho muy nada ni no nos
+nosotros o os otra otro para pero poco por porque que quien se sea ser si sin sobre son su sus tambien
+te tiene tienen todo todos tu tus un una unas uno unos y ya yo dijo dice decir hablo
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Términos en minúsculas y sin tildes, sin palabras vacías ni letras sueltas"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return [term for term in re.findall(r"\w+", text) if len(term) > 1 and term not in STOPWORDS]
+
+
+def chunk_transcription(transcription: str, max_chars: int = RETRIEVAL_CHUNK_CHARS) -> List[str]:
+    """Trocea por intervenciones: se agrupan turnos completos hasta `max_chars`
+
+    Las líneas de continuación se unen antes a su intervención, así que cada
+    fragmento conserva el nombre de quien habla.
+    """
+    return split_turn_windows(format_turns(parse_turns(transcription)), max_chars)
+
+
+class TranscriptIndex:
+    """Índice invertido BM25 sobre los fragmentos de una transcripción"""
+
+    def __init__(self, chunks: List[str], speakers: List[str], postings: Dict[str, List[List[int]]], lengths: List[int]):
+        self.chunks = chunks
+        self.speakers = speakers
+        self.postings = postings  # término → [[fragmento, frecuencia], ...]
+        self.lengths = lengths
+        self.avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+    @classmethod
+    def build(cls, transcription: str, max_chars: int = RETRIEVAL_CHUNK_CHARS) -> "TranscriptIndex":
+        chunks = chunk_transcription(transcription, max_chars)
+        speakers = list(dict.fromkeys(speaker for speaker, _ in parse_turns(transcription) if speaker))
+        postings: Dict[str, List[List[int]]] = {}
+        lengths = []
+        for position, chunk in enumerate(chunks):
+            terms = tokenize(chunk)
+            lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                postings.setdefault(term, []).append([position, frequency])
+        return cls(chunks, speakers, postings, lengths)
+
+    def search(self, query: str, k: int) -> List[int]:
+        """Posiciones de los `k` fragmentos con mayor puntuación BM25 para `query`"""
+        total = len(self.chunks)
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            entries = self.postings.get(term)
+            if not entries:
+                continue
+            idf = math.log(1 + (total - len(entries) + 0.5) / (len(entries) + 0.5))
+            for position, frequency in entries:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[position] / (self.avg_length or 1))
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return heapq.nlargest(k, scores, key=scores.get)
+
+    def select(self, query: str, k: int) -> List[str]:
+        """Fragmentos a enviar al modelo, en orden cronológico
+
+        Si la pregunta no comparte ningún término con la transcripción (p.ej.
+        "¿de qué trata?") se envían `k` fragmentos repartidos por toda la reunión.
+        """
+        total = len(self.chunks)
+        if total <= k:
+            return list(self.chunks)
+        positions = self.search(query, k)
+        if not positions:
+            positions = [round(i * (total - 1) / (k - 1)) for i in range(k)] if k > 1 else [0]
+        return [self.chunks[position] for position in sorted(set(positions))]
+
+    def to_dict(self) -> Dict:
+        return {"chunks": self.chunks, "speakers": self.speakers, "postings": self.postings, "lengths": self.lengths}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TranscriptIndex":
+        return cls(data["chunks"], data["speakers"], data["postings"], data["lengths"])
+
+
+class TranscriptIndexStore:
+    """Índices persistidos en `index_dir`, uno por versión de cada transcripción
+
+    La clave es el SHA-256 del texto: el índice se construye una vez por
+    transcripción (al guardarla o en la primera pregunta) y una edición genera
+    uno nuevo. Igual que la caché de transcripciones, el mtime marca el último
+    uso y se expulsan los menos usados al superar `max_bytes`.
+    """
+
+    def __init__(self, index_dir: Path = TRANSCRIPT_INDEX_DIR, max_bytes: int = TRANSCRIPT_INDEX_MAX_MB * 1024 * 1024):
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._loaded: "OrderedDict[str, TranscriptIndex]" = OrderedDict()
+
+    @staticmethod
+    def make_key(transcription: str) -> str:
+        return hashlib.sha256(f"{INDEX_VERSION}:{RETRIEVAL_CHUNK_CHARS}:{transcription}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.index_dir / f"{key}.json"
+
+    def get(self, transcription: str) -> TranscriptIndex:
+        """Índice de la transcripción: de memoria, de disco o construido y guardado"""
+        key = self.make_key(transcription)
+        with self._lock:
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                return self._loaded[key]
+
+        index = self._load(key)
+        if index is None:
+            index = TranscriptIndex.build(transcription)
+            self._save(key, index)
+            logger.info(f"✓ Índice de transcripción creado: {len(index.chunks)} fragmentos, {len(index.postings)} términos")
+
+        with self._lock:
+            self._loaded[key] = index
+            while len(self._loaded) > MAX_LOADED_INDEXES:
+                self._loaded.popitem(last=False)
+        return index
+
+    def _load(self, key: str) -> Optional[TranscriptIndex]:
+        path = self._path(key)
+        try:
+            with self._lock:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                os.utime(path, None)  # Marcar como usado recientemente
+            return TranscriptIndex.from_dict(data)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Índice de transcripción inválido {key[:12]}: {type(e).__name__}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def _save(self, key: str, index: TranscriptIndex) -> None:
+        """Escritura atómica; un fallo solo impide reutilizarlo tras reiniciar"""
+        payload = {**index.to_dict(), "created_at": datetime.now().isoformat()}
+        try:
+            with self._lock:
+                atomic_write_json(self._path(key), payload)
+                evict_lru(self.index_dir, self.max_bytes)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el índice de transcripción: {type(e).__name__} - {e}")
+
+
+_store: Optional[TranscriptIndexStore] = None
+_store_lock = threading.Lock()
+
+
+def get_transcript_index_store() -> TranscriptIndexStore:
+    """Almacén compartido por todo el proceso (chat y pipeline)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TranscriptIndexStore()
+        return _store
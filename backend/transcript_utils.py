@@ -0,0 +1,174 @@
+"""transcript_utils.py - Utilidades para transcripciones con formato 'Hablante: "texto"'"""
+import re
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+# Mismo formato que genera el prompt de transcripción: Nombre: "Lo que dijo..."
+TURN_PATTERN = re.compile(r'^([^:]{1,60}):\s*["\']?(.+?)["\']?\s*$')
+
+
+def parse_turns(transcription: str) -> List[Tuple[str, str]]:
+    """Divide una transcripción en intervenciones (hablante, texto)
+
+    Las líneas que no siguen el formato se añaden a la intervención anterior
+    (o a un hablante vacío si aparecen al principio).
+
+    Args:
+        transcription: Texto con una intervención por línea
+
+    Returns:
+        Lista de tuplas (hablante, texto) en orden
+    """
+    turns: List[Tuple[str, str]] = []
+    for line in transcription.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        match = TURN_PATTERN.match(line)
+        if match:
+            turns.append((match.group(1).strip(), match.group(2).strip()))
+        elif turns:
+            speaker, text = turns[-1]
+            turns[-1] = (speaker, f"{text} {line}")
+        else:
+            turns.append(("", line))
+    return turns
+
+
+def format_turns(turns: List[Tuple[str, str]]) -> str:
+    """Reconstruye el texto de la transcripción a partir de intervenciones"""
+    return "\n".join(
+        f'{speaker}: "{text}"' if speaker else text
+        for speaker, text in turns
+    )
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r'\W+', ' ', text.lower()).strip()
+
+
+def text_similarity(a: str, b: str) -> float:
+    """Similitud 0..1 entre dos textos ignorando mayúsculas y puntuación"""
+    a_norm, b_norm = _normalize(a), _normalize(b)
+    if not a_norm or not b_norm:
+        return 0.0
+    return SequenceMatcher(None, a_norm, b_norm, autojunk=False).ratio()
+
+
+# Intervenciones más cortas ("Sí.", "Vale.") se repiten en cualquier parte: no prueban un solape
+MIN_OVERLAP_CHARS = 20
+
+
+def stitch_transcriptions(
+    parts: List[str], min_similarity: float = 0.75, lookback: int = 12, min_chars: int = MIN_OVERLAP_CHARS
+) -> str:
+    """Une transcripciones de fragmentos solapados en una sola
+
+    Cada fragmento comparte unos segundos con el anterior. Las intervenciones
+    del solape aparecen en ambos, así que se usan para:
+      1. Descartar las intervenciones repetidas al inicio del fragmento: solo
+         el prefijo contiguo que coincide con el final del acumulado (se para
+         en la primera intervención que no coincide). Las intervenciones de
+         menos de `min_chars` no confirman ni cortan el solape: se descartan
+         solo si una intervención posterior del prefijo coincide.
+      2. Mapear las etiquetas del fragmento a las ya usadas (p.ej. la 'Voz 1'
+         de un fragmento puede ser 'Carlos' o la 'Voz 2' del anterior).
+         Sin evidencia en el solape se reutiliza el mapeo del fragmento previo.
+
+    Args:
+        parts: Transcripciones de cada fragmento, en orden temporal
+        min_similarity: Similitud mínima para considerar dos intervenciones iguales
+        lookback: Número de intervenciones finales del acumulado a comparar
+        min_chars: Longitud mínima (normalizada) para que una intervención cuente como solape
+
+    Returns:
+        Transcripción completa con etiquetas de hablante consistentes
+    """
+    merged: List[Tuple[str, str]] = []
+    # Mapeos aprendidos en fragmentos anteriores: se reutilizan cuando el solape
+    # actual no aporta evidencia para una etiqueta
+    carried_map: Dict[str, str] = {}
+    for part in parts:
+        turns = parse_turns(part)
+        if not turns:
+            continue
+        if not merged:
+            merged.extend(turns)
+            continue
+
+        tail = merged[-lookback:]
+        speaker_map: Dict[str, str] = {}
+        skip_until = 0
+        # Las intervenciones del solape están al principio del fragmento
+        for idx, (speaker, text) in enumerate(turns[:lookback]):
+            if len(_normalize(text)) < min_chars:
+                continue
+            best_score, best_speaker = 0.0, None
+            for prev_speaker, prev_text in tail:
+                score = text_similarity(text, prev_text)
+                if score > best_score:
+                    best_score, best_speaker = score, prev_speaker
+            if best_score < min_similarity:
+                break
+            skip_until = idx + 1
+            if speaker and best_speaker and speaker not in speaker_map:
+                speaker_map[speaker] = best_speaker
+
+        for speaker, mapped in carried_map.items():
+            speaker_map.setdefault(speaker, mapped)
+        carried_map = speaker_map
+
+        # Las etiquetas del fragmento se traducen a las ya usadas en el acumulado
+        for speaker, text in turns[skip_until:]:
+            merged.append((speaker_map.get(speaker, speaker), text))
+    return format_turns(merged)
+
+
+def _split_long_line(line: str, max_chars: int) -> List[str]:
+    """Corta una intervención demasiado larga por frases (o por espacios si hace falta)"""
+    pieces, current = [], ""
+    for sentence in re.split(r'(?<=[.!?…])\s+', line):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_turn_windows(transcription: str, max_chars: int) -> List[str]:
+    """Agrupa intervenciones completas en ventanas de como máximo `max_chars`
+
+    Nunca corta una intervención salvo que por sí sola supere el límite.
+
+    Args:
+        transcription: Texto con una intervención por línea
+        max_chars: Tamaño máximo de cada ventana (≈ 4 caracteres por token)
+
+    Returns:
+        Lista de ventanas que juntas cubren el 100% del texto
+    """
+    windows, current, current_len = [], [], 0
+    for line in transcription.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        for piece in (_split_long_line(line, max_chars) if len(line) > max_chars else [line]):
+            if current and current_len + len(piece) + 1 > max_chars:
+                windows.append("\n".join(current))
+                current, current_len = [], 0
+            current.append(piece)
+            current_len += len(piece) + 1
+    if current:
+        windows.append("\n".join(current))
+    return windows
@@ -0,0 +1,78 @@
+"""transcription_cache.py - Caché persistente de transcripciones por contenido del audio"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import TRANSCRIPTION_CACHE_DIR, TRANSCRIPTION_CACHE_MAX_MB
+from logger import get_logger
+from helpers import atomic_write_json, evict_lru
+
+logger = get_logger(__name__)
+
+
+class TranscriptionCache:
+    """Almacén local de transcripciones direccionado por contenido
+
+    Cada entrada es un JSON en `cache_dir` cuyo nombre deriva del SHA-256 del
+    audio, el modelo y la versión del prompt. El mtime de cada archivo marca su
+    último uso y se expulsan las entradas menos usadas al superar `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: Path = TRANSCRIPTION_CACHE_DIR, max_bytes: int = TRANSCRIPTION_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(audio_hash: str, model: str, prompt_version: str) -> str:
+        """Clave de caché para un audio transcrito con un modelo y prompt concretos"""
+        return hashlib.sha256(f"{audio_hash}:{model}:{prompt_version}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        """Devuelve la transcripción cacheada o None"""
+        path = self._path(key)
+        try:
+            with self._lock:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                os.utime(path, None)  # Marcar como usada recientemente
+            logger.info(f"✓ Transcripción desde caché: {key[:12]}")
+            return data.get("text")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Entrada de caché inválida {key[:12]}: {type(e).__name__}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def put(self, key: str, text: str, **metadata) -> None:
+        """Guarda una transcripción (escritura atómica) y aplica el límite de tamaño"""
+        payload = {"text": text, "created_at": datetime.now().isoformat(), **metadata}
+        try:
+            with self._lock:
+                atomic_write_json(self._path(key), payload)
+                evict_lru(self.cache_dir, self.max_bytes)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar en caché: {type(e).__name__} - {e}")
+
+
+_cache: Optional[TranscriptionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_transcription_cache() -> TranscriptionCache:
+    """Caché compartida por todo el proceso"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranscriptionCache()
+        return _cache
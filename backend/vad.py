@@ -0,0 +1,248 @@
+"""vad.py - Detección de actividad de voz por energía y compresión de silencios"""
+import bisect
+import wave
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import VAD_MIN_SILENCE_SECONDS, VAD_KEEP_SILENCE_SECONDS
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FRAME_SECONDS = 0.03
+READ_FRAMES = 64 * 1024
+# Umbral adaptativo: ruido de fondo (percentil bajo) + margen, nunca por debajo del mínimo absoluto
+NOISE_PERCENTILE = 10
+THRESHOLD_MARGIN_DB = 12.0
+MIN_THRESHOLD_DB = -55.0
+# Suavizado: una pausa corta dentro de una frase sigue contando como voz
+HANGOVER_SECONDS = 0.2
+
+
+@dataclass
+class OffsetMap:
+    """Correspondencia entre tiempos del audio comprimido y del original
+
+    Cada segmento es (inicio en el comprimido, inicio en el original, duración)
+    en segundos; entre segmentos se eliminó silencio.
+    """
+    segments: List[Tuple[float, float, float]] = field(default_factory=list)
+
+    def to_original(self, seconds: float) -> float:
+        """Tiempo del audio comprimido → tiempo en el audio original"""
+        if not self.segments:
+            return seconds
+        starts = [seg[0] for seg in self.segments]
+        idx = max(0, bisect.bisect_right(starts, seconds) - 1)
+        processed_start, original_start, length = self.segments[idx]
+        return original_start + min(max(seconds - processed_start, 0.0), length)
+
+    def shifted(self, seconds: float) -> "OffsetMap":
+        """Mismo mapa con el original desplazado (p.ej. tras recortar el inicio)"""
+        return OffsetMap([(p, o + seconds, n) for p, o, n in self.segments])
+
+    @property
+    def kept_seconds(self) -> float:
+        return sum(seg[2] for seg in self.segments)
+
+
+@dataclass
+class VadResult:
+    path: str
+    original_seconds: float
+    processed_seconds: float
+    offset_map: OffsetMap
+
+    @property
+    def removed_ratio(self) -> float:
+        if not self.original_seconds:
+            return 0.0
+        return 1 - self.processed_seconds / self.original_seconds
+
+
+def frame_energies_db(path: str, frame_seconds: float = FRAME_SECONDS) -> Tuple["np.ndarray", int, int]:
+    """Primera pasada: energía (dBFS) de cada ventana de un WAV, leído por bloques
+
+    Returns:
+        (energías por ventana, frames por ventana, frecuencia)
+    """
+    with wave.open(path, "rb") as src:
+        rate, sampwidth, nchannels = src.getframerate(), src.getsampwidth(), src.getnchannels()
+        if sampwidth != 2:
+            raise ValueError("VAD requiere PCM de 16 bits")
+        window = max(1, int(rate * frame_seconds))
+        energies = []
+        pending = np.zeros(0, dtype=np.float32)
+        while True:
+            raw = src.readframes(READ_FRAMES)
+            if not raw:
+                break
+            samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+            if nchannels > 1:
+                samples = samples.reshape(-1, nchannels).mean(axis=1)
+            samples = np.concatenate([pending, samples])
+            usable = len(samples) - len(samples) % window
+            if usable:
+                frames = samples[:usable].reshape(-1, window)
+                energies.append(np.mean(frames * frames, axis=1))
+            pending = samples[usable:]
+        if len(pending):
+            energies.append(np.array([np.mean(pending * pending)], dtype=np.float32))
+    power = np.concatenate(energies) if energies else np.zeros(0, dtype=np.float32)
+    return 10.0 * np.log10(power + 1e-12), window, rate
+
+
+def speech_mask(energies_db: "np.ndarray", frame_seconds: float = FRAME_SECONDS) -> "np.ndarray":
+    """Ventanas con voz según un umbral adaptativo al ruido de fondo, con hangover"""
+    if not len(energies_db):
+        return np.zeros(0, dtype=bool)
+    noise_floor = np.percentile(energies_db, NOISE_PERCENTILE)
+    threshold = max(noise_floor + THRESHOLD_MARGIN_DB, MIN_THRESHOLD_DB)
+    mask = energies_db >= threshold
+    hangover = int(HANGOVER_SECONDS / frame_seconds)
+    if hangover and mask.any():
+        # Dilatación: cada ventana con voz marca también las `hangover` siguientes
+        kernel = np.ones(hangover + 1, dtype=np.int32)
+        mask = np.convolve(mask.astype(np.int32), kernel)[:len(mask)] > 0
+    return mask
+
+
+def _keep_ranges(mask: "np.ndarray", min_silence: int, keep_silence: int) -> List[Tuple[int, int]]:
+    """Rangos de ventanas a conservar: silencios largos se reducen a `keep_silence` ventanas"""
+    total = len(mask)
+    edges = np.flatnonzero(np.diff(np.concatenate([[1], mask.astype(np.int8), [1]])))
+    # Pares (inicio, fin) de cada tramo de silencio
+    silences = edges.reshape(-1, 2) if len(edges) % 2 == 0 else np.zeros((0, 2), dtype=int)
+    ranges, cursor = [], 0
+    half = keep_silence // 2
+    for start, end in silences:
+        if end - start < min_silence:
+            continue
+        cut_start = start + half if start > 0 else start
+        cut_end = end - (keep_silence - half) if end < total else end
+        if cut_end <= cut_start:
+            continue
+        if cut_start > cursor:
+            ranges.append((cursor, cut_start))
+        cursor = cut_end
+    if cursor < total:
+        ranges.append((cursor, total))
+    return ranges
+
+
+def _copy_ranges(src_path: str, dst_path: str, ranges: List[Tuple[int, int]]) -> None:
+    """Segunda pasada: copia los rangos de frames conservados"""
+    with wave.open(src_path, "rb") as src, wave.open(dst_path, "wb") as dst:
+        dst.setparams(src.getparams())
+        frame_size = src.getsampwidth() * src.getnchannels()
+        for start, end in ranges:
+            src.setpos(start)
+            remaining = end - start
+            while remaining > 0:
+                raw = src.readframes(min(READ_FRAMES, remaining))
+                if not raw:
+                    break
+                dst.writeframes(raw)
+                remaining -= len(raw) // frame_size
+
+
+def compress_silence(
+    wav_path: str,
+    out_path: str,
+    min_silence_seconds: float = VAD_MIN_SILENCE_SECONDS,
+    keep_silence_seconds: float = VAD_KEEP_SILENCE_SECONDS
+) -> Optional[VadResult]:
+    """Reduce cada silencio de más de `min_silence_seconds` a `keep_silence_seconds`
+
+    Args:
+        wav_path: WAV PCM16 de entrada
+        out_path: WAV de salida
+        min_silence_seconds: Duración mínima de un silencio para comprimirlo
+        keep_silence_seconds: Silencio que se deja en su lugar (mantiene la separación entre frases)
+
+    Returns:
+        VadResult con el mapa de tiempos, o None si NumPy no está disponible
+        o no hay nada que comprimir
+    """
+    if np is None:
+        return None
+    energies, window, rate = frame_energies_db(wav_path)
+    mask = speech_mask(energies)
+    if not mask.any():
+        return None
+
+    ranges = _keep_ranges(
+        mask,
+        min_silence=max(1, int(min_silence_seconds / FRAME_SECONDS)),
+        keep_silence=max(0, int(keep_silence_seconds / FRAME_SECONDS))
+    )
+    with wave.open(wav_path, "rb") as src:
+        total_frames = src.getnframes()
+    frame_ranges = [(int(start) * window, min(int(end) * window, total_frames)) for start, end in ranges]
+    kept_frames = sum(end - start for start, end in frame_ranges)
+    if kept_frames >= total_frames:
+        return None
+
+    _copy_ranges(wav_path, out_path, frame_ranges)
+    segments, position = [], 0
+    for start, end in frame_ranges:
+        segments.append((position / rate, start / rate, (end - start) / rate))
+        position += end - start
+    result = VadResult(out_path, total_frames / rate, kept_frames / rate, OffsetMap(segments))
+    logger.info(
+        f"✓ VAD: {result.original_seconds:.0f}s → {result.processed_seconds:.0f}s "
+        f"(-{result.removed_ratio:.0%}, {len(segments)} tramos)"
+    )
+    return result
+
+
+if __name__ == "__main__":
+    # Benchmark sobre reuniones sintéticas: frases (ruido modulado) separadas por pausas y "música de espera"
+    import tempfile
+    import time
+
+    def _to_pcm16(samples):
+        return (np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes()
+
+    def synth_meeting(path: str, minutes: float, pause_range: Tuple[float, float], seed: int, rate: int = 16000):
+        rng = np.random.default_rng(seed)
+        with wave.open(path, "wb") as dst:
+            dst.setnchannels(1)
+            dst.setsampwidth(2)
+            dst.setframerate(rate)
+            elapsed = 0.0
+            while elapsed < minutes * 60:
+                speech = rng.uniform(2.0, 12.0)
+                t = np.arange(int(speech * rate)) / rate
+                envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(3, 6) * t) ** 2  # sílabas
+                voice = rng.normal(0, 0.15, len(t)) * envelope
+                pause = rng.uniform(*pause_range)
+                noise = rng.normal(0, 0.002, int(pause * rate))  # ruido de sala
+                dst.writeframes(_to_pcm16(np.concatenate([voice, noise])))
+                elapsed += speech + pause
+
+    if np is None:
+        raise SystemExit("NumPy no instalado")
+    tmp = Path(tempfile.mkdtemp(prefix="vad_bench_"))
+    print(f"{'escenario':>22} | {'original (s)':>12} | {'comprimido (s)':>14} | {'ahorro':>6} | {'tiempo (s)':>10}")
+    for name, pause_range in (("conversación fluida", (0.3, 1.5)), ("reunión típica", (0.5, 6.0)), ("muchas esperas", (2.0, 15.0))):
+        src = str(tmp / f"{name}.wav")
+        synth_meeting(src, minutes=20, pause_range=pause_range, seed=len(name))
+        start = time.perf_counter()
+        result = compress_silence(src, str(tmp / f"{name}_vad.wav"))
+        elapsed = time.perf_counter() - start
+        if result:
+            # El mapa debe llevar cada tramo a su posición original
+            assert all(abs(result.offset_map.to_original(p) - o) < 1e-6 for p, o, _ in result.offset_map.segments)
+            print(f"{name:>22} | {result.original_seconds:>12.0f} | {result.processed_seconds:>14.0f} | "
+                  f"{result.removed_ratio:>6.0%} | {elapsed:>10.2f}")
+        else:
+            print(f"{name:>22} | sin cambios")
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+batch_ingest.py - Ingesta masiva sin interfaz: sube, transcribe y analiza un directorio de audios
+
+Uso:
+    python batch_ingest.py /ruta/a/grabaciones --workers 4
+    python batch_ingest.py /ruta/a/grabaciones --no-analysis --report informe.json
+
+Cada audio se deduplica por SHA-256 (dentro del lote y contra la BD), se
+sube con save_recording_to_db y se transcribe y analiza con el mismo
+pipeline que la cola de la aplicación. El progreso se guarda en un
+checkpoint JSON: si el proceso se corta, al relanzarlo se retoma donde
+quedó (los audios terminados no se repiten y los fallidos se reintentan).
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Configurar paths ANTES de cualquier import
+app_root = Path(__file__).parent
+sys.path.insert(0, str(app_root / "backend"))
+sys.path.insert(0, str(app_root))
+
+from config import AUDIO_EXTENSIONS, DATA_DIR, JOB_WORKERS
+from logger import get_logger
+from helpers import hash_file
+from recordings_catalog import get_recordings_catalog
+import database as db_utils
+
+logger = get_logger(__name__)
+
+DEFAULT_CHECKPOINT = DATA_DIR / "batch_ingest_checkpoint.json"
+
+# Estados finales de un audio en el checkpoint (los demás se reintentan)
+DONE, DUPLICATE, UPLOADED = "done", "duplicate", "uploaded"
+FINISHED_STATUSES = (DONE, DUPLICATE)
+
+
+# ============================================================================
+# CHECKPOINT
+# ============================================================================
+
+class Checkpoint:
+    """Estado por archivo persistido en JSON tras cada cambio (escritura atómica)
+
+    La clave es la ruta absoluta; si el tamaño o la fecha de modificación
+    cambian, el archivo se considera nuevo y se vuelve a procesar.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        if self.path.exists():
+            try:
+                self._entries = json.loads(self.path.read_text(encoding="utf-8")).get("files", {})
+                logger.info(f"✓ Checkpoint cargado: {len(self._entries)} archivos ({self.path})")
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Checkpoint ilegible, se empieza de cero: {type(e).__name__} - {e}")
+
+    @staticmethod
+    def fingerprint(path: Path) -> Dict:
+        stat = path.stat()
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def get(self, path: Path) -> Optional[Dict]:
+        """Entrada del archivo, o None si no está o cambió desde entonces"""
+        with self._lock:
+            entry = self._entries.get(str(path))
+        if entry and entry.get("fingerprint") == self.fingerprint(path):
+            return dict(entry)
+        return None
+
+    def update(self, path: Path, **fields) -> None:
+        with self._lock:
+            entry = self._entries.setdefault(str(path), {})
+            entry.update(fields, fingerprint=self.fingerprint(path), updated_at=datetime.now().isoformat())
+            self._save()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        tmp_path.write_text(json.dumps({"files": self._entries}, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+# ============================================================================
+# INGESTA
+# ============================================================================
+
+def find_audio_files(directory: Path, recursive: bool = True) -> List[Path]:
+    """Audios del directorio con una extensión soportada, en orden estable"""
+    pattern = "**/*" if recursive else "*"
+    return sorted(
+        path.resolve() for path in directory.glob(pattern)
+        if path.is_file() and path.suffix.lower().lstrip(".") in AUDIO_EXTENSIONS
+    )
+
+
+class BatchIngestor:
+    """Procesa un lote de audios con concurrencia acotada y mide el rendimiento"""
+
+    def __init__(self, checkpoint: Checkpoint, workers: int = JOB_WORKERS, analyze: bool = True):
+        self.checkpoint = checkpoint
+        self.workers = max(1, workers)
+        self.analyze = analyze
+        self.catalog = get_recordings_catalog()
+        self._lock = threading.Lock()
+        self._claimed_hashes: Dict[str, Path] = {}  # Dedupe dentro del lote
+        self._claimed_names = set()
+        self.results: List[Dict] = []
+
+    def run(self, files: List[Path]) -> List[Dict]:
+        self.catalog.refresh(force=True)
+        self._claimed_names = set(self.catalog.filenames())
+        pending = [path for path in files if (self.checkpoint.get(path) or {}).get("status") not in FINISHED_STATUSES]
+        skipped = len(files) - len(pending)
+        logger.info(f"Ingesta: {len(files)} audios, {skipped} ya procesados, {len(pending)} pendientes ({self.workers} workers)")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._process, path): path for path in pending}
+            for done_count, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                self.results.append(result)
+                icon = "✓" if result["status"] in FINISHED_STATUSES else "❌"
+                logger.info(
+                    f"{icon} [{done_count}/{len(pending)}] {result['path'].name}: {result['status']} "
+                    f"({result['seconds']:.1f}s)"
+                )
+        return self.results
+
+    def _process(self, path: Path) -> Dict:
+        """Ingesta de un archivo; nunca lanza (los errores quedan en el checkpoint)"""
+        start = time.perf_counter()
+        size = path.stat().st_size
+        entry = self.checkpoint.get(path) or {}
+        try:
+            status = self._ingest(path, entry)
+        except Exception as e:
+            logger.error(f"❌ {path.name}: {type(e).__name__} - {str(e)[:200]}")
+            self.checkpoint.update(path, status="failed", error=f"{type(e).__name__}: {str(e)[:500]}")
+            status = "failed"
+        return {"path": path, "status": status, "bytes": size, "seconds": time.perf_counter() - start}
+
+    def _ingest(self, path: Path, entry: Dict) -> str:
+        content_hash = entry.get("content_hash") or hash_file(str(path))
+        filename = entry.get("filename")
+        recording_id = entry.get("recording_id")
+
+        with self._lock:
+            first = self._claimed_hashes.setdefault(content_hash, path)
+        if first != path:
+            self.checkpoint.update(path, status=DUPLICATE, content_hash=content_hash, duplicate_of=str(first))
+            return DUPLICATE
+
+        if not recording_id:
+            existing = db_utils.get_recording_by_hash(content_hash)
+            if existing and self.catalog.is_transcribed(existing["filename"]):
+                self.checkpoint.update(
+                    path, status=DUPLICATE, content_hash=content_hash,
+                    recording_id=existing["id"], filename=existing["filename"]
+                )
+                return DUPLICATE
+            if existing:
+                # Subido antes pero sin transcribir (p.ej. un lote anterior cortado)
+                recording_id, filename = existing["id"], existing["filename"]
+            else:
+                filename = self._claim_filename(path.name, content_hash)
+                recording_id = db_utils.save_recording_to_db(filename, str(path), content_hash=content_hash)
+                if not recording_id:
+                    raise RuntimeError("No se pudo subir a Storage/BD")
+            self.checkpoint.update(
+                path, status=UPLOADED, content_hash=content_hash, recording_id=recording_id, filename=filename
+            )
+
+        if not self.analyze:
+            return UPLOADED
+
+        # Import diferido: el pipeline carga Transcriber/Gemini, innecesario con --no-analysis
+        from pipeline import transcribe_and_analyze
+        result = transcribe_and_analyze(filename, str(path), audio_hash=content_hash)
+        self.checkpoint.update(path, status=DONE, result=result, error=None)
+        return DONE
+
+    def _claim_filename(self, name: str, content_hash: str) -> str:
+        """Nombre libre en la BD: si ya existe otro audio con ese nombre, se le añade parte del hash"""
+        with self._lock:
+            if name in self._claimed_names:
+                stem, dot, ext = name.rpartition(".")
+                name = f"{stem}_{content_hash[:8]}.{ext}" if dot else f"{name}_{content_hash[:8]}"
+            self._claimed_names.add(name)
+            return name
+
+
+# ============================================================================
+# INFORME DE RENDIMIENTO
+# ============================================================================
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano (0 si no hay valores)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), math.ceil(pct / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def build_report(results: List[Dict], elapsed: float, workers: int) -> Dict:
+    """Rendimiento de la ejecución: archivos/min, bytes/s y latencia por archivo"""
+    latencies = [r["seconds"] for r in results]
+    total_bytes = sum(r["bytes"] for r in results)
+    by_status: Dict[str, int] = {}
+    for result in results:
+        by_status[result["status"]] = by_status.get(result["status"], 0) + 1
+    return {
+        "finished_at": datetime.now().isoformat(),
+        "workers": workers,
+        "files": len(results),
+        "by_status": by_status,
+        "elapsed_seconds": round(elapsed, 2),
+        "files_per_minute": round(len(results) / elapsed * 60, 2) if elapsed else 0.0,
+        "bytes_per_second": round(total_bytes / elapsed, 1) if elapsed else 0.0,
+        "latency_p50_seconds": round(percentile(latencies, 50), 2),
+        "latency_p95_seconds": round(percentile(latencies, 95), 2),
+        "failed": [str(r["path"]) for r in results if r["status"] == "failed"],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Ingesta masiva de grabaciones: subir, transcribir y analizar")
+    parser.add_argument("directory", type=Path, help="Directorio con los audios")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS, help="Audios procesados a la vez")
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT, help="Archivo de progreso (JSON)")
+    parser.add_argument("--report", type=Path, default=None, help="Guardar el informe de rendimiento (JSON)")
+    parser.add_argument("--no-recursive", action="store_true", help="No entrar en subdirectorios")
+    parser.add_argument("--no-analysis", action="store_true", help="Solo subir (sin transcribir ni analizar)")
+    args = parser.parse_args(argv)
+
+    if not args.directory.is_dir():
+        parser.error(f"No es un directorio: {args.directory}")
+
+    files = find_audio_files(args.directory, recursive=not args.no_recursive)
+    ingestor = BatchIngestor(Checkpoint(args.checkpoint), workers=args.workers, analyze=not args.no_analysis)
+    start = time.perf_counter()
+    results = ingestor.run(files)
+    report = build_report(results, time.perf_counter() - start, ingestor.workers)
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.report:
+        args.report.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        logger.info(f"✓ Informe guardado en {args.report}")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -67,6 +67,15 @@ if not SUPABASE_URL or not SUPABASE_KEY:
         "Para Streamlit Cloud, configúralas en Settings > Secrets"
     )
 
+# Pool HTTP compartido por todos los módulos que usan Supabase
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "10"))  # Conexiones simultáneas máximas
+SUPABASE_KEEPALIVE_SECONDS = int(os.getenv("SUPABASE_KEEPALIVE_SECONDS", "60"))  # Vida de conexiones inactivas
+SUPABASE_HTTP_TIMEOUT = int(os.getenv("SUPABASE_HTTP_TIMEOUT", "30"))
+
+# Subida a Storage: por encima del umbral se usa subida reanudable (TUS) por bloques
+STORAGE_RESUMABLE_THRESHOLD_MB = int(os.getenv("STORAGE_RESUMABLE_THRESHOLD_MB", "6"))
+STORAGE_UPLOAD_CHUNK_BYTES = 6 * 1024 * 1024  # Supabase exige bloques de 6MB (salvo el último)
+
 # ============================================================================
 # INFORMACIÓN DE LA APLICACIÓN
 # ============================================================================
@@ -80,6 +89,83 @@ APP_VERSION = "1.0.0"
 TRANSCRIPTION_MODEL = "gemini-2.0-flash"
 CHAT_MODEL = "gemini-2.0-flash"
 
+# Límites compartidos de todas las llamadas a Gemini (gemini_gateway)
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "2000"))  # Peticiones por minuto
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "4000000"))  # Tokens por minuto (entrada + salida)
+GEMINI_MAX_IN_FLIGHT = int(os.getenv("GEMINI_MAX_IN_FLIGHT", "16"))  # Llamadas simultáneas máximas
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "5"))  # Reintentos ante 429/503
+GEMINI_BACKOFF_BASE_SECONDS = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", "1"))
+GEMINI_BACKOFF_MAX_SECONDS = float(os.getenv("GEMINI_BACKOFF_MAX_SECONDS", "60"))
+GEMINI_FILE_TOKEN_ESTIMATE = int(os.getenv("GEMINI_FILE_TOKEN_ESTIMATE", "20000"))  # ≈ 10 min de audio (32 tokens/s)
+
+# Caché de contexto del chat: la transcripción se sube una vez (Gemini CachedContent) por grabación y versión.
+# Solo se usa cuando no hay recuperación: llamadas con use_retrieval=False (resúmenes) o transcripciones
+# de RETRIEVAL_TOP_K fragmentos o menos; las preguntas sobre reuniones largas van por el índice BM25
+CHAT_CONTEXT_CACHE = os.getenv("CHAT_CONTEXT_CACHE", "true").lower() == "true"
+CHAT_CACHE_MODEL = os.getenv("CHAT_CACHE_MODEL", "gemini-2.0-flash-001")  # El caché exige versión explícita
+CHAT_CONTEXT_CACHE_IDLE_SECONDS = int(os.getenv("CHAT_CONTEXT_CACHE_IDLE_SECONDS", "900"))  # Expira tras 15 min sin preguntas
+CHAT_CONTEXT_CACHE_MIN_CHARS = int(os.getenv("CHAT_CONTEXT_CACHE_MIN_CHARS", "16000"))  # ≈ 4.000 tokens, mínimo de Gemini
+
+# Chat con recuperación: índice BM25 por transcripción, troceada por intervenciones
+CHAT_RETRIEVAL = os.getenv("CHAT_RETRIEVAL", "true").lower() == "true"
+TRANSCRIPT_INDEX_DIR = DATA_DIR / "transcript_index"
+TRANSCRIPT_INDEX_MAX_MB = int(os.getenv("TRANSCRIPT_INDEX_MAX_MB", "100"))
+RETRIEVAL_CHUNK_CHARS = int(os.getenv("RETRIEVAL_CHUNK_CHARS", "800"))  # Intervenciones agrupadas hasta este tamaño
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))  # Fragmentos enviados por pregunta (≈ 1.600 tokens)
+
+# Transcripción por fragmentos para audios largos
+TRANSCRIPTION_CHUNK_SECONDS = int(os.getenv("TRANSCRIPTION_CHUNK_SECONDS", "600"))  # 10 min por fragmento
+TRANSCRIPTION_CHUNK_OVERLAP_SECONDS = int(os.getenv("TRANSCRIPTION_CHUNK_OVERLAP_SECONDS", "15"))
+TRANSCRIPTION_MAX_WORKERS = int(os.getenv("TRANSCRIPTION_MAX_WORKERS", "4"))
+
+# Preprocesado antes de transcribir: mono 16 kHz, recorte de silencio y códec compacto
+TRANSCRIPTION_PREPROCESS = os.getenv("TRANSCRIPTION_PREPROCESS", "true").lower() == "true"
+PREPROCESS_SAMPLE_RATE = int(os.getenv("PREPROCESS_SAMPLE_RATE", "16000"))
+PREPROCESS_CODEC = os.getenv("PREPROCESS_CODEC", "opus")  # "opus" (requiere ffmpeg) o "" para WAV
+PREPROCESS_SILENCE_DB = float(os.getenv("PREPROCESS_SILENCE_DB", "-45"))  # Umbral de silencio en dBFS
+TRANSCRIPTION_VAD = os.getenv("TRANSCRIPTION_VAD", "true").lower() == "true"  # Comprimir silencios internos
+VAD_MIN_SILENCE_SECONDS = float(os.getenv("VAD_MIN_SILENCE_SECONDS", "1.0"))
+VAD_KEEP_SILENCE_SECONDS = float(os.getenv("VAD_KEEP_SILENCE_SECONDS", "0.3"))
+
+# Caché persistente de transcripciones (clave: SHA-256 del audio + modelo + versión del prompt)
+TRANSCRIPTION_CACHE_DIR = DATA_DIR / "transcription_cache"
+TRANSCRIPTION_CACHE_MAX_MB = int(os.getenv("TRANSCRIPTION_CACHE_MAX_MB", "200"))
+
+# Caché local de audios descargados de Storage (data/recordings), expulsión LRU
+AUDIO_CACHE_MAX_MB = int(os.getenv("AUDIO_CACHE_MAX_MB", "1024"))
+
+# Reproducción: "signed_url" (el navegador descarga de Storage por rangos) o "local"
+AUDIO_PLAYBACK_MODE = os.getenv("AUDIO_PLAYBACK_MODE", "signed_url")
+SIGNED_URL_TTL_SECONDS = int(os.getenv("SIGNED_URL_TTL_SECONDS", "3600"))
+
+# Análisis de oportunidades con IA por ventanas (map-reduce sobre toda la transcripción)
+AI_ANALYSIS_WINDOW_CHARS = int(os.getenv("AI_ANALYSIS_WINDOW_CHARS", "12000"))  # ≈ 3.000 tokens por ventana
+AI_ANALYSIS_MAX_WORKERS = int(os.getenv("AI_ANALYSIS_MAX_WORKERS", "4"))
+
+# Cola persistente de trabajos en segundo plano (transcribir → guardar → analizar)
+JOBS_DB_FILE = DATA_DIR / "jobs.db"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # Grabaciones procesadas a la vez
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))  # Reintentos tras reinicios a mitad de trabajo
+JOB_POLL_SECONDS = int(os.getenv("JOB_POLL_SECONDS", "2"))  # Refresco del estado en la UI
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))  # Sin latido en este tiempo, otro proceso puede retomarlo
+
+# Bucle asyncio compartido (variantes async de Transcriber, Model, OpportunitiesManager y BD)
+ASYNC_BLOCKING_WORKERS = int(os.getenv("ASYNC_BLOCKING_WORKERS", "16"))  # Hilos para trabajo bloqueante (subidas, disco)
+
+# Resúmenes memoizados por (transcripción, prompt, modelo); espejo local de la tabla summaries
+SUMMARIES_DIR = DATA_DIR / "summaries"
+SUMMARIES_MAX_MB = int(os.getenv("SUMMARIES_MAX_MB", "20"))
+
+# Resumen jerárquico de reuniones largas: ventanas de intervenciones → resúmenes parciales → combinación
+HIERARCHICAL_SUMMARY_MIN_CHARS = int(os.getenv("HIERARCHICAL_SUMMARY_MIN_CHARS", "60000"))  # ≈ 1 h de reunión
+SUMMARY_WINDOW_CHARS = int(os.getenv("SUMMARY_WINDOW_CHARS", "12000"))  # Tamaño medio de cada hoja (≈ 3.000 tokens)
+SUMMARY_FAN_IN = int(os.getenv("SUMMARY_FAN_IN", "6"))  # Resúmenes parciales combinados por nodo
+SUMMARY_NODES_DIR = DATA_DIR / "summary_nodes"
+SUMMARY_NODES_MAX_MB = int(os.getenv("SUMMARY_NODES_MAX_MB", "50"))
+
+# Índice local de deduplicación (espejo de recordings.content_hash)
+CONTENT_INDEX_FILE = DATA_DIR / "content_hashes.json"
+
 # ============================================================================
 # OPCIONES DE DATOS
 # ============================================================================
@@ -100,3 +186,7 @@ REFRESH_INTERVAL_SECONDS = 5  # Intervalo de refresco de datos
 
 # Configuración de cache
 CACHE_TTL_MINUTES = 10  # Tiempo de vida del cache en minutos
+CATALOG_FULL_REFRESH_SECONDS = int(os.getenv("CATALOG_FULL_REFRESH_SECONDS", "60"))  # Recarga completa del catálogo de grabaciones
+RECORDING_ID_CACHE_SIZE = int(os.getenv("RECORDING_ID_CACHE_SIZE", "512"))  # Entradas filename → recording_id en memoria
+RECORDING_ID_TTL_SECONDS = int(os.getenv("RECORDING_ID_TTL_SECONDS", "300"))
+RECORDING_ID_NEGATIVE_TTL_SECONDS = int(os.getenv("RECORDING_ID_NEGATIVE_TTL_SECONDS", "10"))  # Cuánto se recuerda un "no encontrado"
@@ -16,15 +16,23 @@ CREATE TABLE IF NOT EXISTS recordings (
     filename TEXT NOT NULL,
     filepath TEXT NOT NULL,
     transcription TEXT,
+    content_hash TEXT,
+    storage_key TEXT,
     created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now(),
     updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now(),
     
     CONSTRAINT recordings_pkey PRIMARY KEY (id)
 );
 
+-- Migración para bases existentes
+ALTER TABLE recordings ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE recordings ADD COLUMN IF NOT EXISTS storage_key TEXT;
+
 -- Índices de performance
 CREATE INDEX IF NOT EXISTS idx_recordings_filename ON recordings(filename);
 CREATE INDEX IF NOT EXISTS idx_recordings_created_at ON recordings(created_at DESC);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_recordings_content_hash ON recordings(content_hash) WHERE content_hash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_recordings_storage_key ON recordings(storage_key) WHERE storage_key IS NOT NULL;
 
 -- Comentarios para documentación
 COMMENT ON TABLE recordings IS 'Tabla madre: almacena todos los audios subidos al sistema';
@@ -32,6 +40,8 @@ COMMENT ON COLUMN recordings.id IS 'UUID único del audio';
 COMMENT ON COLUMN recordings.filename IS 'Nombre del archivo (ej: meeting_2025-02-09.wav)';
 COMMENT ON COLUMN recordings.filepath IS 'Ruta en Supabase Storage (ej: recordings/meeting_2025-02-09.wav)';
 COMMENT ON COLUMN recordings.transcription IS 'Texto completo transcrito del audio';
+COMMENT ON COLUMN recordings.content_hash IS 'SHA-256 del audio: evita subir dos veces el mismo archivo';
+COMMENT ON COLUMN recordings.storage_key IS 'Objeto en Storage si difiere de filename (renombrado sin mover el archivo); NULL = filename';
 COMMENT ON COLUMN recordings.created_at IS 'Timestamp de cuando se subió el audio';
 
 ---
@@ -69,6 +79,32 @@ COMMENT ON COLUMN transcriptions.created_at IS 'Cuándo se transcribió el audio
 
 ---
 
+-- ============================================================================
+-- TABLE: summaries
+-- ============================================================================
+-- Resúmenes generados con IA, memoizados por versión de transcripción
+-- Una fila por (transcripción, prompt, modelo): se regenera solo si cambia alguno
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS summaries (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    transcription_id UUID NOT NULL REFERENCES transcriptions(id) ON DELETE CASCADE,
+    prompt_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    
+    CONSTRAINT summaries_key UNIQUE (transcription_id, prompt_hash, model)
+);
+
+-- Comentarios para documentación
+COMMENT ON TABLE summaries IS 'Resúmenes de IA por versión de transcripción, prompt y modelo';
+COMMENT ON COLUMN summaries.prompt_hash IS 'SHA-256 (16 hex) del prompt de resumen';
+COMMENT ON COLUMN summaries.content_hash IS 'SHA-256 del texto resumido: detecta transcripciones editadas';
+
+---
+
 -- ============================================================================
 -- TABLE: opportunities
 -- ============================================================================
@@ -1,17 +1,22 @@
 import os
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Union
 import streamlit as st
 import sys
 
-# Agregar ruta padre al path
+# Agregar ruta padre y backend al path
 sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
 from config import RECORDINGS_DIR, AUDIO_EXTENSIONS, MAX_AUDIO_SIZE_MB
 from logger import get_logger
+from database import init_supabase
+from audio_cache import get_audio_cache
 
 logger = get_logger(__name__)
 
+WRITE_CHUNK_BYTES = 1024 * 1024  # Escritura a disco por bloques de 1MB
+
 
 class AudioRecorder:
     """Gestor de grabaciones de audio"""
@@ -45,20 +50,12 @@ class AudioRecorder:
             list: Lista de nombres de archivo desde Supabase o lista vacía si falla
         """
         try:
-            import os
-            from supabase import create_client
-            
-            # Obtener credenciales desde variables de entorno
-            supabase_url = os.getenv("SUPABASE_URL")
-            supabase_key = os.getenv("SUPABASE_KEY")
-            
-            if not supabase_url or not supabase_key:
-                logger.warning("Credenciales de Supabase no configuradas")
+            # Cliente compartido (pool de conexiones), no uno nuevo por rerun
+            client = init_supabase()
+            if not client:
+                logger.warning("Supabase no disponible")
                 return []
             
-            # Crear cliente Supabase
-            client = create_client(supabase_url.strip(), supabase_key.strip())
-            
             # Query a tabla recordings
             response = client.table("recordings").select("filename").order("created_at", desc=True).execute()
             
@@ -66,19 +63,16 @@ class AudioRecorder:
                 return [record["filename"] for record in response.data]
             return []
             
-        except ImportError:
-            logger.warning("Supabase no instalado")
-            return []
         except Exception as e:
             logger.error(f"Error obteniendo grabaciones de Supabase: {e}")
             return []
     
-    def validate_audio_file(self, audio_data: bytes, filename: str) -> None:
+    def validate_audio_file(self, audio_data: Union[bytes, memoryview], filename: str) -> None:
         """
         Valida un archivo de audio antes de guardarlo.
         
         Args:
-            audio_data (bytes): Datos del audio
+            audio_data (bytes | memoryview): Datos del audio
             filename (str): Nombre del archivo
             
         Raises:
@@ -100,12 +94,12 @@ class AudioRecorder:
         
         logger.info(f"Validación exitosa para: {filename} ({size_mb:.1f}MB)")
     
-    def save_recording(self, audio_data: bytes, filename: Optional[str] = None) -> str:
+    def save_recording(self, audio_data: Union[bytes, memoryview], filename: Optional[str] = None) -> str:
         """
         Guarda un archivo de audio grabado.
         
         Args:
-            audio_data (bytes): Datos del audio
+            audio_data (bytes | memoryview): Datos del audio (un memoryview se escribe sin copiarlo)
             filename (str, optional): Nombre del archivo. Si no se proporciona, se genera uno.
             
         Returns:
@@ -125,11 +119,14 @@ class AudioRecorder:
             
             filepath = RECORDINGS_DIR / filename
             
-            # Guardar el archivo
+            # Guardar el archivo por bloques, sin copias intermedias del buffer
+            view = memoryview(audio_data)
             with open(filepath, "wb") as f:
-                f.write(audio_data)
+                for start in range(0, len(view), WRITE_CHUNK_BYTES):
+                    f.write(view[start:start + WRITE_CHUNK_BYTES])
             
             logger.info(f"Audio guardado: {filename}")
+            get_audio_cache().add(filename)
             return str(filepath)
             
         except ValueError as e:
@@ -161,10 +158,33 @@ class AudioRecorder:
             logger.error(f"Error al eliminar archivo {filename}: {e}")
             return False
     
+    def rename_recording(self, old_filename: str, new_filename: str) -> bool:
+        """
+        Renombra la copia local de un audio (si existe) para no tener que volver a descargarlo.
+        
+        Args:
+            old_filename (str): Nombre actual
+            new_filename (str): Nombre nuevo
+            
+        Returns:
+            bool: True si se renombró, False si no había copia local o falló
+        """
+        try:
+            old_path = RECORDINGS_DIR / old_filename
+            if not old_path.exists():
+                return False
+            os.replace(old_path, RECORDINGS_DIR / new_filename)
+            logger.info(f"Audio local renombrado: {old_filename} → {new_filename}")
+            return True
+        except OSError as e:
+            logger.error(f"Error al renombrar archivo {old_filename}: {e}")
+            return False
+    
     def get_recording_path(self, filename: str) -> str:
         """
         Obtiene la ruta completa de un archivo de audio.
-        Si el archivo local no existe, intenta descargarlo de Supabase Storage.
+        Si el archivo local no existe, lo descarga de Supabase Storage a través
+        de la caché de audio compartida (presupuesto de disco y expulsión LRU).
         
         Args:
             filename (str): Nombre del archivo
@@ -172,25 +192,6 @@ class AudioRecorder:
         Returns:
             str: Ruta completa al archivo
         """
-        filepath = RECORDINGS_DIR / filename
-        
-        # Si el archivo ya existe localmente, retornar la ruta
-        if filepath.exists():
-            return str(filepath)
-        
-        # Si no existe, intentar descargar de Supabase Storage
-        try:
-            sys.path.insert(0, str(Path(__file__).parent.parent))
-            from backend.database import download_audio_from_storage
-            
-            logger.info(f"Archivo local no encontrado: {filename}. Descargando de Storage...")
-            if download_audio_from_storage(filename, str(filepath)):
-                logger.info(f"Archivo descargado exitosamente: {filename}")
-                return str(filepath)
-            else:
-                logger.error(f"No se pudo descargar {filename} de Storage")
-                return str(filepath)  # Retornar la ruta de todos modos (para otros manejos de error)
-        except Exception as e:
-            logger.warning(f"Error intentando descargar de Storage: {e}")
-            return str(filepath)
-
+        path = get_audio_cache().get(filename)
+        # Retornar la ruta de todos modos (para otros manejos de error)
+        return path or str(RECORDINGS_DIR / filename)
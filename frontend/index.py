@@ -1,6 +1,7 @@
 import streamlit as st
 import sys
 import re
+from contextlib import closing
 from pathlib import Path
 
 # Agregar carpetas al path para importar módulos
@@ -25,33 +26,43 @@ from notifications import (
     show_success_debug, show_error_debug, show_info_debug
 )
 from utils import process_audio_file, delete_audio
-from performance import get_transcription_cached, is_audio_transcribed, update_opportunity_local, delete_opportunity_local, delete_keyword_local, delete_recording_local, init_optimization_state
+from performance import get_transcription_cached, get_transcribed_map, update_opportunity_local, delete_opportunity_local, delete_keyword_local, delete_recording_local, init_optimization_state
 from helpers import format_recording_name
 
 # Importar de backend
-from Transcriber import Transcriber
 from Model import Model
 from OpportunitiesManager import OpportunitiesManager
+from recordings_catalog import RecordingsCatalog, get_recordings_catalog
+from audio_cache import get_audio_cache
+from job_queue import get_job_queue, ACTIVE_STATUSES, DONE
+from gemini_gateway import get_gemini_gateway
+from chat_context_cache import get_chat_context_cache
+from summary_store import get_summary_store, SUMMARY_PROMPT
+from hierarchical_summary import HierarchicalSummarizer
 import database as db_utils
 
 from datetime import datetime
-from config import CHAT_HISTORY_LIMIT
+from typing import Dict
+from config import CHAT_HISTORY_LIMIT, AUDIO_PLAYBACK_MODE, MIME_TYPES, JOB_POLL_SECONDS
 
 # ============================================================================
 # FUNCIONES DE INICIALIZACIÓN
 # ============================================================================
 
-def initialize_session_state(recorder_obj: AudioRecorder) -> None:
+def initialize_session_state(catalog_obj: RecordingsCatalog) -> None:
     """Inicializa todos los valores del session_state de forma centralizada"""
     session_defaults = {
         "processed_audios": set(),
-        "recordings": recorder_obj.get_recordings_from_supabase(),
+        "audio_hashes": {},  # Mapeo: filename → SHA-256 del audio (clave de la caché de transcripciones)
+        "recordings": catalog_obj.filenames(),
         "recordings_map": {},  # Mapeo: filename → recording_id para análisis de oportunidades
         "selected_audio": None,
         "upload_key_counter": 0,
         "record_key_counter": 0,
         "keywords": {},
         "delete_confirmation": {},
+        "watched_jobs": {},  # Mapeo: filename → ID del trabajo de transcripción que sigue esta sesión
+        "finished_jobs": {},  # Mapeo: filename → trabajo terminado pendiente de mostrar
         "transcription_cache": {},
         "chat_history_limit": CHAT_HISTORY_LIMIT,
         "opp_delete_confirmation": {},
@@ -62,6 +73,7 @@ def initialize_session_state(recorder_obj: AudioRecorder) -> None:
         "new_audio_name": "",  # Nuevo nombre del archivo
         "generating_summary": False,  # Flag para generar resumen
         "summary_text": None,  # Texto del resumen generado
+        "transcription_id": None,  # Versión de la transcripción cargada (clave de los resúmenes)
         "show_email_modal": False,  # Modal para enviar resumen por email
         "show_whatsapp_modal": False,  # Modal para enviar resumen por WhatsApp
         "show_email_transcript": False,  # Modal para enviar transcripción por email
@@ -85,31 +97,121 @@ def add_debug_event(message: str, event_type: str = "info") -> None:
         "message": message
     })
 
-def update_recordings_map() -> None:
-    """Actualiza el mapeo de filename → recording_id desde Supabase"""
-    try:
-        import os
-        from supabase import create_client
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_KEY")
-        
-        if not supabase_url or not supabase_key:
-            logger.warning("⚠️  Supabase credentials no configuradas")
-            return
+def update_recordings_map(catalog_obj: RecordingsCatalog) -> None:
+    """Actualiza el mapeo de filename → recording_id desde el catálogo en memoria"""
+    st.session_state.recordings_map = catalog_obj.filename_map()
+    logger.debug(f"Recordings map: {len(st.session_state.recordings_map)} registros")
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_job_status(filename: str) -> None:
+    """Consulta periódicamente el trabajo de un audio sin volver a ejecutar toda la página"""
+    job_id = st.session_state.watched_jobs.get(filename)
+    job = get_job_queue().get(job_id) if job_id else None
+    if job is None:
+        st.session_state.watched_jobs.pop(filename, None)
+        return
+    
+    if job["status"] in ACTIVE_STATUSES:
+        stage = job["stage"] or "En cola"
+        st.markdown(f'''
+        <div style="
+            background: linear-gradient(135deg, rgba(139, 92, 246, 0.1) 0%, rgba(59, 130, 246, 0.05) 100%);
+            border: 2px solid rgba(139, 92, 246, 0.3);
+            border-radius: 12px;
+            padding: 16px;
+            margin: 12px 0;
+            text-align: center;
+        ">
+            <div style="font-size: 14px; font-weight: 600; color: #8b5cf6; margin-bottom: 8px;">
+                🤖 {stage}...
+            </div>
+            <div style="font-size: 12px; color: #60a5fa;">
+                Transcripción y tickets en segundo plano: puedes seguir usando la aplicación
+            </div>
+        </div>
+        ''', unsafe_allow_html=True)
+        return
+    
+    # Terminado: recargar la página completa para mostrar la transcripción y el resultado
+    st.session_state.watched_jobs.pop(filename, None)
+    st.session_state.finished_jobs[filename] = job
+    if job["status"] == DONE and filename == st.session_state.get("selected_audio"):
+        st.session_state.loaded_audio = None  # Fuerza la recarga de la transcripción guardada
+    st.rerun()
+
+def render_job_result(filename: str, job: Dict) -> None:
+    """Muestra el resultado de un trabajo de transcripción terminado"""
+    if job["status"] != DONE:
+        show_error(f"Error al transcribir: {job['error']}")
+        add_debug_event(f"Transcripción fallida para '{filename}': {job['error']}", "error")
+        return
+    
+    result = job["result"] or {}
+    num_opportunities = result.get("opportunities_detected", 0)
+    saved_opportunities = result.get("opportunities_saved", 0)
+    show_success("Transcripción completada")
+    add_debug_event(f"Transcripción completada para '{filename}' (ID: {result.get('transcription_id')})", "success")
+    
+    if num_opportunities > 0:
+        # Determinar si se guardaron o solo se detectaron
+        if saved_opportunities:
+            tickets_status = f"Se han creado {saved_opportunities} ticket(s) automáticamente"
+            subtitle = "Los tickets están disponibles en la sección de 'Oportunidades'"
+            icon = "✅"
+        else:
+            tickets_status = f"Se detectaron {num_opportunities} oportunidad(es)"
+            subtitle = "Oportunidades identificadas por IA (pendiente almacenamiento)"
+            icon = "🔍"
         
-        client = create_client(supabase_url.strip(), supabase_key.strip())
-        response = client.table("recordings").select("id, filename").order("created_at", desc=True).limit(50).execute()
+        st.markdown(f'''
+        <div style="
+            background: linear-gradient(135deg, rgba(34, 197, 94, 0.1) 0%, rgba(59, 130, 246, 0.05) 100%);
+            border: 2px solid rgba(34, 197, 94, 0.3);
+            border-radius: 12px;
+            padding: 16px;
+            margin: 12px 0;
+            text-align: center;
+        ">
+            <div style="font-size: 14px; font-weight: 600; color: #22c55e; margin-bottom: 8px;">
+                {icon} Analisis Completado
+            </div>
+            <div style="font-size: 13px; color: #86efac; font-weight: 500;">
+                {tickets_status}
+            </div>
+            <div style="font-size: 11px; color: #4ade80; margin-top: 6px;">
+                {subtitle}
+            </div>
+        </div>
+        ''', unsafe_allow_html=True)
         
-        if response and response.data:
-            recordings_map = {rec["filename"]: rec["id"] for rec in response.data}
-            st.session_state.recordings_map = recordings_map
-            logger.info(f"✅ Recordings map actualizado: {len(recordings_map)} registros")
-            logger.debug(f"   Ejemplos: {list(recordings_map.keys())[:3]}")
+        if saved_opportunities:
+            toast_msg = f"Se han creado {saved_opportunities} tickets automáticamente"
         else:
-            logger.warning("⚠️  No se obtuvieron recordings de Supabase")
-            st.session_state.recordings_map = {}
-    except Exception as e:
-        logger.error(f"❌ Error actualizando recordings_map: {type(e).__name__} - {str(e)[:100]}")
+            toast_msg = f"Se detectaron {num_opportunities} oportunidades por IA"
+        
+        st.toast(toast_msg, icon="🤖")
+        add_debug_event(f"IA detectó {num_opportunities} oportunidades para '{filename}'", "success")
+    else:
+        st.markdown('''
+        <div style="
+            background: linear-gradient(135deg, rgba(59, 130, 246, 0.1) 0%, rgba(34, 197, 94, 0.05) 100%);
+            border: 2px solid rgba(59, 130, 246, 0.3);
+            border-radius: 12px;
+            padding: 16px;
+            margin: 12px 0;
+            text-align: center;
+        ">
+            <div style="font-size: 14px; font-weight: 600; color: #3b82f6; margin-bottom: 8px;">
+                ℹ️ Análisis Completado
+            </div>
+            <div style="font-size: 13px; color: #93c5fd;">
+                No se detectaron nuevas oportunidades en esta transcripción
+            </div>
+        </div>
+        ''', unsafe_allow_html=True)
+        
+        st.toast("ℹ️ Análisis completado: No se detectaron oportunidades relevantes.", icon="ℹ️")
+        add_debug_event(f"IA no detectó oportunidades para '{filename}'", "info")
 
 # ============================================================================
 # CONFIGURACIÓN INICIAL DE LA INTERFAZ DE USUARIO
@@ -123,14 +225,18 @@ st.markdown(styles.get_styles(), unsafe_allow_html=True)
 # Renderizar efectos de fondo animados
 components.render_background_effects()
 
+# Contadores del proceso al inicio del rerun (métrica del DEBUG)
+connection_stats_start = db_utils.get_connection_stats()
+
 # Inicializar objetos
+catalog = get_recordings_catalog()
+catalog.refresh()
 recorder = AudioRecorder()
-transcriber_model = Transcriber()
 chat_model = Model()
 opp_manager = OpportunitiesManager()
 
 # Inicializar estado de sesión de forma centralizada
-initialize_session_state(recorder)
+initialize_session_state(catalog)
 
 # Inicializar optimizaciones de performance
 init_optimization_state()
@@ -150,7 +256,7 @@ with col_left:
     
     # Procesar audio grabado SOLO UNA VEZ por hash
     if audio_data is not None:
-        audio_bytes = audio_data.getvalue()
+        audio_bytes = audio_data.getbuffer()  # memoryview: sin copiar el buffer del widget
         if len(audio_bytes) > 0:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"recording_{timestamp}.wav"
@@ -170,7 +276,7 @@ with col_left:
     )
     
     if uploaded_file is not None:
-        audio_bytes = uploaded_file.read()
+        audio_bytes = uploaded_file.getbuffer()  # memoryview: sin copiar el buffer del widget
         if len(audio_bytes) > 0:
             filename = uploaded_file.name
             
@@ -186,12 +292,15 @@ with col_left:
 # PANEL DERECHO - Audios Guardados y Transcripción
 # ============================================================================
 with col_right:
-    # Refresh de la lista de audios
-    recordings = recorder.get_recordings_from_supabase()
+    # Lista de audios desde el catálogo (sin consultas extra en cada rerun)
+    recordings = catalog.filenames()
     st.session_state.recordings = recordings
     
     # Actualizar mapeo de IDs para análisis de oportunidades
-    update_recordings_map()
+    update_recordings_map(catalog)
+    
+    # Estado "transcrito" de todos los audios en una sola consulta (cacheada)
+    transcribed_map = get_transcribed_map(recordings, db_utils)
     
     if recordings:
         # Tabs para diferentes secciones
@@ -214,7 +323,7 @@ with col_right:
                 "Selecciona un audio para transcribir",
                 filtered_recordings,
                 format_func=lambda x: format_recording_name(x) + (
-                    " [Transcrito]" if is_audio_transcribed(x, db_utils) else ""
+                    " [Transcrito]" if transcribed_map.get(x) else ""
                 ),
                 key=f"selectbox_audio_{len(filtered_recordings)}"
             )
@@ -225,6 +334,8 @@ with col_right:
                     existing_transcription = db_utils.get_transcription_by_filename(selected_audio)
                     if existing_transcription:
                         st.session_state.contexto = existing_transcription["content"]
+                        st.session_state.transcription_id = existing_transcription.get("id")
+                        st.session_state.summary_text = None
                         st.session_state.selected_audio = selected_audio
                         st.session_state.loaded_audio = selected_audio
                         st.session_state.chat_enabled = True
@@ -235,181 +346,53 @@ with col_right:
                         st.session_state.loaded_audio = selected_audio
                         st.session_state.chat_enabled = False
                         st.session_state.contexto = None
+                        st.session_state.transcription_id = None
+                        st.session_state.summary_text = None
                         st.session_state.keywords = {}
                 
                 # Mostrar reproductor de audio
-                audio_path = recorder.get_recording_path(selected_audio)
                 extension = selected_audio.split('.')[-1]
+                audio_format = MIME_TYPES.get(extension.lower(), f"audio/{extension}")
                 
-                # Verificar si el archivo existe antes de intentar abrirlo
-                audio_file_path = Path(audio_path)
-                if audio_file_path.exists():
-                    try:
-                        with open(audio_path, "rb") as f:
-                            st.audio(f.read(), format=f"audio/{extension}")
-                    except Exception as e:
-                        logger.error(f"Error al reproducir audio: {e}")
-                        show_error(f"Error al reproducir el audio: {str(e)}")
+                # URL firmada: el navegador reproduce desde Storage por rangos, sin leer el archivo aquí
+                signed_url = db_utils.get_signed_audio_url(selected_audio) if AUDIO_PLAYBACK_MODE == "signed_url" else None
+                
+                if signed_url:
+                    st.audio(signed_url, format=audio_format)
                 else:
-                    # Si el archivo no existe, intentar descargarlo de Supabase nuevamente
-                    from backend.database import download_audio_from_storage
-                    try:
-                        if download_audio_from_storage(selected_audio, audio_path):
-                            with open(audio_path, "rb") as f:
-                                st.audio(f.read(), format=f"audio/{extension}")
+                    # Fijado en la caché mientras st.audio lo lee: otra sesión no puede expulsarlo a mitad
+                    with get_audio_cache().use(selected_audio) as audio_path:
+                        if audio_path:
+                            try:
+                                st.audio(audio_path, format=audio_format)
+                            except Exception as e:
+                                logger.error(f"Error al reproducir audio: {e}")
+                                show_error(f"Error al reproducir el audio: {str(e)}")
                         else:
+                            # La caché ya intentó descargarlo de Storage
                             show_error("No se pudo descargar el audio desde el almacenamiento. Intenta más tarde.")
-                    except Exception as e:
-                        logger.error(f"Error al descargar/reproducir audio: {e}")
-                        show_error(f"Error al procesar el audio: {str(e)}")
                 
                 st.markdown("")  # Espaciado
                 
                 col_transcribe, col_delete = st.columns([1, 1])
                 
                 with col_transcribe:
-                    if st.button("Transcribir", use_container_width=True):
-                        with st.spinner("Transcribiendo..."):
-                            try:
-                                audio_path = recorder.get_recording_path(selected_audio)
-                                transcription = transcriber_model.transcript_audio(audio_path)
-                                st.session_state.contexto = transcription.text
-                                st.session_state.selected_audio = selected_audio
-                                st.session_state.loaded_audio = selected_audio
-                                st.session_state.chat_enabled = True
-                                st.session_state.keywords = {}
-                                
-                                transcription_id = db_utils.save_transcription(
-                                    recording_filename=selected_audio,
-                                    content=transcription.text,
-                                    language="es"
-                                )
-                                
-                                show_success("Transcripción completada")
-                                add_debug_event(f"Transcripción completada para '{selected_audio}' (ID: {transcription_id})", "success")
-                                
-                                # === ANÁLISIS AUTOMÁTICO DE OPORTUNIDADES CON IA ===
-                                analysis_placeholder = st.empty()
-                                with analysis_placeholder.container():
-                                    st.markdown('''
-                                    <div style="
-                                        background: linear-gradient(135deg, rgba(139, 92, 246, 0.1) 0%, rgba(59, 130, 246, 0.05) 100%);
-                                        border: 2px solid rgba(139, 92, 246, 0.3);
-                                        border-radius: 12px;
-                                        padding: 16px;
-                                        margin: 12px 0;
-                                        text-align: center;
-                                    ">
-                                        <div style="font-size: 14px; font-weight: 600; color: #8b5cf6; margin-bottom: 8px;">
-                                            🤖 Generando Tickets Automáticamente...
-                                        </div>
-                                        <div style="font-size: 12px; color: #60a5fa;">
-                                            Analizando intenciones y oportunidades con IA
-                                        </div>
-                                    </div>
-                                    ''', unsafe_allow_html=True)
-                                
-                                opportunities_manager = OpportunitiesManager()
-                                
-                                # Obtener recording_id del mapeo
-                                recordings_map = st.session_state.get("recordings_map", {})
-                                rec_id = recordings_map.get(selected_audio)
-                                
-                                logger.info(f"[STREAMLIT] ========== ANÁLISIS DE IA INICIADO ==========")
-                                logger.info(f"[STREAMLIT] selected_audio: '{selected_audio}'")
-                                logger.info(f"[STREAMLIT] recordings_map keys: {list(recordings_map.keys())[:3]}...")
-                                logger.info(f"[STREAMLIT] recording_id obtenido: {rec_id}")
-                                logger.info(f"[STREAMLIT] transcription length: {len(transcription.text)} chars")
-                                
-                                try:
-                                    num_opportunities, detected_opps = opportunities_manager.analyze_opportunities_with_ai(
-                                        transcription=transcription.text,
-                                        audio_filename=selected_audio,
-                                        recording_id=rec_id
-                                    )
-                                    logger.info(f"[STREAMLIT] ✅ Análisis completado")
-                                    logger.info(f"[STREAMLIT] Detectadas: {num_opportunities} | Guardadas: {len(detected_opps) if detected_opps else 0}")
-                                except Exception as analysis_error:
-                                    logger.error(f"[STREAMLIT] ❌ ERROR: {type(analysis_error).__name__}")
-                                    logger.error(f"[STREAMLIT]    {str(analysis_error)}")
-                                    num_opportunities = 0
-                                    detected_opps = []
-                                
-                                logger.info(f"[STREAMLIT] ========== FIN DEL ANÁLISIS ==========\n")
-                                
-                                # Actualizar el indicador con los resultados
-                                with analysis_placeholder.container():
-                                    if num_opportunities > 0:
-                                        # Determinar si se guardaron o solo se detectaron
-                                        if detected_opps:
-                                            tickets_status = f"Se han creado {len(detected_opps)} ticket(s) automáticamente"
-                                            subtitle = "Los tickets están disponibles en la sección de 'Oportunidades'"
-                                            icon = "✅"
-                                        else:
-                                            tickets_status = f"Se detectaron {num_opportunities} oportunidad(es)"
-                                            subtitle = "Oportunidades identificadas por IA (pendiente almacenamiento)"
-                                            icon = "🔍"
-                                        
-                                        st.markdown(f'''
-                                        <div style="
-                                            background: linear-gradient(135deg, rgba(34, 197, 94, 0.1) 0%, rgba(59, 130, 246, 0.05) 100%);
-                                            border: 2px solid rgba(34, 197, 94, 0.3);
-                                            border-radius: 12px;
-                                            padding: 16px;
-                                            margin: 12px 0;
-                                            text-align: center;
-                                        ">
-                                            <div style="font-size: 14px; font-weight: 600; color: #22c55e; margin-bottom: 8px;">
-                                                {icon} Analisis Completado
-                                            </div>
-                                            <div style="font-size: 13px; color: #86efac; font-weight: 500;">
-                                                {tickets_status}
-                                            </div>
-                                            <div style="font-size: 11px; color: #4ade80; margin-top: 6px;">
-                                                {subtitle}
-                                            </div>
-                                        </div>
-                                        ''', unsafe_allow_html=True)
-                                        
-                                        if detected_opps:
-                                            toast_msg = f"Se han creado {len(detected_opps)} tickets automáticamente"
-                                        else:
-                                            toast_msg = f"Se detectaron {num_opportunities} oportunidades por IA"
-                                        
-                                        st.toast(toast_msg, icon="🤖")
-                                        add_debug_event(
-                                            f"IA detectó {num_opportunities} oportunidades para '{selected_audio}'",
-                                            "success"
-                                        )
-                                    else:
-                                        st.markdown('''
-                                        <div style="
-                                            background: linear-gradient(135deg, rgba(59, 130, 246, 0.1) 0%, rgba(34, 197, 94, 0.05) 100%);
-                                            border: 2px solid rgba(59, 130, 246, 0.3);
-                                            border-radius: 12px;
-                                            padding: 16px;
-                                            margin: 12px 0;
-                                            text-align: center;
-                                        ">
-                                            <div style="font-size: 14px; font-weight: 600; color: #3b82f6; margin-bottom: 8px;">
-                                                ℹ️ Análisis Completado
-                                            </div>
-                                            <div style="font-size: 13px; color: #93c5fd;">
-                                                No se detectaron nuevas oportunidades en esta transcripción
-                                            </div>
-                                        </div>
-                                        ''', unsafe_allow_html=True)
-                                        
-                                        st.toast(
-                                            "ℹ️ Análisis completado: No se detectaron oportunidades relevantes.",
-                                            icon="ℹ️"
-                                        )
-                                        add_debug_event(
-                                            f"IA no detectó oportunidades para '{selected_audio}'",
-                                            "info"
-                                        )
-                            except Exception as e:
-                                show_error(f"Error al transcribir: {e}")
+                    # El trabajo corre en la cola de fondo; aquí solo se encola y se consulta
+                    job_queue = get_job_queue()
+                    latest_job = job_queue.latest_for(selected_audio, kind="transcribe")
+                    job_active = bool(latest_job and latest_job["status"] in ACTIVE_STATUSES)
+                    if job_active:
+                        st.session_state.watched_jobs[selected_audio] = latest_job["id"]
+                    
+                    if st.button("Transcribir", use_container_width=True, disabled=job_active):
+                        job_id = job_queue.enqueue(
+                            "transcribe",
+                            selected_audio,
+                            payload={"audio_hash": st.session_state.audio_hashes.get(selected_audio)}
+                        )
+                        st.session_state.watched_jobs[selected_audio] = job_id
+                        add_debug_event(f"Transcripción encolada para '{selected_audio}' (trabajo {job_id[:8]})", "info")
+                        st.rerun()
                 
                 with col_delete:
                     if st.button("Eliminar", use_container_width=True):
@@ -433,6 +416,13 @@ with col_right:
                             if st.button("No", key=f"confirm_no_{selected_audio}"):
                                 st.session_state.delete_confirmation.pop(selected_audio, None)
                                 st.rerun()
+                
+                # Estado del trabajo en curso y resultado del último terminado
+                if selected_audio in st.session_state.watched_jobs:
+                    render_job_status(selected_audio)
+                finished_job = st.session_state.finished_jobs.pop(selected_audio, None)
+                if finished_job:
+                    render_job_result(selected_audio, finished_job)
         
         # ===== TAB 2: AUDIOS GUARDADOS (BÚSQUEDA) =====
         with tab2:
@@ -481,7 +471,7 @@ with col_right:
                 
                 for recording in paginated_recordings:
                     display_name = format_recording_name(recording)
-                    is_transcribed = is_audio_transcribed(recording, db_utils)
+                    is_transcribed = transcribed_map.get(recording, False)
                     transcribed_badge = components.render_badge("Transcrito", "transcribed") if is_transcribed else ""
                     
                     # Verificar si este audio está siendo editado
@@ -513,7 +503,11 @@ with col_right:
                                     success = db_utils.update_recording_filename(recording, new_filename)
                                     
                                     if success:
-                                        st.session_state.recordings = recorder.get_recordings_from_supabase()
+                                        catalog.rename(recording, new_filename)
+                                        recorder.rename_recording(recording, new_filename)
+                                        if recording in st.session_state.audio_hashes:
+                                            st.session_state.audio_hashes[new_filename] = st.session_state.audio_hashes.pop(recording)
+                                        st.session_state.recordings = catalog.filenames()
                                         st.session_state.editing_audio = None
                                         st.session_state.new_audio_name = ""
                                         show_success(f"✓ Renombrado a: {new_filename}")
@@ -792,10 +786,18 @@ if st.session_state.get("chat_enabled", False) and st.session_state.get("context
     if st.session_state.get("generating_summary"):
         with st.spinner("Generando resumen con IA..."):
             try:
-                resumen = chat_model.call_model(
-                    "Por favor genera un resumen profesional y conciso. Incluye: 1) Tema principal, 2) Puntos clave discutidos, 3) Decisiones o acciones importantes.",
-                    st.session_state.contexto
-                )
+                selected = st.session_state.get("selected_audio")
+                
+                def generate_summary(prompt, context):
+                    # Reuniones largas: resumen por ventanas y combinación (nodos cacheados)
+                    return HierarchicalSummarizer(chat_model).summarize(context, prompt, cache_key=selected)
+                
+                transcription_id = st.session_state.get("transcription_id")
+                if transcription_id:
+                    # Memoizado por versión de transcripción: normalmente ya lo generó la cola al transcribir
+                    resumen = get_summary_store().get_or_generate(transcription_id, st.session_state.contexto, generate_summary)
+                else:
+                    resumen = generate_summary(SUMMARY_PROMPT, st.session_state.contexto)
                 st.session_state.summary_text = resumen
                 st.session_state.generating_summary = False
                 st.rerun()
@@ -975,10 +977,7 @@ if st.session_state.get("chat_enabled", False) and st.session_state.get("context
                     keywords_list
                 )
                 
-                saved_count = 0
-                for opp in opportunities:
-                    opp_manager.save_opportunity(opp, st.session_state.selected_audio)
-                    saved_count += 1
+                saved_count = opp_manager.save_opportunities(opportunities, st.session_state.selected_audio)
                 
                 if saved_count > 0:
                     show_success_expanded(f"{saved_count} ticket(s) de oportunidad generado(s)")
@@ -1188,22 +1187,55 @@ if st.session_state.get("chat_enabled", False):
     
     if user_input:
         st.session_state.chat_history.append(f"👤 **Usuario**: {user_input}")
+        st.markdown(f"""
+        <div class="chat-message chat-message-user">
+            <div class="chat-avatar chat-avatar-user avatar-pulse">👤</div>
+            <div class="chat-bubble chat-bubble-user">{user_input}</div>
+        </div>
+        """, unsafe_allow_html=True)
+        answer_placeholder = st.empty()
+        # Cualquier interacción relanza el script: el stream se cierra y se cancela la llamada a Gemini
+        st.button("⏹️ Detener respuesta", key="stop_chat_stream")
         
-        with st.spinner("Generando respuesta..."):
-            try:
-                # Pasar palabras clave al modelo
-                keywords = st.session_state.get("keywords", {})
-                response = chat_model.call_model(user_input, st.session_state.contexto, keywords)
-                st.session_state.chat_history.append(f"🤖 **IA**: {response}")
-                
-                # Limitar historial a últimos N mensajes para no sobrecargar memoria
-                max_history = st.session_state.chat_history_limit
-                if len(st.session_state.chat_history) > max_history:
-                    st.session_state.chat_history = st.session_state.chat_history[-max_history:]
-                
-                st.rerun()
-            except Exception as e:
-                show_error(f"Error al generar respuesta: {e}")
+        answer = ""
+        completed = False
+        stream_error = None
+        # Pasar palabras clave al modelo
+        keywords = st.session_state.get("keywords", {})
+        # Reuniones largas: solo los fragmentos relevantes (índice BM25); cortas: contexto cacheado por grabación
+        stream = chat_model.call_model(
+            user_input, st.session_state.contexto, keywords,
+            cache_key=st.session_state.get("selected_audio"),
+            stream=True
+        )
+        try:
+            with closing(stream):
+                for text in stream:
+                    answer += text
+                    answer_placeholder.markdown(f"""
+                    <div class="chat-message chat-message-ai">
+                        <div class="chat-avatar chat-avatar-ai avatar-spin">✨</div>
+                        <div class="chat-bubble chat-bubble-ai">{answer} ▌</div>
+                    </div>
+                    """, unsafe_allow_html=True)
+            completed = True
+        except Exception as e:
+            stream_error = e
+        finally:
+            # Lo ya recibido se conserva aunque el stream falle o se detenga
+            if answer:
+                suffix = "" if completed else " _(respuesta interrumpida)_"
+                st.session_state.chat_history.append(f"🤖 **IA**: {answer}{suffix}")
+            
+            # Limitar historial a últimos N mensajes para no sobrecargar memoria
+            max_history = st.session_state.chat_history_limit
+            if len(st.session_state.chat_history) > max_history:
+                st.session_state.chat_history = st.session_state.chat_history[-max_history:]
+        
+        if stream_error is not None:
+            show_error(f"Error al generar respuesta: {stream_error}")
+        else:
+            st.rerun()
 else:
     show_info_expanded("Carga un audio y transcríbelo para habilitar el chat.")
 
@@ -1213,6 +1245,32 @@ st.markdown("")
 
 # SECCIÓN DEBUG
 with st.expander("🔧 DEBUG - Estado de Supabase"):
+    # Los contadores son de todo el proceso: la diferencia incluye lo que abrieron
+    # a la vez otras sesiones y los workers de la cola, no solo este rerun
+    connection_stats = db_utils.get_connection_stats()
+    show_info_debug(
+        f"Conexiones abiertas en el proceso durante este rerun (todas las sesiones y workers): "
+        f"{connection_stats['connections_opened'] - connection_stats_start['connections_opened']} "
+        f"(clientes creados: {connection_stats['clients_created'] - connection_stats_start['clients_created']}, "
+        f"total proceso: {connection_stats['connections_opened']})"
+    )
+    audio_cache_stats = get_audio_cache().stats()
+    show_info_debug(
+        f"Caché de audio: {audio_cache_stats['hits']} aciertos, {audio_cache_stats['misses']} fallos, "
+        f"{audio_cache_stats['coalesced']} descargas compartidas, {audio_cache_stats['evictions']} expulsados "
+        f"({audio_cache_stats['files']} archivos, {audio_cache_stats['bytes'] / (1024 * 1024):.1f}MB)"
+    )
+    gemini_stats = get_gemini_gateway().stats()
+    show_info_debug(
+        f"Gemini: {gemini_stats['calls']} llamadas, {gemini_stats['retries']} reintentos (429/503), "
+        f"{gemini_stats['failures']} fallos, {gemini_stats['tokens']:,.0f} tokens, "
+        f"{gemini_stats['throttled_seconds']:.1f}s de espera por cuota"
+    )
+    context_stats = get_chat_context_cache().stats()
+    show_info_debug(
+        f"Caché de contexto del chat: {context_stats['active']} activos, {context_stats['hits']} aciertos, "
+        f"{context_stats['created']} creados, {context_stats['failed']} fallidos, {context_stats['expired']} caducados"
+    )
     show_info_debug("Probando conexión a Supabase...")
     
     try:
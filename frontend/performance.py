@@ -38,10 +38,29 @@ def get_transcription_cached(filename: str, db_utils) -> Optional[str]:
     except Exception:
         return None
 
+def get_transcribed_map(filenames: List[str], db_utils) -> Dict[str, bool]:
+    """Estado "transcrito" de una lista de audios con una sola consulta
+    
+    El resultado se cachea en database.py y se invalida al guardar o
+    eliminar transcripciones/grabaciones.
+    
+    Args:
+        filenames: Nombres de archivo
+        db_utils: Módulo de base de datos
+        
+    Returns:
+        Dict {filename: True si la transcripción tiene contenido real}
+    """
+    try:
+        return db_utils.get_transcription_status(filenames) or {}
+    except Exception:
+        return {}
+
 def is_audio_transcribed(filename: str, db_utils) -> bool:
-    """Verifica EXPLICITAMENTE si un audio está transcrito (SIN caché)
+    """Verifica si un audio está transcrito
     
-    Usa verificación directa para audios nuevos.
+    Usa la caché de estado en lote (invalidada al guardar/eliminar).
+    Para listas usar get_transcribed_map y evitar una consulta por audio.
     
     Args:
         filename: Nombre del archivo
@@ -50,17 +69,7 @@ def is_audio_transcribed(filename: str, db_utils) -> bool:
     Returns:
         True sólo si la transcripción tiene contenido real
     """
-    try:
-        # Consulta DIRECTA sin caché para audios nuevos
-        result = db_utils.get_transcription_by_filename(filename)
-        if not result:
-            return False
-        
-        # Verificar que REALMENTE tiene contenido
-        content = result.get("content", "") if isinstance(result, dict) else result
-        return bool(content and content.strip())  # No es "vacío"
-    except Exception:
-        return False
+    return get_transcribed_map([filename], db_utils).get(filename, False)
 
 
 
@@ -256,8 +265,8 @@ def load_recording_with_all_data(db_utils, filename: str) -> Optional[Dict[str,
         Dict con recording + transcriptions + opportunities o None
     """
     try:
-        # Query optimizada que trae todo
-        result = db_utils.db.table("recordings").select(
+        # Query optimizada que trae todo (cliente compartido)
+        result = db_utils.init_supabase().table("recordings").select(
             "*, transcriptions(*), opportunities(*)"
         ).eq("filename", filename).execute()
         
@@ -281,7 +290,7 @@ def batch_load_opportunities(db_utils, recording_ids: List[str]) -> Dict[str, Li
     """
     result_dict = {}
     try:
-        result = db_utils.db.table("opportunities").select("*").in_(
+        result = db_utils.init_supabase().table("opportunities").select("*").in_(
             "recording_id", recording_ids
         ).execute()
         
@@ -356,6 +365,6 @@ def batch_delete_recordings(db_utils, filenames: List[str]) -> tuple:
 def delete_audio(filename: str, db_utils) -> bool:
     """Helper para eliminar audio"""
     try:
-        return db_utils.delete_recording_from_db(db_utils.db, filename)
+        return db_utils.delete_recording_by_filename(filename)
     except Exception:
         return False
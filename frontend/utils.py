@@ -6,30 +6,32 @@ archivos de audio en la interfaz de Streamlit.
 import hashlib
 import streamlit as st
 from pathlib import Path
-from typing import Tuple, Optional, Any
+from typing import Tuple, Optional, Any, Union
 import sys
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
 from config import MAX_AUDIO_SIZE_MB
 from logger import get_logger
-from frontend.notifications import show_success, show_error, show_success_debug
+from frontend.notifications import show_success, show_error, show_info, show_success_debug
+from recordings_catalog import get_recordings_catalog
 import streamlit as st
 
 logger = get_logger(__name__)
 
 def process_audio_file(
-    audio_bytes: bytes,
+    audio_bytes: Union[bytes, memoryview],
     filename: str,
     recorder: Any,
     db_utils: Any
 ) -> Tuple[bool, Optional[str]]:
     """Procesa un archivo de audio (grabación o carga)
     
-    Valida tamaño, verifica duplicados por hash, guarda en disco y BD,
-    y actualiza el session_state.
+    Valida tamaño, verifica duplicados por hash (en la sesión y en el índice
+    persistente), guarda en disco y BD, y actualiza el session_state.
     
     Args:
-        audio_bytes: Contenido del archivo en bytes
+        audio_bytes: Contenido del archivo (bytes o memoryview del buffer subido, sin copiar)
         filename: Nombre del archivo de audio
         recorder: Instancia de AudioRecorder
         db_utils: Módulo de utilidades de BD
@@ -51,15 +53,28 @@ def process_audio_file(
             show_error("Audio vacío")
             return False, None
         
-        # Detectar duplicados por hash MD5
-        audio_hash = hashlib.md5(audio_bytes).hexdigest()
+        # Detectar duplicados por hash SHA-256 (reutilizado como clave de la caché de transcripciones)
+        audio_hash = hashlib.sha256(audio_bytes).hexdigest()
         if audio_hash in st.session_state.processed_audios:
             logger.info(f"Audio ya procesado: {audio_hash}")
             return False, None
         
+        if "audio_hashes" not in st.session_state:
+            st.session_state.audio_hashes = {}
+        
+        # Duplicado persistente (otra sesión/navegador ya lo subió): sin subida ni fila nueva
+        existing = db_utils.get_recording_by_hash(audio_hash)
+        if existing:
+            st.session_state.processed_audios.add(audio_hash)
+            st.session_state.audio_hashes[existing["filename"]] = audio_hash
+            st.session_state.selected_audio = existing["filename"]
+            show_info(f"Este audio ya existe como '{existing['filename']}'")
+            logger.info(f"Audio duplicado: {filename} → {existing['filename']} (ID: {existing['id']})")
+            return True, existing["id"]
+        
         # Guardar archivo
         filepath = recorder.save_recording(audio_bytes, filename)
-        recording_id = db_utils.save_recording_to_db(filename, filepath)
+        recording_id = db_utils.save_recording_to_db(filename, filepath, content_hash=audio_hash)
         
         if not recording_id:
             show_error("Error: No se guardó en Supabase")
@@ -68,7 +83,10 @@ def process_audio_file(
         
         # Actualizar session state
         st.session_state.processed_audios.add(audio_hash)
-        st.session_state.recordings = recorder.get_recordings_from_supabase()
+        st.session_state.audio_hashes[filename] = audio_hash
+        catalog = get_recordings_catalog()
+        catalog.refresh(force=True)
+        st.session_state.recordings = catalog.filenames()
         
         logger.info(f"✓ Audio OK: {filename} (ID: {recording_id})")
         # Agregar al registro de debug
@@ -108,9 +126,11 @@ def delete_audio(filename: str, recorder: Any, db_utils: Any) -> bool:
         # Eliminar de BD y Storage
         db_utils.delete_recording_by_filename(filename)
         recorder.delete_recording(filename)
+        get_recordings_catalog().remove(filename)
         
-        # Limpiar session state
-        st.session_state.processed_audios.clear()
+        # Limpiar session state: solo el hash de este audio, para poder volver a subirlo
+        audio_hash = st.session_state.get("audio_hashes", {}).pop(filename, None)
+        st.session_state.processed_audios.discard(audio_hash)
         
         if filename in st.session_state.recordings:
             st.session_state.recordings.remove(filename)
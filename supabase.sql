@@ -20,6 +20,8 @@ CREATE TABLE public.recordings (
   filename text NOT NULL,
   filepath text NOT NULL,
   transcription text,
+  content_hash text,
+  storage_key text,
   created_at timestamp without time zone DEFAULT now(),
   updated_at timestamp without time zone DEFAULT now(),
   CONSTRAINT recordings_pkey PRIMARY KEY (id)
@@ -33,4 +35,16 @@ CREATE TABLE public.transcriptions (
   updated_at timestamp with time zone DEFAULT now(),
   CONSTRAINT transcriptions_pkey PRIMARY KEY (id),
   CONSTRAINT transcriptions_recording_id_fkey FOREIGN KEY (recording_id) REFERENCES public.recordings(id)
+);
+CREATE TABLE public.summaries (
+  id uuid NOT NULL DEFAULT gen_random_uuid(),
+  transcription_id uuid NOT NULL,
+  prompt_hash text NOT NULL,
+  model text NOT NULL,
+  content_hash text NOT NULL,
+  summary text NOT NULL,
+  created_at timestamp with time zone DEFAULT now(),
+  CONSTRAINT summaries_pkey PRIMARY KEY (id),
+  CONSTRAINT summaries_key UNIQUE (transcription_id, prompt_hash, model),
+  CONSTRAINT summaries_transcription_id_fkey FOREIGN KEY (transcription_id) REFERENCES public.transcriptions(id) ON DELETE CASCADE
 );
\ No newline at end of file
@@ -0,0 +1,13 @@
+"""conftest.py - Rutas de importación y entorno mínimo para los tests"""
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "backend"))
+
+# config.py exige estas variables al importarse; los tests no llegan a usarlas
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
@@ -0,0 +1,43 @@
+"""fakes.py - Cliente Supabase en memoria para los tests
+
+Cada consulta registra sus llamadas encadenadas (`select`, `eq`, `in_`...) y,
+al ejecutarse, pide la respuesta al manejador de su tabla. Un manejador
+recibe la consulta y devuelve las filas o lanza una excepción.
+"""
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Tuple
+
+
+class FakeQuery:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table = table
+        self.ops: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        def method(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+            return self
+        return method
+
+    def args(self, name: str) -> List[tuple]:
+        """Argumentos de cada llamada a `name`, en orden"""
+        return [args for op, args, _ in self.ops if op == name]
+
+    def execute(self):
+        self.db.executed.append(self)
+        handler = self.db.handlers.get(self.table)
+        return SimpleNamespace(data=handler(self) if handler else [])
+
+
+class FakeSupabase:
+    def __init__(self, **handlers: Callable[[FakeQuery], List[Dict]]):
+        self.handlers = handlers
+        self.executed: List[FakeQuery] = []
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def queries(self, table: str, op: str) -> List[FakeQuery]:
+        """Consultas ejecutadas sobre `table` que incluyen la llamada `op`"""
+        return [query for query in self.executed if query.table == table and query.args(op)]
@@ -0,0 +1,76 @@
+"""Tests de la caché local de audios: descarga única, expulsión LRU y fijado"""
+import os
+import threading
+import time
+
+from audio_cache import AudioCache
+
+
+def make_cache(tmp_path, max_bytes=250, size=100, delay=0.0):
+    downloads = []
+
+    def downloader(filename, destination):
+        downloads.append(filename)
+        time.sleep(delay)
+        with open(destination, "wb") as f:
+            f.write(b"x" * size)
+        return True
+
+    return AudioCache(cache_dir=tmp_path, max_bytes=max_bytes, downloader=downloader), downloads
+
+
+def age(cache, filename, seconds_ago):
+    stamp = time.time() - seconds_ago
+    os.utime(cache.path_for(filename), (stamp, stamp))
+
+
+def test_least_recently_used_file_is_evicted(tmp_path):
+    cache, downloads = make_cache(tmp_path)
+    cache.get("a.wav")
+    cache.get("b.wav")
+    age(cache, "a.wav", 100)
+    age(cache, "b.wav", 200)
+
+    cache.get("c.wav")
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.wav", "c.wav"]
+    assert cache.stats()["evictions"] == 1
+    assert downloads == ["a.wav", "b.wav", "c.wav"]
+
+
+def test_cached_file_is_not_downloaded_again(tmp_path):
+    cache, downloads = make_cache(tmp_path)
+
+    assert cache.get("a.wav") == cache.get("a.wav") == str(tmp_path / "a.wav")
+    assert downloads == ["a.wav"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_pinned_file_survives_eviction(tmp_path):
+    cache, _ = make_cache(tmp_path)
+    with cache.use("a.wav") as path:
+        cache.get("b.wav")
+        age(cache, "a.wav", 300)
+        age(cache, "b.wav", 200)
+        cache.get("c.wav")
+
+        assert os.path.exists(path)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.wav", "c.wav"]
+
+    # Sin fijar vuelve a ser el menos usado
+    cache.get("d.wav")
+    assert not (tmp_path / "a.wav").exists()
+
+
+def test_concurrent_requests_share_one_download(tmp_path):
+    cache, downloads = make_cache(tmp_path, delay=0.2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("a.wav"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert downloads == ["a.wav"]
+    assert results == [str(tmp_path / "a.wav")] * 4
+    assert cache.stats()["coalesced"] == 3
@@ -0,0 +1,173 @@
+"""Tests del gateway de Gemini: cubos de cuota y reintentos ante 429/503"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import gemini_gateway
+from gemini_gateway import GeminiGateway, TokenBucket, is_retryable
+
+
+class ApiError(Exception):
+    def __init__(self, code, message=""):
+        super().__init__(message or f"{code} error")
+        self.code = code
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj simulado: `asyncio.sleep` del módulo avanza el tiempo en vez de esperar"""
+    state = {"now": 0.0, "sleeps": []}
+
+    async def fake_sleep(seconds):
+        state["sleeps"].append(seconds)
+        state["now"] += seconds
+
+    monkeypatch.setattr(gemini_gateway.time, "monotonic", lambda: state["now"])
+    monkeypatch.setattr(gemini_gateway.asyncio, "sleep", fake_sleep)
+    return state
+
+
+class FakeModel:
+    """Cliente que falla con los errores indicados y después responde"""
+
+    def __init__(self, *errors, chunks=("hola", " mundo"), tokens=None):
+        self.errors = list(errors)
+        self.chunks = chunks
+        self.tokens = tokens
+        self.calls = 0
+
+    async def generate_content_async(self, contents, stream=False):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        usage = SimpleNamespace(total_token_count=self.tokens) if self.tokens else None
+        if not stream:
+            return SimpleNamespace(text="".join(self.chunks), usage_metadata=usage)
+        return FakeStream(self.chunks, usage)
+
+
+class FakeStream:
+    def __init__(self, chunks, usage, fail_after=None):
+        self.chunks = list(chunks)
+        self.usage_metadata = usage
+        self.fail_after = fail_after
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for index, chunk in enumerate(self.chunks):
+            if self.fail_after is not None and index == self.fail_after:
+                raise ApiError(503)
+            yield SimpleNamespace(text=chunk)
+
+
+def gateway(**kwargs):
+    options = dict(rpm=600, tpm=100000, max_in_flight=2, max_retries=2, backoff_base=1.0, backoff_max=4.0)
+    options.update(kwargs)
+    return GeminiGateway(**options)
+
+
+def test_bucket_waits_for_refill_once_capacity_is_spent(clock):
+    async def scenario():
+        bucket = TokenBucket(60)  # 1 por segundo
+        waits = [await bucket.acquire() for _ in range(60)]
+        return waits, await bucket.acquire(), await bucket.acquire(3)
+
+    waits, next_wait, big_wait = asyncio.run(scenario())
+    assert waits == [0.0] * 60
+    assert next_wait == pytest.approx(1.0)
+    assert big_wait == pytest.approx(3.0)
+    assert clock["now"] == pytest.approx(4.0)
+
+
+def test_bucket_caps_requests_larger_than_capacity(clock):
+    async def scenario():
+        bucket = TokenBucket(10)
+        return await bucket.acquire(50), bucket.tokens
+
+    waited, tokens = asyncio.run(scenario())
+    assert waited == 0.0
+    assert tokens == pytest.approx(0.0)
+
+
+def test_adjust_charges_the_real_usage(clock):
+    bucket = TokenBucket(100)
+    bucket.adjust(150)
+
+    assert bucket.tokens == pytest.approx(-50)
+
+
+@pytest.mark.parametrize("error,expected", [
+    (ApiError(429), True), (ApiError(503), True), (Exception("RESOURCE_EXHAUSTED: quota"), True),
+    (ApiError(400), False), (ValueError("bad prompt"), False),
+])
+def test_is_retryable(error, expected):
+    assert is_retryable(error) is expected
+
+
+def test_generate_retries_429_and_503_with_backoff(clock, monkeypatch):
+    monkeypatch.setattr(gemini_gateway.random, "uniform", lambda low, high: high)
+    model = FakeModel(ApiError(429), ApiError(503))
+    gw = gateway()
+
+    response = asyncio.run(gw.generate("hola", model))
+
+    assert response.text == "hola mundo"
+    assert model.calls == 3
+    assert clock["sleeps"] == [1.0, 2.0]
+    assert gw.stats()["retries"] == 2
+
+
+def test_generate_does_not_retry_other_errors(clock):
+    model = FakeModel(ApiError(400))
+    gw = gateway()
+
+    with pytest.raises(ApiError):
+        asyncio.run(gw.generate("hola", model))
+    assert model.calls == 1
+    assert gw.stats()["failures"] == 1
+
+
+def test_generate_gives_up_after_max_retries(clock):
+    model = FakeModel(*(ApiError(429) for _ in range(5)))
+    gw = gateway(max_retries=2)
+
+    with pytest.raises(ApiError):
+        asyncio.run(gw.generate("hola", model))
+    assert model.calls == 3
+
+
+def test_generate_settles_tokens_with_reported_usage(clock):
+    gw = gateway(tpm=1000)
+    asyncio.run(gw.generate("x" * 400, FakeModel(tokens=500), estimated_tokens=100))
+
+    assert gw.tokens.tokens == pytest.approx(500)
+    assert gw.stats()["tokens"] == 500
+
+
+def test_stream_retries_only_before_the_first_chunk(clock):
+    async def collect(gw, model):
+        return [chunk async for chunk in gw.stream("hola", model)]
+
+    model = FakeModel(ApiError(503))
+    assert asyncio.run(collect(gateway(), model)) == ["hola", " mundo"]
+    assert model.calls == 2
+
+    class FailsMidStream(FakeModel):
+        async def generate_content_async(self, contents, stream=False):
+            self.calls += 1
+            return FakeStream(self.chunks, None, fail_after=1)
+
+    model = FailsMidStream()
+    chunks = []
+
+    async def consume():
+        async for chunk in gateway().stream("hola", model):
+            chunks.append(chunk)
+
+    with pytest.raises(ApiError):
+        asyncio.run(consume())
+    assert chunks == ["hola"]
+    assert model.calls == 1
@@ -0,0 +1,77 @@
+"""Tests del resumen jerárquico: cortes definidos por contenido y nodos cacheados"""
+import asyncio
+
+from hierarchical_summary import (
+    HierarchicalSummarizer, _NodeCache, _digest, content_defined_groups, split_leaf_windows
+)
+
+
+def turns(count, edited=None):
+    lines = []
+    for i in range(count):
+        text = f"Intervención número {i} sobre el punto {i % 7} del orden del día"
+        if i == edited:
+            text += " (corregida)"
+        lines.append(f'Voz {i % 3}: "{text}"')
+    return lines
+
+
+def groups_of(items):
+    keys = [_digest(item) for item in items]
+    return [[items[i] for i in group] for group in content_defined_groups(items, keys, 200, 800, 4)]
+
+
+def test_groups_cover_all_items_in_order_within_bounds():
+    items = turns(300)
+    groups = groups_of(items)
+
+    assert [item for group in groups for item in group] == items
+    assert all(sum(map(len, group)) < 800 + max(map(len, items)) for group in groups)
+    assert all(sum(map(len, group)) >= 200 for group in groups[:-1])
+
+
+def test_editing_one_item_only_changes_its_group_and_the_next():
+    before = groups_of(turns(300))
+    after = groups_of(turns(300, edited=150))
+
+    changed_before = [group for group in before if group not in after]
+    changed_after = [group for group in after if group not in before]
+    assert 1 <= len(changed_before) <= 2
+    assert 1 <= len(changed_after) <= 2
+
+
+def test_leaf_windows_are_stable_under_a_local_edit():
+    original = "\n".join(turns(400))
+    edited = "\n".join(turns(400, edited=200))
+    before, after = split_leaf_windows(original, 2000), split_leaf_windows(edited, 2000)
+
+    assert "\n".join(before) == original
+    longest = max(len(line) for line in original.split("\n"))
+    assert all(len(window) <= 4000 + longest for window in before)
+    assert len(set(before) - set(after)) <= 2
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = 0
+
+    async def call_model_async(self, instruction, context, cache_key=None, use_retrieval=True):
+        self.calls += 1
+        return f"resumen {_digest(instruction, context)[:8]}"
+
+
+def test_resummarizing_after_an_edit_reuses_cached_nodes(tmp_path):
+    cache = _NodeCache(tmp_path, 10 ** 7)
+    original = "\n".join(turns(400))
+    edited = "\n".join(turns(400, edited=200))
+
+    first = FakeModel()
+    summarizer = HierarchicalSummarizer(first, window_chars=2000, fan_in=4, min_chars=1000, cache=cache)
+    asyncio.run(summarizer.summarize_async(original, "Resume la reunión"))
+
+    second = FakeModel()
+    summarizer = HierarchicalSummarizer(second, window_chars=2000, fan_in=4, min_chars=1000, cache=cache)
+    asyncio.run(summarizer.summarize_async(edited, "Resume la reunión"))
+
+    assert first.calls > 10
+    assert 0 < second.calls < first.calls / 2
@@ -0,0 +1,95 @@
+"""Tests de la cola de trabajos: reclamación, arrendamientos y recuperación"""
+import sqlite3
+import time
+
+import pytest
+
+from job_queue import DONE, FAILED, QUEUED, RUNNING, JobQueue
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "jobs.db"
+
+
+def make_queue(db_path, **kwargs):
+    return JobQueue(db_path=db_path, workers=1, handlers={}, **kwargs)
+
+
+def set_lease(db_path, job_id, worker_id, lease_until, attempts=1):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, worker_id = ?, lease_until = ?, attempts = ? WHERE id = ?",
+            (RUNNING, worker_id, lease_until, attempts, job_id)
+        )
+
+
+def test_enqueue_is_idempotent_per_filename(db_path):
+    queue = make_queue(db_path)
+    job_id = queue.enqueue("transcribe", "a.wav")
+
+    assert queue.enqueue("transcribe", "a.wav") == job_id
+    assert queue.get(job_id)["status"] == QUEUED
+
+
+def test_claim_takes_the_oldest_job_once(db_path):
+    queue = make_queue(db_path)
+    first = queue.enqueue("transcribe", "a.wav")
+    second = queue.enqueue("transcribe", "b.wav")
+
+    assert queue._claim()["id"] == first
+    assert queue._claim()["id"] == second
+    assert queue._claim() is None
+    job = queue.get(first)
+    assert (job["status"], job["attempts"], job["worker_id"]) == (RUNNING, 1, queue.worker_id)
+
+
+def test_live_lease_of_another_worker_is_not_recovered(db_path):
+    queue = make_queue(db_path)
+    job_id = queue.enqueue("transcribe", "a.wav")
+    set_lease(db_path, job_id, "otro:1:abc", time.time() + 60)
+
+    other = make_queue(db_path)
+    assert other._claim() is None
+    assert other.get(job_id)["status"] == RUNNING
+
+
+def test_expired_lease_is_requeued_and_old_owner_is_ignored(db_path):
+    owner = make_queue(db_path)
+    job_id = owner.enqueue("transcribe", "a.wav")
+    owner._claim()
+    set_lease(db_path, job_id, owner.worker_id, time.time() - 1)
+
+    other = make_queue(db_path)
+    assert other.get(job_id)["status"] == QUEUED
+    assert other._claim()["id"] == job_id
+    assert owner._update(job_id, status=DONE) is False
+    assert other._update(job_id, status=DONE, lease_until=None) is True
+    assert other.get(job_id)["status"] == DONE
+
+
+def test_expired_lease_fails_after_max_attempts(db_path):
+    queue = make_queue(db_path, max_attempts=2)
+    job_id = queue.enqueue("transcribe", "a.wav")
+    set_lease(db_path, job_id, "otro:1:abc", None, attempts=2)
+
+    job = make_queue(db_path, max_attempts=2).get(job_id)
+    assert job["status"] == FAILED
+    assert job["error"]
+
+
+def test_worker_runs_handler_and_stores_result(db_path):
+    queue = JobQueue(db_path=db_path, workers=1, handlers={"transcribe": lambda job, set_stage: {"ok": True}})
+    job_id = queue.enqueue("transcribe", "a.wav")
+    queue.start()
+    try:
+        deadline = time.time() + 5
+        while queue.get(job_id)["status"] != DONE and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        queue.stop()
+
+    job = queue.get(job_id)
+    assert job["status"] == DONE
+    assert job["result"] == {"ok": True}
+    assert job["lease_until"] is None
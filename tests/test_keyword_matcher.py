@@ -0,0 +1,56 @@
+"""Tests de KeywordMatcher: mismas coincidencias que la búsqueda ingenua"""
+import random
+import string
+
+from keyword_matcher import KeywordMatcher, compile_keywords
+
+
+def naive_find_all(text, patterns):
+    hits = set()
+    for index, pattern in enumerate(patterns):
+        start = text.find(pattern)
+        while start != -1:
+            hits.add((start, start + len(pattern), index))
+            start = text.find(pattern, start + 1)
+    return hits
+
+
+def test_matches_naive_search_on_random_text():
+    rng = random.Random(7)
+    alphabet = "abc "
+    text = "".join(rng.choices(alphabet, k=2000))
+    keywords = list({"".join(rng.choices("abc", k=rng.randint(1, 5))) for _ in range(40)})
+    matcher = KeywordMatcher.from_keywords(keywords)
+
+    assert set(matcher.find_all(text)) == naive_find_all(text, matcher.patterns)
+
+
+def test_overlapping_and_nested_patterns():
+    matcher = KeywordMatcher.from_keywords(["he", "she", "his", "hers"])
+    found = {(text_start, matcher.patterns[index]) for text_start, _, index in matcher.find_all("ushers")}
+
+    assert found == {(1, "she"), (2, "he"), (2, "hers")}
+
+
+def test_patterns_are_normalized_and_deduplicated():
+    matcher = KeywordMatcher({"Presupuesto": "finanzas", " presupuesto ": "otro", "": "vacío", "IVA": "impuestos"})
+
+    assert matcher.patterns == ["presupuesto", "iva"]
+    assert matcher.labels == ["finanzas", "impuestos"]
+
+
+def test_from_keywords_dict_reports_variants_under_their_topic():
+    keywords_dict = {"temas_de_interes": {
+        "precio": {"variantes": ["coste", "tarifa"]},
+        "plazo": {"variantes": ["fecha de entrega"]},
+    }}
+    matcher = KeywordMatcher.from_keywords_dict(keywords_dict, topics=["precio"])
+    text = "la tarifa y el coste; el plazo no cuenta"
+
+    assert sorted(matcher.labels[index] for _, _, index in matcher.find_all(text)) == ["precio", "precio"]
+
+
+def test_compile_keywords_is_cached():
+    keywords = tuple(random.Random(1).sample(string.ascii_lowercase, 5))
+
+    assert compile_keywords(keywords) is compile_keywords(keywords)
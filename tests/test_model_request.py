@@ -0,0 +1,66 @@
+"""Tests de la elección de prompt del chat: recuperación, contexto cacheado o completo"""
+import asyncio
+
+import pytest
+
+import Model as model_module
+from transcript_index import TranscriptIndex
+
+LONG_TRANSCRIPTION = "\n".join(f'Voz {i % 3}: "Punto {i} del orden del día sobre el proyecto {i}"' for i in range(200))
+SHORT_TRANSCRIPTION = 'Ana: "Hola"\nLuis: "Buenas"'
+
+
+class FakeIndexStore:
+    def get(self, transcription):
+        return TranscriptIndex.build(transcription, max_chars=200)
+
+
+class FakeContextCache:
+    def __init__(self):
+        self.requests = []
+
+    def get_model(self, cache_key, context, instruction):
+        self.requests.append(cache_key)
+        return "cached-model"
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    cache = FakeContextCache()
+    monkeypatch.setattr(model_module, "get_chat_context_cache", lambda: cache)
+    monkeypatch.setattr(model_module, "get_transcript_index_store", lambda: FakeIndexStore())
+    model = model_module.Model.__new__(model_module.Model)
+    model.model = "chat-model"
+    return model, cache
+
+
+def build(model, context, cache_key="a.wav", use_retrieval=True):
+    return asyncio.run(model._build_request("¿Qué se dijo del proyecto 42?", context, None, cache_key, use_retrieval))
+
+
+def test_long_transcripts_use_retrieval_even_with_a_cache_key(chat):
+    model, cache = chat
+    prompt, client, cached = build(model, LONG_TRANSCRIPTION)
+
+    assert (client, cached) == ("chat-model", False)
+    assert "proyecto 42" in prompt
+    assert len(prompt) < len(LONG_TRANSCRIPTION) / 4
+    assert cache.requests == []
+
+
+def test_callers_without_retrieval_use_the_cached_context(chat):
+    model, cache = chat
+    prompt, client, cached = build(model, LONG_TRANSCRIPTION, use_retrieval=False)
+
+    assert (client, cached) == ("cached-model", True)
+    assert LONG_TRANSCRIPTION not in prompt
+    assert cache.requests == ["a.wav"]
+
+
+def test_short_transcripts_fall_back_to_the_cache_then_inline(chat):
+    model, _ = chat
+    assert build(model, SHORT_TRANSCRIPTION)[1:] == ("cached-model", True)
+
+    prompt, client, cached = build(model, SHORT_TRANSCRIPTION, cache_key=None)
+    assert (client, cached) == ("chat-model", False)
+    assert SHORT_TRANSCRIPTION in prompt
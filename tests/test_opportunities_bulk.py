@@ -0,0 +1,91 @@
+"""Tests del guardado en lote de oportunidades: validación, un insert y reintento fila a fila"""
+import asyncio
+
+import pytest
+
+import OpportunitiesManager as om
+from fakes import FakeSupabase
+
+
+def row(title, **overrides):
+    return {"recording_id": "rec-1", "title": title, "description": f"contexto {title}",
+            "status": "new", "priority": "High", "notes": "", **overrides}
+
+
+def make_manager(handler):
+    manager = om.OpportunitiesManager.__new__(om.OpportunitiesManager)
+    manager.db = FakeSupabase(opportunities=handler)
+    return manager
+
+
+def inserted(query):
+    data = query.args("insert")[0][0]
+    return data if isinstance(data, list) else [data]
+
+
+def echo(query):
+    return [{**data, "id": f"id-{data['title']}"} for data in inserted(query)]
+
+
+@pytest.mark.parametrize("bad", [
+    {"title": "  "}, {"recording_id": None}, {"priority": "Urgent"}, {"status": "Open"},
+])
+def test_validator_rejects_invalid_rows(bad):
+    assert om.validate_opportunity_row({**row("a"), **bad})
+    assert om.validate_opportunity_row(row("a")) is None
+
+
+def test_single_insert_for_valid_rows_keeps_positions():
+    manager = make_manager(echo)
+    rows = [row("a"), row("b", priority="low"), row("c")]
+
+    saved = manager.save_opportunities_bulk(rows)
+
+    assert [(position, created["id"]) for position, created in saved] == [(0, "id-a"), (2, "id-c")]
+    assert len(manager.db.executed) == 1
+    assert [data["title"] for data in inserted(manager.db.executed[0])] == ["a", "c"]
+
+
+def test_failed_batch_is_retried_row_by_row():
+    def handler(query):
+        data = inserted(query)
+        if len(data) > 1 or data[0]["title"] == "b":
+            raise RuntimeError("violates constraint")
+        return echo(query)
+
+    manager = make_manager(handler)
+    saved = manager.save_opportunities_bulk([row("a"), row("b"), row("c")])
+
+    assert [position for position, _ in saved] == [0, 2]
+    retried = [[data["title"] for data in inserted(query)] for query in manager.db.executed[1:]]
+    assert retried == [["a"], ["b"], ["c"]]
+
+
+def test_short_batch_result_only_retries_missing_rows():
+    def handler(query):
+        data = inserted(query)
+        return echo(query)[:1] if len(data) > 1 else echo(query)
+
+    manager = make_manager(handler)
+    saved = manager.save_opportunities_bulk([row("a"), row("b"), row("c")])
+
+    assert [position for position, _ in saved] == [0, 1, 2]
+    retried = [inserted(query)[0]["title"] for query in manager.db.executed[1:]]
+    assert retried == ["b", "c"]
+
+
+def test_async_variant_validates_and_skips_returned_rows(monkeypatch):
+    calls = []
+
+    async def insert_rows_async(table, rows):
+        calls.append([data["title"] for data in rows])
+        created = [{**data, "id": f"id-{data['title']}"} for data in rows]
+        return created[:1] if len(rows) > 1 else created
+
+    monkeypatch.setattr(om, "insert_rows_async", insert_rows_async)
+    manager = om.OpportunitiesManager.__new__(om.OpportunitiesManager)
+
+    saved = asyncio.run(manager.save_opportunities_bulk_async([row("a"), row("b", status="Open"), row("c")]))
+
+    assert [position for position, _ in saved] == [0, 2]
+    assert calls == [["a", "c"], ["c"]]
@@ -0,0 +1,91 @@
+"""Tests del resolver filename → recording_id"""
+import pytest
+
+import recording_resolver
+from fakes import FakeSupabase
+from recording_resolver import RecordingIdResolver
+
+
+class FakeCatalog:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def refresh(self):
+        pass
+
+    def rows(self):
+        return list(self._rows)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(recording_resolver.time, "monotonic", lambda: now[0])
+    return now
+
+
+def make_resolver(catalog_rows, db_rows, **kwargs):
+    db = FakeSupabase(recordings=lambda query: [row for row in db_rows if ("filename", row["filename"]) in query.args("eq")])
+    resolver = RecordingIdResolver(
+        catalog_getter=lambda: FakeCatalog(catalog_rows), db_getter=lambda: db, ttl=600, negative_ttl=30, **kwargs
+    )
+    return resolver, db
+
+
+def test_exact_db_match_wins_over_fuzzy_catalog_match(clock):
+    # El catálogo aún no tiene la grabación nueva, pero sí una con nombre parecido
+    resolver, _ = make_resolver(
+        [{"id": "old", "filename": "Reunión ventas - enero.wav"}],
+        [{"id": "new", "filename": "Reunión ventas - febrero.wav"}],
+    )
+
+    assert resolver.resolve("Reunión ventas - febrero.wav") == "new"
+
+
+def test_fuzzy_match_is_cached_only_for_the_negative_ttl(clock):
+    catalog_rows = [{"id": "r1", "filename": "entrevista"}]
+    db_rows = []
+    resolver, db = make_resolver(catalog_rows, db_rows)
+
+    assert resolver.resolve("entrevista.wav") == "r1"
+    clock[0] += 10
+    assert resolver.resolve("entrevista.wav") == "r1"
+    assert len(db.executed) == 1
+
+    db_rows.append({"id": "r2", "filename": "entrevista.wav"})
+    clock[0] += 30
+    assert resolver.resolve("entrevista.wav") == "r2"
+
+
+def test_misses_expire_after_the_negative_ttl(clock):
+    db_rows = []
+    resolver, db = make_resolver([], db_rows)
+
+    assert resolver.resolve("nuevo.wav") is None
+    db_rows.append({"id": "r1", "filename": "nuevo.wav"})
+    clock[0] += 10
+    assert resolver.resolve("nuevo.wav") is None
+    clock[0] += 25
+    assert resolver.resolve("nuevo.wav") == "r1"
+
+
+def test_exact_hits_are_cached_for_the_full_ttl(clock):
+    resolver, db = make_resolver([], [{"id": "r1", "filename": "a.wav"}])
+
+    assert resolver.resolve("a.wav") == "r1"
+    clock[0] += 500
+    assert resolver.resolve("a.wav") == "r1"
+    assert len(db.executed) == 1
+    assert resolver.stats()["hits"] == 1
+
+
+def test_lru_bound_and_invalidate(clock):
+    rows = [{"id": f"r{i}", "filename": f"{i}.wav"} for i in range(3)]
+    resolver, _ = make_resolver(rows, [], max_entries=2)
+
+    for row in rows:
+        resolver.resolve(row["filename"])
+    assert resolver.stats()["entries"] == 2
+
+    resolver.invalidate("2.wav")
+    assert resolver.stats()["entries"] == 1
@@ -0,0 +1,83 @@
+"""Tests del catálogo de grabaciones: carga completa e incremental por marca de agua"""
+import pytest
+
+import database
+from fakes import FakeSupabase
+from recordings_catalog import RecordingsCatalog
+
+
+def record(rid, filename, created, updated="", transcribed=False):
+    ids = [{"id": f"t-{rid}"}] if transcribed else []
+    return {"id": rid, "filename": filename, "created_at": created, "updated_at": updated,
+            "latest": ids, "filled": ids}
+
+
+@pytest.fixture
+def server():
+    """Filas que devuelve la BD: la completa la primera vez, luego lo que cambie cada test"""
+    state = {"full": [], "changed": []}
+
+    def recordings(query):
+        return state["changed"] if query.args("or_") else state["full"]
+
+    state["db"] = FakeSupabase(recordings=recordings)
+    database.invalidate_transcription_status()
+    yield state
+    database.invalidate_transcription_status()
+
+
+def make_catalog(server):
+    return RecordingsCatalog(db_getter=lambda: server["db"], refresh_interval=0, full_refresh_interval=3600)
+
+
+def test_incremental_load_merges_changes_after_the_watermark(server):
+    server["full"] = [record("1", "a.wav", "2026-01-01T10:00"), record("2", "b.wav", "2026-01-02T10:00")]
+    catalog = make_catalog(server)
+    catalog.refresh(force=True)
+
+    server["changed"] = [
+        record("2", "b.wav", "2026-01-02T10:00", "2026-01-03T09:00", transcribed=True),
+        record("3", "c.wav", "2026-01-04T10:00"),
+    ]
+    catalog.refresh(force=True)
+
+    assert catalog.filenames() == ["c.wav", "b.wav", "a.wav"]
+    assert catalog.is_transcribed("b.wav") and not catalog.is_transcribed("a.wav")
+    incremental = server["db"].queries("recordings", "or_")[0]
+    assert incremental.args("or_") == [("created_at.gt.2026-01-02T10:00,updated_at.gt.2026-01-02T10:00",)]
+
+    catalog.refresh(force=True)
+    assert server["db"].queries("recordings", "or_")[1].args("or_") == [
+        ("created_at.gt.2026-01-04T10:00,updated_at.gt.2026-01-04T10:00",)
+    ]
+
+
+def test_refresh_primes_the_transcription_status_cache(server, monkeypatch):
+    server["full"] = [record("1", "a.wav", "2026-01-01T10:00", transcribed=True)]
+    make_catalog(server).refresh(force=True)
+    db = FakeSupabase()
+    monkeypatch.setattr(database, "init_supabase", lambda: db)
+
+    assert database.get_transcription_status(["a.wav"]) == {"a.wav": True}
+    assert not db.executed
+
+
+def test_local_changes_apply_before_the_next_reload(server):
+    server["full"] = [record("1", "a.wav", "2026-01-01T10:00"), record("2", "b.wav", "2026-01-02T10:00")]
+    catalog = make_catalog(server)
+    catalog.refresh(force=True)
+
+    catalog.rename("a.wav", "z.wav")
+    catalog.remove("b.wav")
+    catalog.mark_transcribed("z.wav")
+
+    assert catalog.filename_map() == {"z.wav": "1"}
+    assert catalog.is_transcribed("z.wav")
+
+
+def test_refresh_respects_the_interval(server):
+    catalog = RecordingsCatalog(db_getter=lambda: server["db"], refresh_interval=3600)
+    catalog.refresh(force=True)
+    catalog.refresh()
+
+    assert len(server["db"].executed) == 1
@@ -0,0 +1,64 @@
+"""Tests del almacén de resúmenes: memoizado por versión de la transcripción"""
+import pytest
+
+import database
+from fakes import FakeSupabase
+from summary_store import SummaryStore
+
+
+@pytest.fixture
+def summaries_table(monkeypatch):
+    """Tabla `summaries` en memoria con la clave única (transcripción, prompt, modelo)"""
+    rows = {}
+
+    def summaries(query):
+        upserts = query.args("upsert")
+        if upserts:
+            row = upserts[0][0]
+            rows[(row["transcription_id"], row["prompt_hash"], row["model"])] = row
+            return [row]
+        filters = dict(query.args("eq"))
+        row = rows.get((filters["transcription_id"], filters["prompt_hash"], filters["model"]))
+        return [row] if row else []
+
+    db = FakeSupabase(summaries=summaries)
+    monkeypatch.setattr(database, "init_supabase", lambda: db)
+    return rows
+
+
+def make_store(tmp_path, name="mirror"):
+    return SummaryStore(mirror_dir=tmp_path / name, prompt="Resume", model="modelo")
+
+
+def counting_generator(calls):
+    def generate(prompt, text):
+        calls.append(text)
+        return f"resumen de: {text}"
+    return generate
+
+
+def test_summary_is_generated_once_per_transcription_version(tmp_path, summaries_table):
+    store, calls = make_store(tmp_path), []
+
+    assert store.get_or_generate("t1", "versión 1", counting_generator(calls)) == "resumen de: versión 1"
+    assert store.get_or_generate("t1", "versión 1", counting_generator(calls)) == "resumen de: versión 1"
+    assert calls == ["versión 1"]
+
+
+def test_editing_the_transcription_invalidates_the_summary(tmp_path, summaries_table):
+    store, calls = make_store(tmp_path), []
+    store.get_or_generate("t1", "versión 1", counting_generator(calls))
+
+    assert store.get("t1", "versión 2") is None
+    assert store.get_or_generate("t1", "versión 2", counting_generator(calls)) == "resumen de: versión 2"
+    assert calls == ["versión 1", "versión 2"]
+    assert len(summaries_table) == 1  # Se reemplaza la fila, no se acumula
+
+
+def test_database_copy_is_shared_between_processes(tmp_path, summaries_table):
+    make_store(tmp_path, "a").get_or_generate("t1", "texto", counting_generator([]))
+    other, calls = make_store(tmp_path, "b"), []
+
+    assert other.get_or_generate("t1", "texto", counting_generator(calls)) == "resumen de: texto"
+    assert calls == []
+    assert list((tmp_path / "b").glob("*.json"))  # Copiado al espejo local
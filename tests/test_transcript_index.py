@@ -0,0 +1,45 @@
+"""Tests del índice BM25 de transcripciones"""
+from transcript_index import TranscriptIndex, TranscriptIndexStore, tokenize
+
+TRANSCRIPTION = "\n".join([
+    'Ana: "Buenos días, empezamos con el orden del día"',
+    'Luis: "El presupuesto de marketing se ha agotado en marzo"',
+    'Ana: "Hay que revisar el contrato con el proveedor de logística"',
+    'Marta: "Propongo renegociar el contrato antes de junio"',
+    'Luis: "También falta contratar un diseñador para la campaña"',
+])
+
+
+def test_tokenize_strips_accents_and_stopwords():
+    assert tokenize("¿Qué pasó con la Logística en Marzo?") == ["paso", "logistica", "marzo"]
+
+
+def test_search_ranks_the_matching_chunk_first():
+    index = TranscriptIndex.build(TRANSCRIPTION, max_chars=80)
+
+    assert len(index.chunks) == 5
+    assert index.chunks[index.search("presupuesto de marketing", 1)[0]].startswith("Luis: \"El presupuesto")
+    assert set(index.search("contrato", 5)) == {2, 3}
+
+
+def test_rare_terms_weigh_more_than_common_ones():
+    index = TranscriptIndex.build(TRANSCRIPTION, max_chars=80)
+
+    # "contrato" aparece en dos fragmentos, "logística" solo en uno
+    assert index.search("contrato logística", 1) == [2]
+
+
+def test_select_keeps_chronological_order_and_falls_back_to_spread():
+    index = TranscriptIndex.build(TRANSCRIPTION, max_chars=80)
+
+    assert index.select("junio proveedor", 2) == [index.chunks[2], index.chunks[3]]
+    assert index.select("¿de qué trata?", 3) == [index.chunks[0], index.chunks[2], index.chunks[4]]
+
+
+def test_store_persists_and_reloads(tmp_path):
+    store = TranscriptIndexStore(tmp_path)
+    built = store.get(TRANSCRIPTION)
+    reloaded = TranscriptIndexStore(tmp_path).get(TRANSCRIPTION)
+
+    assert len(list(tmp_path.glob("*.json"))) == 1
+    assert reloaded.to_dict() == built.to_dict()
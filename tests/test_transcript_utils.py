@@ -0,0 +1,56 @@
+"""Tests de la unión de transcripciones por fragmentos"""
+from transcript_utils import format_turns, parse_turns, split_turn_windows, stitch_transcriptions
+
+LONG_A = "Vamos a revisar el presupuesto del tercer trimestre con calma"
+LONG_B = "De acuerdo, empiezo por los gastos de personal y proveedores"
+LONG_C = "Los proveedores han subido un diez por ciento desde enero"
+
+
+def test_parse_turns_joins_continuation_lines():
+    turns = parse_turns('Ana: "Hola a todos"\ny seguimos\nLuis: "Buenas"')
+
+    assert turns == [("Ana", "Hola a todos y seguimos"), ("Luis", "Buenas")]
+    assert parse_turns(format_turns(turns)) == turns
+
+
+def test_stitch_drops_the_overlap_and_maps_speakers():
+    first = f'Carlos: "{LONG_A}"\nMaría: "{LONG_B}"'
+    second = f'Voz 1: "{LONG_B}"\nVoz 2: "{LONG_C}"'
+
+    assert parse_turns(stitch_transcriptions([first, second])) == [
+        ("Carlos", LONG_A), ("María", LONG_B), ("Voz 2", LONG_C)
+    ]
+
+
+def test_stitch_keeps_new_turns_after_the_overlap_prefix():
+    # Un turno nuevo que casualmente se parece a uno antiguo no debe arrastrar los anteriores
+    first = f'Ana: "{LONG_A}"\nLuis: "{LONG_B}"'
+    second = f'Luis: "{LONG_B}"\nAna: "{LONG_C}"\nLuis: "{LONG_A}"'
+
+    texts = [text for _, text in parse_turns(stitch_transcriptions([first, second]))]
+    assert texts == [LONG_A, LONG_B, LONG_C, LONG_A]
+
+
+def test_stitch_short_repeats_are_not_overlap_evidence():
+    first = f'Ana: "{LONG_A}"\nLuis: "Sí."'
+    second = f'Luis: "Sí."\nAna: "{LONG_C}"'
+
+    texts = [text for _, text in parse_turns(stitch_transcriptions([first, second]))]
+    assert texts == [LONG_A, "Sí.", "Sí.", LONG_C]
+
+
+def test_stitch_short_turns_inside_a_confirmed_prefix_are_dropped():
+    first = f'Ana: "{LONG_A}"\nLuis: "Vale."\nAna: "{LONG_B}"'
+    second = f'Voz 1: "{LONG_A}"\nVoz 2: "Vale."\nVoz 1: "{LONG_B}"\nVoz 2: "{LONG_C}"'
+
+    assert parse_turns(stitch_transcriptions([first, second])) == [
+        ("Ana", LONG_A), ("Luis", "Vale."), ("Ana", LONG_B), ("Voz 2", LONG_C)
+    ]
+
+
+def test_split_turn_windows_covers_all_text():
+    transcription = "\n".join(f'Voz {i % 3}: "{LONG_A} {i}"' for i in range(30))
+    windows = split_turn_windows(transcription, 200)
+
+    assert all(len(window) <= 200 for window in windows)
+    assert "\n".join(windows) == transcription
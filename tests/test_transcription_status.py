@@ -0,0 +1,48 @@
+"""Tests del estado "transcrito" en lote y su caché"""
+import pytest
+
+import database
+from fakes import FakeSupabase
+
+
+@pytest.fixture(autouse=True)
+def clean_status_cache():
+    database.invalidate_transcription_status()
+    yield
+    database.invalidate_transcription_status()
+
+
+def use_db(monkeypatch, rows):
+    db = FakeSupabase(recordings=lambda query: rows)
+    monkeypatch.setattr(database, "init_supabase", lambda: db)
+    return db
+
+
+def test_latest_transcription_decides(monkeypatch):
+    use_db(monkeypatch, [
+        {"filename": "a.wav", "latest": [{"id": "t2"}], "filled": [{"id": "t2"}]},
+        # La última está vacía aunque una anterior tenga contenido
+        {"filename": "b.wav", "latest": [{"id": "t4"}], "filled": [{"id": "t3"}]},
+        {"filename": "c.wav", "latest": [], "filled": []},
+    ])
+
+    assert database.get_transcription_status(["a.wav", "b.wav", "c.wav", "d.wav"]) == {
+        "a.wav": True, "b.wav": False, "c.wav": False, "d.wav": False
+    }
+
+
+def test_query_filters_on_non_blank_content(monkeypatch):
+    db = use_db(monkeypatch, [])
+    database.get_transcription_status(["a.wav"])
+
+    query = db.executed[0]
+    assert ("filled.content", "match", r"\S") in query.args("filter")
+    assert not query.args("neq")
+
+
+def test_cached_status_matches_saved_content(monkeypatch):
+    db = use_db(monkeypatch, [])
+    database.prime_transcription_status({"a.wav": bool("   ".strip())})
+
+    assert database.get_transcription_status(["a.wav"]) == {"a.wav": False}
+    assert not db.executed
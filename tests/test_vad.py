@@ -0,0 +1,32 @@
+"""Tests de OffsetMap: tiempos del audio sin silencios → grabación original"""
+import pytest
+
+from vad import OffsetMap
+
+
+@pytest.fixture
+def offset_map():
+    # 0-10 s se conservan, 10-30 s de silencio eliminado, 30-50 s se conservan
+    return OffsetMap([(0.0, 0.0, 10.0), (10.0, 30.0, 20.0)])
+
+
+def test_to_original_inside_segments(offset_map):
+    assert offset_map.to_original(0.0) == 0.0
+    assert offset_map.to_original(5.0) == 5.0
+    assert offset_map.to_original(10.0) == 30.0
+    assert offset_map.to_original(25.0) == 45.0
+
+
+def test_to_original_clamps_past_the_end(offset_map):
+    assert offset_map.to_original(100.0) == 50.0
+
+
+def test_empty_map_is_identity():
+    assert OffsetMap().to_original(12.5) == 12.5
+
+
+def test_shifted_moves_the_original_timeline(offset_map):
+    shifted = offset_map.shifted(3.0)
+
+    assert shifted.to_original(25.0) == 48.0
+    assert shifted.kept_seconds == offset_map.kept_seconds == 30.0